@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+pyaerocom command line interface
+
+Currently supports management of the cache directory, e.g.::
+
+    pyaerocom cache list
+    pyaerocom cache stats
+    pyaerocom cache prune --max-size 5000
+    pyaerocom cache prune --pattern 'EBASMC_*'
+"""
+from datetime import datetime
+
+def _get_cache_dir(cache_dir=None):
+    if cache_dir is not None:
+        return cache_dir
+    from pyaerocom import const
+    return const.CACHEDIR
+
+def _print_entries(entries):
+    print('{:<50} {:>10} {:>20} {:>6} {:>6}'.format('Name', 'Size [MB]',
+                                                    'Last access', 'Hits',
+                                                    'Misses'))
+    for e in entries:
+        last_access = datetime.fromtimestamp(e['last_access'])
+        print('{:<50} {:>10.1f} {:>20} {:>6} {:>6}'
+              .format(e['name'], e['size'] / 1024 ** 2,
+                      last_access.strftime('%Y-%m-%d %H:%M:%S'),
+                      e['hits'], e['misses']))
+
+def cache(args):
+    """Run cache command (list, stats or prune)"""
+    from pyaerocom.io import cache_manager
+    cache_dir = _get_cache_dir(args.cache_dir)
+    if args.command == 'list':
+        _print_entries(cache_manager.list_entries(cache_dir, args.pattern))
+    elif args.command == 'stats':
+        stats = cache_manager.cache_stats(cache_dir)
+        print('Cache directory: {}'.format(cache_dir))
+        print('Number of entries: {}'.format(stats['num_entries']))
+        print('Total size: {:.1f} MB'.format(stats['size'] / 1024 ** 2))
+        print('Hits: {}, misses: {} (hit rate: {:.2f})'
+              .format(stats['hits'], stats['misses'], stats['hit_rate']))
+    elif args.command == 'prune':
+        if args.max_size is None and args.pattern is None:
+            raise ValueError('Please specify --max-size and / or --pattern')
+        removed = cache_manager.prune(cache_dir, max_size_mb=args.max_size,
+                                      pattern=args.pattern)
+        print('Removed {} cache entries'.format(len(removed)))
+        for name in removed:
+            print(name)
+
+def main():
+    from argparse import ArgumentParser
+
+    p = ArgumentParser(description='pyaerocom command line interface')
+    sub = p.add_subparsers(dest='tool')
+    sub.required = True
+
+    c = sub.add_parser('cache', help='Manage cache directory')
+    c.add_argument('command', choices=['list', 'stats', 'prune'])
+    c.add_argument('-d', '--cache_dir', default=None,
+                   help='Cache directory (default is pyaerocom.const.CACHEDIR)')
+    c.add_argument('-p', '--pattern', default=None,
+                   help=('Wildcard pattern for names of cache entries (for '
+                         'list and prune)'))
+    c.add_argument('-s', '--max-size', dest='max_size', type=float,
+                   default=None,
+                   help=('prune: remove least recently used entries until '
+                         'cache is smaller than this size (in MB)'))
+    c.set_defaults(func=cache)
+
+    args = p.parse_args()
+    args.func(args)
+
+if __name__ == '__main__':
+    main()
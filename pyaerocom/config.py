@@ -160,6 +160,26 @@ class Config(object):
     AEOLUS_NAME = 'AeolusL2A'
     
     RM_CACHE_OUTDATED = True
+    
+    #: Maximum size of cache directory in MB. If exceeded, the least recently
+    #: used cache entries are removed after writing new ones (cf. 
+    #: :func:`pyaerocom.io.cache_manager.prune`). None means unlimited.
+    CACHE_MAX_SIZE_MB = None
+    
+    #: If True, the processed (loaded, corrected and concatenated) cubes 
+    #: read by :class:`pyaerocom.io.ReadGridded` are cached (cf. 
+    #: :class:`pyaerocom.io.cachehandler_gridded.CacheHandlerGridded`)
+    CACHE_GRIDDED = False
+    
+    #: If True, :class:`UngriddedData` objects store their data in typed 
+    #: columns (cf. :class:`pyaerocom.ungridded_storage.ColumnarDataArray`)
+    #: instead of a single 2D float64 array, which requires considerably less
+    #: memory for large datasets
+    UNGRIDDED_COLUMNAR = False
+    
+    #: dtype of data values in columnar storage of :class:`UngriddedData` 
+    #: (e.g. use float32 to further reduce memory usage)
+    UNGRIDDED_VALUE_DTYPE = 'float64'
 
     #: Name of the file containing the revision string of an obs data network
     REVISION_FILE = 'Revision.txt'
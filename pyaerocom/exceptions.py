@@ -77,6 +77,9 @@ class NDimError(DataDimensionError):
 class EbasFileError(ValueError):
     pass
 
+class EbasDataRequiredError(EbasFileError):
+    pass
+
 class FileConventionError(IOError):
     pass
 
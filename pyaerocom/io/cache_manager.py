@@ -0,0 +1,418 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Management of the cache directory (locking, statistics and pruning)
+
+The cache directory (:attr:`pyaerocom.config.Config.CACHEDIR`) may be
+shared by several processes. Cache entries (directories written by
+:class:`pyaerocom.io.cachehandler_ungridded.CacheHandlerUngridded`) are
+therefore
+
+- written into a temporary directory that is renamed on completion (cf.
+  :func:`replace_entry`),
+- protected by advisory file locks (:class:`CacheLock`, shared for reading,
+  exclusive for writing and removal) and
+- evicted in least recently used order if the size of the cache directory
+  exceeds :attr:`pyaerocom.config.Config.CACHE_MAX_SIZE_MB` (cf.
+  :func:`prune`). Access times of cache entries are set explicitly on each
+  cache hit (cf. :func:`touch_entry`), that is, they do not depend on the
+  mount options of the file system.
+
+Hits and misses of each cache entry are counted in :attr:`STATS_FILE`.
+
+Files of cache entries that are accessed lazily after the lock of the entry
+has been released (e.g. NetCDF files of cached cubes) are accessed through
+private hard links (cf. :func:`private_link`), so that they remain valid if
+the entry is evicted or replaced by other processes.
+
+Note
+----
+Locking requires :mod:`fcntl` and is thus disabled on Windows.
+"""
+import atexit
+import fnmatch
+import json
+import os
+import shutil
+import time
+import uuid
+
+from pyaerocom import logger
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+#: Name of header file of cache entries (used to identify cache entries)
+HEAD_FILE = 'cache_head.json'
+
+#: Name of subdirectory containing lock files
+LOCK_DIR_NAME = 'locks'
+
+#: Name of file containing hit / miss statistics of cache entries
+STATS_FILE = 'cache_stats.json'
+
+#: Name of subdirectory containing private links to files of cache entries
+#: (one subdirectory per process, cf. :func:`private_link`)
+VIEW_DIR_NAME = 'views'
+
+#: Temporary directories (of interrupted writes) older than this (in s) are
+#: removed in :func:`prune`
+TMP_MAX_AGE = 24 * 3600
+
+class CacheLock(object):
+    """Advisory lock for a cache entry (or any other file)
+
+    Lock files are stored in subdirectory :attr:`LOCK_DIR_NAME` of the
+    cache directory and are never removed (removing lock files that other
+    processes might be waiting for would break the locking).
+
+    Parameters
+    ----------
+    cache_dir : str
+        cache directory
+    name : str
+        name of cache entry (or file) to be locked
+    exclusive : bool
+        if True, an exclusive lock is acquired (for writing), else a shared
+        lock (for reading)
+    blocking : bool
+        if False, :attr:`acquired` is False if the lock is held by another
+        process instead of waiting for it to be released
+
+    Example
+    -------
+    >>> with CacheLock(cache_dir, 'EBASMC_scatc550aer', exclusive=True):
+    ...     # write entry
+    """
+    def __init__(self, cache_dir, name, exclusive=False, blocking=True):
+        self.path = os.path.join(cache_dir, LOCK_DIR_NAME,
+                                 '{}.lock'.format(name))
+        self.exclusive = exclusive
+        self.blocking = blocking
+        self.acquired = False
+        self._file = None
+
+    def acquire(self):
+        """Acquire lock
+
+        Returns
+        -------
+        bool
+            True if lock could be acquired (always True if ``blocking`` is
+            True)
+        """
+        if fcntl is None:
+            self.acquired = True
+            return True
+        lock_dir = os.path.dirname(self.path)
+        if not os.path.exists(lock_dir):
+            os.makedirs(lock_dir, exist_ok=True)
+        self._file = open(self.path, 'a')
+        op = fcntl.LOCK_EX if self.exclusive else fcntl.LOCK_SH
+        if not self.blocking:
+            op = op | fcntl.LOCK_NB
+        try:
+            fcntl.flock(self._file.fileno(), op)
+        except BlockingIOError:
+            self._file.close()
+            self._file = None
+            return False
+        self.acquired = True
+        return True
+
+    def release(self):
+        """Release lock"""
+        if self._file is not None:
+            fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+            self._file.close()
+            self._file = None
+        self.acquired = False
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *args):
+        self.release()
+
+def tmp_entry_path(path):
+    """Get unique path of temporary directory for writing a cache entry"""
+    return '{}.tmp.{}'.format(path, uuid.uuid4().hex)
+
+def replace_entry(tmp_path, path):
+    """Replace cache entry with new one written to a temporary directory
+
+    Renaming is atomic, that is, other processes either see the old or the
+    new entry (or, for a short moment, none), but never an incomplete one.
+    Should be called with an exclusive :class:`CacheLock` of the entry.
+
+    Parameters
+    ----------
+    tmp_path : str
+        temporary directory containing new entry (cf. :func:`tmp_entry_path`)
+    path : str
+        path of cache entry
+    """
+    old = None
+    if os.path.exists(path):
+        old = tmp_entry_path(path)
+        os.rename(path, old)
+    os.rename(tmp_path, path)
+    if old is not None:
+        # note: files that are memory mapped by other processes remain
+        # accessible until they are unmapped
+        shutil.rmtree(old, ignore_errors=True)
+
+def remove_entry(cache_dir, name, blocking=True):
+    """Remove cache entry (with exclusive lock)
+
+    Parameters
+    ----------
+    cache_dir : str
+        cache directory
+    name : str
+        name of cache entry
+    blocking : bool
+        if False, the entry is not removed if it is locked by another process
+
+    Returns
+    -------
+    bool
+        True if entry was removed
+    """
+    path = os.path.join(cache_dir, name)
+    with CacheLock(cache_dir, name, exclusive=True,
+                   blocking=blocking) as lock:
+        if not lock.acquired or not os.path.exists(path):
+            return False
+        shutil.rmtree(path)
+    return True
+
+def touch_entry(path):
+    """Set access time of cache entry to current time (used for LRU)
+    
+    The access time of the header file of the entry is used, since the one
+    of the directory itself changes whenever it is listed.
+    """
+    head = os.path.join(path, HEAD_FILE)
+    try:
+        os.utime(head, (time.time(), os.stat(head).st_mtime))
+    except OSError as e:
+        logger.warning('Failed to update access time of {}: {}'
+                       .format(path, repr(e)))
+
+def _pid_alive(pid):
+    if not os.name == 'posix':
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+def _process_view_dir(cache_dir):
+    view_root = os.path.join(cache_dir, VIEW_DIR_NAME)
+    path = os.path.join(view_root, str(os.getpid()))
+    if not os.path.isdir(path):
+        os.makedirs(path, exist_ok=True)
+        atexit.register(shutil.rmtree, path, True)
+        # remove links of processes that are not running anymore
+        with os.scandir(view_root) as it:
+            for entry in it:
+                if entry.name.isdigit() and not _pid_alive(int(entry.name)):
+                    shutil.rmtree(entry.path, ignore_errors=True)
+    return path
+
+def private_link(cache_dir, path):
+    """Create private link to file of a cache entry
+
+    The link is created in a process specific subdirectory of
+    :attr:`VIEW_DIR_NAME`, which is removed when the process exits. If hard
+    links are not supported, the file is copied. Should be called with a
+    (shared) :class:`CacheLock` of the entry.
+
+    Parameters
+    ----------
+    cache_dir : str
+        cache directory
+    path : str
+        path of file in cache entry
+
+    Returns
+    -------
+    str
+        path of link
+    """
+    link = os.path.join(_process_view_dir(cache_dir),
+                        uuid.uuid4().hex + os.path.splitext(path)[1])
+    try:
+        os.link(path, link)
+    except OSError:
+        shutil.copyfile(path, link)
+    return link
+
+def _read_stats(cache_dir):
+    fp = os.path.join(cache_dir, STATS_FILE)
+    if not os.path.isfile(fp):
+        return {}
+    try:
+        with open(fp, 'r') as f:
+            return json.load(f)
+    except Exception as e:
+        logger.warning('Failed to read cache statistics: {}'.format(repr(e)))
+        return {}
+
+def record_access(cache_dir, name, hit):
+    """Count cache hit or miss of a cache entry
+
+    Parameters
+    ----------
+    cache_dir : str
+        cache directory
+    name : str
+        name of cache entry
+    hit : bool
+        True if the entry could be loaded, else False
+    """
+    try:
+        with CacheLock(cache_dir, STATS_FILE, exclusive=True):
+            stats = _read_stats(cache_dir)
+            entry = stats.setdefault(name, {'hits' : 0, 'misses' : 0})
+            entry['hits' if hit else 'misses'] += 1
+            fp = os.path.join(cache_dir, STATS_FILE)
+            tmp = tmp_entry_path(fp)
+            with open(tmp, 'w') as f:
+                json.dump(stats, f)
+            os.replace(tmp, fp)
+    except Exception as e:
+        logger.warning('Failed to update cache statistics: {}'
+                       .format(repr(e)))
+
+def _dir_size(path):
+    size = 0
+    for root, dirs, files in os.walk(path):
+        for file in files:
+            try:
+                size += os.path.getsize(os.path.join(root, file))
+            except OSError: # removed in the meantime
+                pass
+    return size
+
+def list_entries(cache_dir, pattern=None):
+    """List cache entries
+
+    Parameters
+    ----------
+    cache_dir : str
+        cache directory
+    pattern : str, optional
+        wildcard pattern for names of entries (e.g. EBASMC*)
+
+    Returns
+    -------
+    list
+        list of dictionaries (one for each entry, sorted by last access,
+        least recently used first) containing name, path, size (in bytes),
+        last_access (timestamp), hits and misses
+    """
+    stats = _read_stats(cache_dir)
+    entries = []
+    with os.scandir(cache_dir) as it:
+        for entry in it:
+            if not entry.is_dir() or '.tmp.' in entry.name:
+                continue
+            elif pattern is not None and not fnmatch.fnmatch(entry.name,
+                                                             pattern):
+                continue
+            head = os.path.join(entry.path, HEAD_FILE)
+            if not os.path.isfile(head):
+                continue
+            st = stats.get(entry.name, {})
+            entries.append(dict(name=entry.name,
+                                path=entry.path,
+                                size=_dir_size(entry.path),
+                                last_access=os.stat(head).st_atime,
+                                hits=st.get('hits', 0),
+                                misses=st.get('misses', 0)))
+    return sorted(entries, key=lambda e: e['last_access'])
+
+def cache_size(cache_dir):
+    """Total size of cache entries in cache directory in bytes"""
+    return sum([e['size'] for e in list_entries(cache_dir)])
+
+def cache_stats(cache_dir):
+    """Hit / miss statistics of cache directory
+
+    Returns
+    -------
+    dict
+        dictionary containing number of entries, total size (in bytes),
+        total number of hits and misses and the hit rate
+    """
+    entries = list_entries(cache_dir)
+    stats = _read_stats(cache_dir)
+    hits = sum([s.get('hits', 0) for s in stats.values()])
+    misses = sum([s.get('misses', 0) for s in stats.values()])
+    total = hits + misses
+    return dict(num_entries=len(entries),
+                size=sum([e['size'] for e in entries]),
+                hits=hits,
+                misses=misses,
+                hit_rate=hits / total if total > 0 else float('nan'))
+
+def _remove_stale_tmp(cache_dir):
+    now = time.time()
+    with os.scandir(cache_dir) as it:
+        for entry in it:
+            if (entry.is_dir() and '.tmp.' in entry.name and
+                now - entry.stat().st_mtime > TMP_MAX_AGE):
+                logger.info('Removing stale temporary cache directory {}'
+                            .format(entry.path))
+                shutil.rmtree(entry.path, ignore_errors=True)
+
+def prune(cache_dir, max_size_mb=None, pattern=None):
+    """Remove cache entries
+
+    Entries that are locked by other processes are skipped.
+
+    Parameters
+    ----------
+    cache_dir : str
+        cache directory
+    max_size_mb : float, optional
+        if provided, the least recently used entries are removed until the
+        total size of the cache is below this value (in MB)
+    pattern : str, optional
+        if provided (and max_size_mb is None), all entries matching this
+        wildcard pattern are removed
+
+    Returns
+    -------
+    list
+        names of removed entries
+    """
+    _remove_stale_tmp(cache_dir)
+    entries = list_entries(cache_dir, pattern)
+    removed = []
+    if max_size_mb is None:
+        if pattern is None:
+            return removed
+        for entry in entries:
+            if remove_entry(cache_dir, entry['name'], blocking=False):
+                removed.append(entry['name'])
+        return removed
+    max_size = max_size_mb * 1024 ** 2
+    size = sum([e['size'] for e in entries])
+    for entry in entries: # least recently used first
+        if size <= max_size:
+            break
+        if remove_entry(cache_dir, entry['name'], blocking=False):
+            logger.info('Removed cache entry {} (least recently used)'
+                        .format(entry['name']))
+            size -= entry['size']
+            removed.append(entry['name'])
+    return removed
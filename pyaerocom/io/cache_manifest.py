@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Fingerprints of data directories (manifests) used for cache validation
+
+Checking whether cached data is outdated requires information about the
+newest file in the data directory of a dataset. Retrieving it requires a 
+stat call for each file, which can take minutes for directories containing
+many files on network storage. The manifests in this module store the 
+result of such a scan (number of files, newest file and its modification 
+time and a hash of all file names). They are persisted as JSON files in a 
+manifest directory (e.g. a subdirectory of the cache directory), shared 
+between sessions and all readers, and re-used as long as the modification
+time of the directory itself remains unchanged, that is, as long as no 
+files were added, removed or renamed.
+
+As modification time of a file the maximum of its content modification
+time (st_mtime) and status change time (st_ctime) is used, so that files
+that are overwritten in place are detected by a scan even if their 
+st_mtime is preserved (e.g. ``cp -p``).
+
+Note
+----
+Modifications of existing files in place do not change the modification
+time of the directory. They are only detected if a full scan is requested
+(cf. ``full_check`` in :func:`get_dir_manifest`) or once files are added, 
+removed or renamed in the directory.
+"""
+import fnmatch
+import hashlib
+import json
+import os
+import time
+
+from pyaerocom import logger
+
+#: name of subdirectory of cache directory where manifests are stored
+MANIFEST_DIR_NAME = 'manifests'
+
+#: resolution of directory modification times in s. Manifests of directories
+#: that were modified less than this before the scan are not re-used, since
+#: later modifications may not change the directory modification time
+MTIME_RESOLUTION = 2
+
+def file_mtime(st):
+    """Modification time of file (max. of st_mtime and st_ctime)
+    
+    Parameters
+    ----------
+    st : os.stat_result
+        result of stat call
+        
+    Returns
+    -------
+    float
+        modification time
+    """
+    return max(st.st_mtime, st.st_ctime)
+
+def scan_dir(data_dir):
+    """Scan data directory and create manifest
+
+    Parameters
+    ----------
+    data_dir : str
+        data directory
+
+    Returns
+    -------
+    dict
+        manifest of directory containing keys data_dir, dir_mtime, 
+        scan_time, num_files, newest_file, newest_mtime and fingerprint
+
+    Raises
+    ------
+    FileNotFoundError
+        if directory does not exist or is empty
+    """
+    scan_time = time.time()
+    dir_mtime = os.stat(data_dir).st_mtime
+    names = []
+    newest, newest_mtime = None, None
+    with os.scandir(data_dir) as it:
+        for entry in it:
+            mtime = file_mtime(entry.stat())
+            names.append(entry.name)
+            if newest_mtime is None or mtime > newest_mtime:
+                newest, newest_mtime = entry.path, mtime
+    if newest is None:
+        raise FileNotFoundError('No files in directory {}'.format(data_dir))
+    names_hash = hashlib.sha1('\n'.join(sorted(names))
+                              .encode('utf-8')).hexdigest()
+    return dict(data_dir=data_dir,
+                dir_mtime=dir_mtime,
+                scan_time=scan_time,
+                num_files=len(names),
+                newest_file=newest,
+                newest_mtime=newest_mtime,
+                fingerprint='{}_{}'.format(len(names), names_hash))
+
+def file_mtimes(data_dir, pattern='*'):
+    """Get modification times of all files in directory matching a pattern
+    
+    Parameters
+    ----------
+    data_dir : str
+        data directory
+    pattern : str
+        file name pattern (e.g. *.lev30)
+        
+    Returns
+    -------
+    dict
+        keys are file names (without directory), values are modification 
+        times (cf. :func:`file_mtime`)
+    """
+    mtimes = {}
+    with os.scandir(data_dir) as it:
+        for entry in it:
+            if fnmatch.fnmatch(entry.name, pattern) and entry.is_file():
+                mtimes[entry.name] = file_mtime(entry.stat())
+    return mtimes
+
+def manifest_file(data_dir, manifest_dir):
+    """Path of manifest file for data directory"""
+    key = hashlib.sha1(os.path.abspath(data_dir).encode('utf-8')).hexdigest()
+    return os.path.join(manifest_dir, '{}.json'.format(key))
+
+def _load_manifest(data_dir, manifest_dir):
+    fp = manifest_file(data_dir, manifest_dir)
+    if not os.path.isfile(fp):
+        return None
+    try:
+        with open(fp, 'r') as f:
+            manifest = json.load(f)
+    except Exception as e:
+        logger.warning('Failed to read manifest file {}: {}'
+                       .format(fp, repr(e)))
+        return None
+    if not manifest.get('data_dir') == data_dir:
+        return None
+    return manifest
+
+def _write_manifest(manifest, manifest_dir):
+    fp = manifest_file(manifest['data_dir'], manifest_dir)
+    tmp = '{}.{}.tmp'.format(fp, os.getpid())
+    try:
+        if not os.path.exists(manifest_dir):
+            os.makedirs(manifest_dir)
+        with open(tmp, 'w') as f:
+            json.dump(manifest, f)
+        os.replace(tmp, fp)
+    except Exception as e:
+        logger.warning('Failed to write manifest file {}: {}'
+                       .format(fp, repr(e)))
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+def is_current(manifest):
+    """Check if manifest is up to date with its data directory
+    
+    Requires a single stat call of the directory. A manifest is considered
+    up to date if the modification time of the directory is unchanged and 
+    the directory was not modified shortly before the scan (cf. 
+    :attr:`MTIME_RESOLUTION`).
+    
+    Parameters
+    ----------
+    manifest : dict
+        manifest (cf. :func:`scan_dir`)
+        
+    Returns
+    -------
+    bool
+        True, if manifest can be re-used, else False
+    """
+    try:
+        dir_mtime = os.stat(manifest['data_dir']).st_mtime
+        scan_time = manifest['scan_time']
+    except (OSError, KeyError):
+        return False
+    return (dir_mtime == manifest.get('dir_mtime') and 
+            dir_mtime < scan_time - MTIME_RESOLUTION)
+
+def get_dir_manifest(data_dir, manifest_dir=None, full_check=False):
+    """Get (and, if required, update) manifest of data directory
+
+    The directory is only scanned if no persisted manifest exists in the 
+    manifest directory, if the modification time of the directory has 
+    changed since the manifest was created (cf. :func:`is_current`) or if 
+    a full check is requested.
+
+    Parameters
+    ----------
+    data_dir : str
+        data directory
+    manifest_dir : :obj:`str`, optional
+        directory where manifests are persisted. If None, the directory is
+        scanned and the manifest is not written to disk.
+    full_check : bool
+        if True, the directory is scanned even if the persisted manifest is
+        up to date, which also detects files that were overwritten in place
+
+    Returns
+    -------
+    dict
+        manifest (cf. :func:`scan_dir`)
+    """
+    if manifest_dir is not None and not full_check:
+        manifest = _load_manifest(data_dir, manifest_dir)
+        if manifest is not None and is_current(manifest):
+            return manifest
+    logger.info('Scanning data directory {}'.format(data_dir))
+    manifest = scan_dir(data_dir)
+    if manifest_dir is not None:
+        _write_manifest(manifest, manifest_dir)
+    return manifest
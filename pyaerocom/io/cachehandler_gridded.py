@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Caching of processed model cubes read by :class:`ReadGridded`
+"""
+import json, os, shutil
+
+import iris
+
+from pyaerocom import const, logger
+from pyaerocom.io import cache_manager
+from pyaerocom.io.cache_manager import CacheLock
+from pyaerocom.io.cachehandler_ungridded import (normalise_constraints,
+                                                 constraints_hash)
+
+class CacheHandlerGridded(object):
+    """Cache for loaded, corrected and concatenated model cubes
+
+    Stores the final cube of :func:`ReadGridded._load_var` (i.e. after
+    loading the files, time and unit corrections, longitude shifts and
+    concatenation) as NetCDF file. Each cache entry is a directory in the
+    cache directory (shared with :class:`CacheHandlerUngridded`, cf.
+    :mod:`pyaerocom.io.cache_manager`) with name mask
+
+    gridded_<data_id>_<var>_<hash>
+
+    where the hash is computed from the cache key (:attr:`cache_key`), that
+    contains the paths, modification times and sizes of the input files, the
+    import settings (:attr:`pyaerocom.const.GRID_IO`), additional loading
+    options and the versions of pyaerocom and of this class. Thus, a cache
+    entry is valid if it exists. Entries of outdated file sets are not
+    removed explicitly but evicted by :func:`cache_manager.prune`.
+
+    Caching is activated via :attr:`pyaerocom.config.Config.CACHE_GRIDDED`.
+
+    Note
+    ----
+    Loaded cubes are lazy and read their data from a private hard link of
+    the cached NetCDF file (cf. :func:`cache_manager.private_link`), since
+    the entry may be evicted or replaced by other processes afterwards.
+
+    Parameters
+    ----------
+    data_id : str
+        ID of model
+    var_name : str
+        variable name
+    files : list
+        list of files from which the cube is loaded
+    cache_dir : str, optional
+        cache directory (default is :attr:`pyaerocom.const.CACHEDIR`)
+    **load_kwargs
+        additional loading options (cf. :func:`ReadGridded._load_files`)
+    """
+    __version__ = '1.00'
+
+    #: Prefix of names of cache entries
+    NAME_PREFIX = 'gridded'
+
+    #: Name of cache header file in cache directories
+    HEAD_FILE = cache_manager.HEAD_FILE
+
+    #: Name of NetCDF file containing cube in cache directories
+    CUBE_FILE = 'cube.nc'
+
+    def __init__(self, data_id, var_name, files, cache_dir=None,
+                 **load_kwargs):
+        self.data_id = data_id
+        self.var_name = var_name
+        self.files = sorted(files)
+        self.load_kwargs = load_kwargs
+        self._cache_dir = cache_dir
+
+    @property
+    def cache_dir(self):
+        """Directory where cached files are stored"""
+        if self._cache_dir is not None:
+            return self._cache_dir
+        cache_dir = const.CACHEDIR
+        if cache_dir is None or not os.path.exists(cache_dir):
+            raise FileNotFoundError('Cache directory does not exist: {}'
+                                    .format(cache_dir))
+        return cache_dir
+
+    @property
+    def cache_key(self):
+        """Dictionary defining cache entry"""
+        from pyaerocom import __version__
+        files = []
+        for file in self.files:
+            st = os.stat(file)
+            files.append([file, st.st_mtime, st.st_size])
+        return normalise_constraints(dict(
+                data_id=self.data_id,
+                var_name=self.var_name,
+                files=files,
+                load_kwargs=self.load_kwargs,
+                grid_io=const.GRID_IO.to_dict(),
+                pyaerocom_version=__version__,
+                cacher_version=self.__version__))
+
+    def file_name(self, cache_key=None):
+        """Name of cache entry (directory)"""
+        if cache_key is None:
+            cache_key = self.cache_key
+        return '_'.join([self.NAME_PREFIX, str(self.data_id), self.var_name,
+                         constraints_hash(cache_key)])
+
+    def load(self):
+        """Load cached cube
+
+        Returns
+        -------
+        tuple
+            2-element tuple containing cube and dictionary with additional
+            info provided on writing (cf. :func:`write`) or None if no cache
+            entry exists or it could not be loaded
+        """
+        try:
+            cache_dir = self.cache_dir
+            name = self.file_name()
+        except Exception as e:
+            logger.warning('Cannot access cache: {}'.format(repr(e)))
+            return None
+        fp = os.path.join(cache_dir, name)
+        result = None
+        try:
+            with CacheLock(cache_dir, name):
+                if os.path.isdir(fp):
+                    with open(os.path.join(fp, self.HEAD_FILE), 'r') as f:
+                        head = json.load(f)
+                    cube_file = cache_manager.private_link(
+                            cache_dir, os.path.join(fp, self.CUBE_FILE))
+                    cube = iris.load_cube(cube_file)
+                    result = (cube, head['info'])
+        except Exception as e:
+            logger.warning('Failed to load cached cube {}: {}'
+                           .format(fp, repr(e)))
+            cache_manager.remove_entry(cache_dir, name)
+        cache_manager.record_access(cache_dir, name, hit=result is not None)
+        if result is not None:
+            cache_manager.touch_entry(fp)
+            logger.info('Loaded {} data of {} from cache'
+                        .format(self.var_name, self.data_id))
+        return result
+
+    def write(self, cube, **info):
+        """Write cube to cache
+
+        Parameters
+        ----------
+        cube : iris.cube.Cube
+            cube to be cached
+        **info
+            additional information that is returned by :func:`load` (must be
+            JSON serialisable)
+
+        Returns
+        -------
+        bool
+            True if cube was successfully written, else False
+        """
+        try:
+            cache_dir = self.cache_dir
+            cache_key = self.cache_key
+        except Exception as e:
+            logger.warning('Cannot access cache: {}'.format(repr(e)))
+            return False
+        name = self.file_name(cache_key)
+        fp = os.path.join(cache_dir, name)
+        tmp = cache_manager.tmp_entry_path(fp)
+        success = True
+        try:
+            os.mkdir(tmp)
+            iris.save(cube, os.path.join(tmp, self.CUBE_FILE))
+            with open(os.path.join(tmp, self.HEAD_FILE), 'w') as f:
+                json.dump(dict(key=cache_key, info=info), f)
+            with CacheLock(cache_dir, name, exclusive=True):
+                cache_manager.replace_entry(tmp, fp)
+        except Exception as e:
+            logger.warning('Failed to write cube to cache: {}'
+                           .format(repr(e)))
+            success = False
+        finally:
+            if not success and os.path.exists(tmp):
+                shutil.rmtree(tmp)
+        if success and const.CACHE_MAX_SIZE_MB is not None:
+            cache_manager.prune(cache_dir,
+                                max_size_mb=const.CACHE_MAX_SIZE_MB)
+        return success
+
+    def __str__(self):
+        return 'Cube cache handler for {} ({})'.format(self.data_id,
+                                                       self.var_name)
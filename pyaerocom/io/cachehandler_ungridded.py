@@ -6,29 +6,87 @@ Caching class for reading and writing of ungridded data Cache objects
 from pyaerocom import const, logger, UngriddedData
 from pyaerocom.exceptions import (AerocomConnectionError, CacheReadError,
                                   CacheWriteError)
+from pyaerocom.io.cache_manifest import (get_dir_manifest, file_mtimes,
+                                         MANIFEST_DIR_NAME)
+from pyaerocom.io import cache_manager
+from pyaerocom.io.cache_manager import CacheLock
 
-import glob, os, pickle
+import hashlib, json, os, shutil
+import numpy as np
+
+def normalise_constraints(val):
+    """Convert reading constraints into JSON compatible representation
+    
+    Dictionaries are converted recursively (keys into strings), tuples into
+    lists, sets into sorted lists, numpy scalars into the corresponding 
+    python types and all other objects (e.g. timestamps) into strings.
+    """
+    if isinstance(val, dict):
+        return {str(k) : normalise_constraints(v) for k, v in val.items()}
+    elif isinstance(val, (list, tuple)):
+        return [normalise_constraints(v) for v in val]
+    elif isinstance(val, (set, frozenset)):
+        return sorted([normalise_constraints(v) for v in val], key=str)
+    elif isinstance(val, np.generic) and not isinstance(val, np.datetime64):
+        return val.item()
+    elif val is None or isinstance(val, (bool, int, float, str)):
+        return val
+    return str(val)
+
+def constraints_hash(constraints):
+    """Hash of (normalised) reading constraints used in cache entry names"""
+    s = json.dumps(normalise_constraints(constraints), sort_keys=True)
+    return hashlib.sha1(s.encode('utf-8')).hexdigest()[:16]
 
 # TODO: Write data attribute list contains_vars in header of pickled file and
 # check if variables match the request
 class CacheHandlerUngridded(object):
     """Interface for reading and writing of cache files
     
-    Cache filename mask is 
+    Each cache entry is a directory with name mask
+    
+    <dataset_to_read>_<var>
+    
+    e.g. EBASMC_scatc550aer
+    
+    If the data is read with additional reading options or constraints, a 
+    hash of these is appended to the name (cf. :func:`constraints_hash`), 
+    e.g. EBASMC_scatc550aer_3f2a8c1d9e0b7a64.
+    
+    that contains the cache header (:attr:`HEAD_FILE`, JSON) and the 
+    single variable :class:`UngriddedData` object as written by 
+    :func:`UngriddedData.to_disk` (one numpy binary file per data column and
+    a sidecar file containing metadata and indices). The columns are memory
+    mapped when loading (cf. :attr:`MMAP_MODE`), so that loading can be 
+    restricted to a time interval or subset of stations without reading the 
+    rest of the data (cf. :func:`check_and_load`).
     
-    <dataset_to_read>_<var>.pkl
+    For reading classes that support it (cf. 
+    :attr:`ReadUngriddedBase.SUPPORTS_FILE_UPDATES`), the cache entry further
+    contains the modification times of all source files 
+    (:attr:`SOURCES_FILE`). If the data directory has changed, only new or 
+    modified files are then read and the corresponding metadata blocks are 
+    replaced in the cached data (cf. :func:`update`).
     
-    e.g. EBASMC_scatc550aer.pkl
+    Cache entries are written atomically and locked while being read or 
+    written, and the cache directory is pruned if its size exceeds 
+    :attr:`pyaerocom.config.Config.CACHE_MAX_SIZE_MB` (cf. 
+    :mod:`pyaerocom.io.cache_manager`).
     
     Attributes
     ----------
     reader : ReadUngriddedBase
         reading class for dataset
+    cache_dir : str, optional
+        cache directory (default is :attr:`CACHE_DIR`)
+    **constraints
+        reading options and constraints passed to :func:`read` method of 
+        reader
     loaded_data : dict
         dictionary containing successfully loaded instances of single variable
         :class:`UngriddedData` objects (keys are variable names)
     """
-    __version__ = '1.00'
+    __version__ = '2.05'
     #: Directory of cache files
     try:
         CACHE_DIR = const.CACHEDIR
@@ -40,18 +98,49 @@ class CacheHandlerUngridded(object):
     CACHE_HEAD_KEYS = ['pyaerocom_version',
                        'newest_file_in_read_dir',
                        'newest_file_date_in_read_dir',
+                       'read_dir_fingerprint',
                        'data_revision', 
                        'reader_version', 
                        'ungridded_data_version', 
-                       'cacher_version']
+                       'cacher_version',
+                       'read_constraints']
     
-    def __init__(self, reader=None, cache_dir=None, **kwargs):
+    #: Cache header keys that are related to the content of the data 
+    #: directory. If only these are outdated, cached data may be updated
+    #: incrementally (cf. :func:`update`)
+    DATA_DIR_HEAD_KEYS = ['newest_file_in_read_dir',
+                          'newest_file_date_in_read_dir',
+                          'read_dir_fingerprint']
+    
+    #: Name of cache header file in cache directories
+    HEAD_FILE = cache_manager.HEAD_FILE
+    
+    #: Name of file containing modification times of source files 
+    SOURCES_FILE = 'cache_sources.json'
+    
+    #: Mode for memory mapping of data columns when loading cached data (cf.
+    #: :func:`numpy.load`). Default is copy-on-write, that is, loaded data 
+    #: can be modified in memory without changing the cache files. If None,
+    #: the cached data is loaded into memory entirely.
+    MMAP_MODE = 'c'
+    
+    #: If True, the data directory is scanned on each check of the cache, 
+    #: which also detects files that were overwritten in place. Else, the 
+    #: persisted manifest of the directory is re-used as long as the 
+    #: modification time of the directory is unchanged (cf. 
+    #: :mod:`pyaerocom.io.cache_manifest`)
+    FULL_DIR_CHECK = False
+    
+    def __init__(self, reader=None, cache_dir=None, **constraints):
         self._reader = None
         self.reader = reader
         
         self.loaded_data = {}
         
+        self._manifest = None
+        self._sources = None
         self._cache_dir = cache_dir
+        self._constraints = constraints
         
     @property
     def reader(self):
@@ -72,6 +161,8 @@ class CacheHandlerUngridded(object):
                 raise TypeError('Invalid input for reader')
         self._reader = val
         self.loaded_data = {}
+        self._manifest = None
+        self._sources = None
         
     @property
     def cache_dir(self):
@@ -100,51 +191,135 @@ class CacheHandlerUngridded(object):
         """Data directory of the associated dataset"""
         return self.reader.DATASET_PATH        
         
+    @property
+    def constraints(self):
+        """Normalised reading options and constraints of cache entries
+        
+        cf. :func:`ReadUngriddedBase.get_cache_constraints`
+        """
+        return normalise_constraints(
+                self.reader.get_cache_constraints(**self._constraints))
+    
     def file_name(self, var_name):
-        """File name of cache file"""
+        """Name of cache entry (directory)"""
         name = '_'.join([self.dataset_to_read, var_name])
-        return name + '.pkl'
+        constraints = self.constraints
+        if len(constraints) > 0:
+            name = '_'.join([name, constraints_hash(constraints)])
+        return name
     
     def file_path(self, var_name):
-        """File path of cache file"""
+        """Path of cache entry (directory)"""
         return os.path.join(self.cache_dir, self.file_name(var_name))
     
-    def _check_pkl_head_vs_database(self, in_handle):
+    @property
+    def manifest_dir(self):
+        """Directory where manifests of data directories are stored
+        
+        None, if cache directory is not available (manifests are then not 
+        persisted, cf. :mod:`pyaerocom.io.cache_manifest`)
+        """
+        try:
+            return os.path.join(self.cache_dir, MANIFEST_DIR_NAME)
+        except FileNotFoundError:
+            return None
+        
+    @property
+    def dir_manifest(self):
+        """Manifest of data directory (cf. :func:`get_dir_manifest`)
+        
+        Retrieved once per instance, that is, all cache checks and writes of
+        this handler refer to the state of the data directory at the first
+        access (i.e. before any data is read).
+        """
+        if self._manifest is None:
+            try:
+                self._manifest = get_dir_manifest(self.data_dir, 
+                                                  self.manifest_dir,
+                                                  self.FULL_DIR_CHECK)
+            except Exception as e:
+                raise AerocomConnectionError('Failed to establish connection '
+                                             'to data server. Reason: {}'
+                                             .format(repr(e)))
+        return self._manifest
+    
+    def _read_head(self, path):
+        with open(os.path.join(path, self.HEAD_FILE), 'r') as f:
+            return json.load(f)
+    
+    def _outdated_head_keys(self, head):
         current = self.cache_meta_info()
-        head = pickle.load(in_handle)
         if not isinstance(head, dict):
             raise CacheReadError('Invalid cache file')
+        outdated = []
         for k, v in head.items():
             if not k in current:
                 raise CacheReadError('Invalid cache header key: {}'.format(k))
             elif not v == current[k]:
                 const.print_log.info('{} is outdated (value: {}). Current '
                                      'value: {}'.format(k, v, current[k]))
-                return False
-        return True
+                outdated.append(k)
+        return outdated
+    
+    def _check_head_vs_database(self, head):
+        return len(self._outdated_head_keys(head)) == 0
+    
+    def _can_update(self, var_name, outdated_keys):
+        if not self.reader.SUPPORTS_FILE_UPDATES:
+            return False
+        elif len(self.constraints) > 0:
+            return False
+        elif not os.path.isfile(os.path.join(self.file_path(var_name), 
+                                             self.SOURCES_FILE)):
+            return False
+        return all([k in self.DATA_DIR_HEAD_KEYS for k in outdated_keys])
+    
+    def _source_file_mtimes(self):
+        # retrieved once per instance, cf. dir_manifest
+        if self._sources is None:
+            self._sources = file_mtimes(self.data_dir, self.reader._FILEMASK)
+        return self._sources
+    
+    def snapshot(self):
+        """Retrieve state of data directory for writing of cache entries
+        
+        Should be called before reading data that is supposed to be written
+        to the cache, so that files modified while reading are detected in 
+        the next cache check. The state is retrieved once per instance and 
+        used by :func:`write`.
+        
+        Returns
+        -------
+        dict
+            cache header (cf. :func:`cache_meta_info`)
+        dict or None
+            modification times of source files, None if reader does not 
+            support incremental updates (cf. :func:`update`)
+        """
+        sources = None
+        if self.reader.SUPPORTS_FILE_UPDATES:
+            sources = self._source_file_mtimes()
+        return self.cache_meta_info(), sources
     
     def cache_meta_info(self):
         """Dictionary containing relevant caching meta-info"""
-        try:
-            newest = max(glob.iglob(os.path.join(self.data_dir, '*')), 
-                         key=os.path.getctime)
-            newest_date = os.path.getctime(newest)
-        except Exception as e:
-            raise AerocomConnectionError('Failed to establish connection to '
-                                         'data server. Reason: {}'.repr(e))
+        manifest = self.dir_manifest
         d = dict.fromkeys(self.CACHE_HEAD_KEYS)
         from pyaerocom import __version__
         
         d['pyaerocom_version'] = __version__
-        d['newest_file_in_read_dir'] = newest
-        d['newest_file_date_in_read_dir'] = newest_date
+        d['newest_file_in_read_dir'] = manifest['newest_file']
+        d['newest_file_date_in_read_dir'] = manifest['newest_mtime']
+        d['read_dir_fingerprint'] = manifest['fingerprint']
         d['data_revision'] = self.reader.data_revision
         d['reader_version'] = self.reader.__version__
         d['ungridded_data_version'] = UngriddedData.__version__ 
         d['cacher_version'] = self.__version__
+        d['read_constraints'] = self.constraints
         return d
     
-    def check_and_load(self, var_name):
+    def check_and_load(self, var_name, start=None, stop=None, 
+                       **filter_attributes):
         """Check if cache file exists and load
         
         Note
@@ -153,6 +328,21 @@ class CacheHandlerUngridded(object):
         outdated against pyaerocom updates, then it will be removed (the latter
         only if :attr:`pyaerocom.const.RM_CACHE_OUTDATED` is True).
         
+        Parameters
+        ----------
+        var_name : str
+            variable name
+        start : optional
+            if provided, only data from this time onwards is loaded (cf. 
+            :func:`UngriddedData.filter_by_time`)
+        stop : optional
+            if provided (together with start), only data until this time is 
+            loaded
+        **filter_attributes
+            metadata filters (e.g. station_name, latitude, longitude), if 
+            provided, only the data of matching stations is loaded (cf. 
+            :func:`UngriddedData.filter_by_meta`)
+        
         Returns
         -------
         bool
@@ -172,52 +362,107 @@ class CacheHandlerUngridded(object):
         except FileNotFoundError as e:
             logger.warning(repr(e))
             return False
+        name = self.file_name(var_name)
         
-        if not os.path.isfile(fp):
+        if not os.path.isdir(fp):
+            cache_manager.record_access(self.cache_dir, name, hit=False)
             logger.info('No cache file available for {}, {}'
                         .format(self.dataset_to_read, var_name))
             return False
     
         
         delete_existing = const.RM_CACHE_OUTDATED
-                
-        in_handle = open(fp, 'rb')
-        
         
+        data = None
         try:
-            ok = self._check_pkl_head_vs_database(in_handle)
+            outdated = None
+            with CacheLock(self.cache_dir, name):
+                if os.path.isdir(fp): # may have been removed in the meantime
+                    outdated = self._outdated_head_keys(self._read_head(fp))
+                    if len(outdated) == 0:
+                        data = UngriddedData.from_disk(
+                                fp, mmap_mode=self.MMAP_MODE)
+            # note: update acquires the locks itself
+            if outdated and self._can_update(var_name, outdated):
+                data = self.update(var_name)
         except Exception as e:
-            ok = False
             delete_existing = True
             logger.exception('File error in cached data file {}. File will '
                              'be removed and data reloaded'
                              'Error: {}'.format(fp, repr(e)))
-        if not ok:
+        cache_manager.record_access(self.cache_dir, name, 
+                                    hit=data is not None)
+        if data is None:
             # TODO: Should we delete the cache file if it is outdated ???
             logger.info('Aborting reading cache file {}. Aerocom database '
                         'or pyaerocom version has changed compared to '
                         'cached version'
-                        .format(self.file_name(var_name)))
-            in_handle.close()
+                        .format(name))
             if delete_existing: #something was wrong
                 const.print_log.info('Deleting outdated cache file: {}'
                                      .format(fp))
-                os.remove(self.file_path(var_name))
+                cache_manager.remove_entry(self.cache_dir, name)
             return False
+        cache_manager.touch_entry(fp)
         
         # everything is okay
-        data = pickle.load(in_handle)
-        if not isinstance(data, UngriddedData):
-            raise TypeError('Unexpected data type stored in cache file, need '
-                            'instance of UngriddedData, got {}'
-                            .format(type(data)))
+        if len(filter_attributes) > 0:
+            data = data.filter_by_meta(**filter_attributes)
+        if start is not None:
+            data = data.filter_by_time(start, stop)
             
         self.loaded_data[var_name] = data
         logger.info('Successfully loaded data for {} from Cache'
                     .format(self.dataset_to_read))
         return True
     
-    def write(self, data, var_name=None):
+    def update(self, var_name):
+        """Update cached data of a variable with new or modified files
+        
+        Compares the modification times of the files in the data directory 
+        with the ones stored in the cache entry, reads only the new or 
+        modified files and replaces the corresponding metadata blocks in the
+        cached data (blocks of files that were removed are dropped). The 
+        updated data is written to the cache.
+        
+        Parameters
+        ----------
+        var_name : str
+            variable name
+            
+        Returns
+        -------
+        UngriddedData
+            updated data object
+        """
+        fp = self.file_path(var_name)
+        with CacheLock(self.cache_dir, self.file_name(var_name)):
+            with open(os.path.join(fp, self.SOURCES_FILE), 'r') as f:
+                sources = json.load(f)
+            # the cache entry is rewritten below, thus load into memory
+            cached = UngriddedData.from_disk(fp, mmap_mode=None)
+        # state of data directory before reading, which is written with the
+        # updated data
+        meta, current = self.snapshot()
+        changed = sorted([f for f, mtime in current.items() 
+                          if not sources.get(f) == mtime])
+        removed = [f for f in sources if not f in current]
+        const.print_log.info('Updating cached {} data of {}: {} new or '
+                             'modified files, {} removed files'
+                             .format(var_name, self.dataset_to_read, 
+                                     len(changed), len(removed)))
+        drop = set(changed + removed)
+        keep = [meta_idx for meta_idx, meta in cached.metadata.items() 
+                if not meta.get('filename') in drop]
+        objs = [cached._extract_meta_blocks(keep)]
+        if len(changed) > 0:
+            files = [os.path.join(self.data_dir, f) for f in changed]
+            objs.append(self.reader.read(var_name, files=files))
+        data = UngriddedData.concat(objs, copy=False)
+        self.write(data, var_name, meta=meta, sources=current)
+        return data
+    
+    def write(self, data, var_name=None, meta=None, sources=None):
         """Write single-variable instance of UngriddedData to cache
         
         Parameters
@@ -227,8 +472,18 @@ class CacheHandlerUngridded(object):
         var_name : str, optional
             name of variable that is supposed to be stored (only required if
             input `data` contains more than one variable)
+        meta : dict, optional
+            cache header of the data, if None, the state of the data 
+            directory retrieved by this instance is used (cf. 
+            :func:`snapshot`)
+        sources : dict, optional
+            modification times of source files the data was read from, if
+            None, the ones retrieved by this instance are used
         """
-        meta = self.cache_meta_info()
+        if meta is None:
+            meta = self.cache_meta_info()
+        if sources is None and self.reader.SUPPORTS_FILE_UPDATES:
+            sources = self._source_file_mtimes()
         
         if not isinstance(data, UngriddedData):
             raise TypeError('Invalid input, need instance of UngriddedData, '
@@ -259,25 +514,35 @@ class CacheHandlerUngridded(object):
         fp = self.file_path(var_name)
         logger.info('Writing cache file: {}'.format(fp))
         success = True
-        # OutHandle = gzip.open(c__cache_file, 'wb') # takes too much time
-        out_handle = open(fp, 'wb')
-        
+        # write into temporary directory that is renamed on completion, so 
+        # that other processes never see incomplete cache entries
+        tmp = cache_manager.tmp_entry_path(fp)
         try:
-            # write cache header
-            pickle.dump(meta, out_handle, pickle.HIGHEST_PROTOCOL)
             # write data
-            pickle.dump(data, out_handle, pickle.HIGHEST_PROTOCOL)
-    
+            data.to_disk(tmp)
+            # write cache header
+            with open(os.path.join(tmp, self.HEAD_FILE), 'w') as f:
+                json.dump(meta, f)
+            if sources is not None:
+                with open(os.path.join(tmp, self.SOURCES_FILE), 'w') as f:
+                    json.dump(sources, f)
+            with CacheLock(self.cache_dir, self.file_name(var_name), 
+                           exclusive=True):
+                cache_manager.replace_entry(tmp, fp)
         except Exception as e:
             from pyaerocom import print_log
-            print_log.exception('Failed to write cache'.format(repr(e)))
+            print_log.exception('Failed to write cache: {}'.format(repr(e)))
             success=False
         finally:    
-            out_handle.close()
-            if not success:
-                os.remove(self.file_path)
+            if not success and os.path.exists(tmp):
+                shutil.rmtree(tmp)
+        if not success:
+            return
         logger.info('Successfully wrote {} data ({}) to disk!'
                     .format(var_name, self.reader.data_id))
+        if const.CACHE_MAX_SIZE_MB is not None:
+            cache_manager.prune(self.cache_dir, 
+                                max_size_mb=const.CACHE_MAX_SIZE_MB)
         
     def __str__(self):
         return 'Cache handler for {}'.format(self.reader.data_id)
@@ -2,12 +2,53 @@
 # -*- coding: utf-8 -*-
 from pyaerocom import const
 import sqlite3
-import sys
 import os
+import threading
+from collections import OrderedDict as od
+from urllib.request import pathname2url
 from pyaerocom._lowlevel_helpers import BrowseDict
 from pyaerocom.exceptions import DataCoverageError
 from time import time
 
+#: pooled read-only database connections (cf. :func:`get_connection`)
+_CONNECTIONS = {}
+
+#: maximum number of parameters in one SQL query (SQLite default limit is 999
+#: in versions < 3.32)
+MAX_SQL_PARAMS = 900
+
+def get_connection(database):
+    """Get pooled read-only connection to SQLite database
+    
+    Connections are opened in read-only and immutable mode and are kept 
+    open for the remaining session (one connection per database, process 
+    and thread), so that prepared statements can be reused (cf. parameter
+    ``cached_statements`` of :func:`sqlite3.connect`). If the database file
+    is modified, the connection is reopened.
+    
+    Parameters
+    ----------
+    database : str
+        path of SQLite database file
+    
+    Returns
+    -------
+    sqlite3.Connection
+        database connection
+    """
+    database = os.path.abspath(database)
+    mtime = os.stat(database).st_mtime
+    key = (database, os.getpid(), threading.get_ident())
+    item = _CONNECTIONS.get(key)
+    if item is not None:
+        if item[1] == mtime:
+            return item[0]
+        item[0].close()
+    uri = 'file:{}?mode=ro&immutable=1'.format(pathname2url(database))
+    con = sqlite3.connect(uri, uri=True, cached_statements=256)
+    _CONNECTIONS[key] = (con, mtime)
+    return con
+
 class EbasSQLRequest(BrowseDict):
     """Low level dictionary like object for EBAS sqlite queries
     
@@ -50,6 +91,9 @@ class EbasSQLRequest(BrowseDict):
     ----------
     see Attributes
     """
+    #: keys of request attributes that specify value ranges
+    _RANGE_KEYS = ['altitude_range', 'lon_range', 'lat_range']
+    
     def __init__(self, variables=None, start_date=None, stop_date=None, 
                  station_names=None, matrices=None, altitude_range=None, 
                  lon_range=None, lat_range=None, 
@@ -90,6 +134,124 @@ class EbasSQLRequest(BrowseDict):
             raise ValueError("Invalid value encountered, need list, tuple or "
                              "str, got {}".format(type(var)))
             
+    @staticmethod
+    def _var2params(var):
+        if isinstance(var, str):
+            return [var]
+        return list(var)
+    
+    def make_query(self, what="filename", distinct=True, **kwargs):
+        """Translate current class state into parametrised SQL query
+        
+        Other than :func:`make_query_str`, this method returns the query with
+        placeholders and the corresponding parameters separately, which 
+        allows SQLite to reuse prepared statements.
+        
+        Parameters
+        ----------
+        what : :obj:`str` or :obj:`tuple`
+            what columns to retrieve (e.g. comp_name for all variables) from
+            table specified. 
+        distinct : bool
+            return unique files
+        **kwargs
+            update request attributes (e.g. ``lon_range=(30, 60)``)
+        
+        Returns
+        -------
+        tuple
+            2-element tuple containing SQL query string (without trailing 
+            semicolon) and list of parameters
+        """
+        self.update(**kwargs)
+        if not isinstance(what, str): #tuple or list of parameters to be retrieved
+            what = ",".join(what)
+        
+        req = 'select distinct {}' if distinct else 'select {}'
+        req = req.format(what) + (' from variable join station on '
+                                  'station.station_code=variable.station_code')
+        conds, params = [], []
+        def add_in(col, val):
+            vals = self._var2params(val)
+            conds.append('{} in ({})'.format(col, ','.join(['?']*len(vals))))
+            params.extend(vals)
+        def add_range(col, val):
+            low, high = val
+            conds.append('{}>? and {}<?'.format(col, col))
+            params.extend([low, high])
+        
+        if self.station_names is not None:
+            add_in('station_name', self.station_names)
+        if self.altitude_range is not None:
+            add_range('station_altitude', self.altitude_range)
+        if self.lon_range is not None:
+            add_range('station_longitude', self.lon_range)
+        if self.lat_range is not None:
+            add_range('station_latitude', self.lat_range)
+        if self.instrument_types is not None:
+            add_in('instr_type', self.instrument_types)
+        if self.variables is not None:
+            add_in('comp_name', self.variables)
+        if self.stop_date is not None:
+            conds.append('first_end < ?')
+            params.append(str(self.stop_date))
+        if self.start_date is not None:
+            conds.append('last_start > ?')
+            params.append(str(self.start_date))
+        if self.matrices is not None:
+            add_in('matrix', self.matrices)
+        if self.statistics is not None:
+            add_in('statistics', self.statistics)
+        if self.datalevel is not None:
+            conds.append('datalevel=?')
+            params.append(self.datalevel)
+        if conds:
+            req += ' where ' + ' and '.join(conds)
+        return (req, params)
+    
+    def split(self, max_params=MAX_SQL_PARAMS):
+        """Split request into requests with limited number of SQL parameters
+        
+        The longest list of values (e.g. station names) is split until the 
+        query of each request (cf. :func:`make_query`) contains at most 
+        ``max_params`` parameters. The union of the results of the output 
+        requests is the result of this request.
+        
+        Parameters
+        ----------
+        max_params : int
+            maximum number of parameters per query
+            
+        Returns
+        -------
+        list
+            list of :class:`EbasSQLRequest` instances (contains only this 
+            request if no splitting is required)
+            
+        Raises
+        ------
+        ValueError
+            if request cannot be split into queries with at most 
+            ``max_params`` parameters
+        """
+        num = len(self.make_query()[1])
+        if num <= max_params:
+            return [self]
+        lists = [k for k, v in self.items() if isinstance(v, (list, tuple)) 
+                 and not k in self._RANGE_KEYS and len(v) > 1]
+        if len(lists) == 0:
+            raise ValueError('Cannot split EBAS SQL request into queries with '
+                             'at most {} parameters'.format(max_params))
+        key = max(lists, key=lambda k: len(self[k]))
+        vals = list(self[key])
+        half = len(vals) // 2
+        result = []
+        for chunk in (vals[:half], vals[half:]):
+            sub = EbasSQLRequest(**dict(self))
+            sub[key] = chunk
+            result.extend(sub.split(max_params))
+        return result
+    
     def make_file_query_str(self, distinct=True, **kwargs):
         """Wrapper for base method :func:`make_query_str` 
         
@@ -204,7 +366,9 @@ class EbasSQLRequest(BrowseDict):
 class EbasFileIndex(object):
     """EBAS SQLite I/O interface
     
-    Takes care of connection to database and execution of requests
+    Takes care of connection to database and execution of requests. The 
+    database is accessed read-only via pooled connections (cf. 
+    :func:`get_connection`).
     """
     def __init__(self, database=None):
         if database is None:
@@ -213,6 +377,10 @@ class EbasFileIndex(object):
             raise IOError("SQLite database file does not exist")
         self.database = database
        
+    @property
+    def connection(self):
+        """Pooled read-only connection to database"""
+        return get_connection(self.database)
         
     @property
     def ALL_STATION_NAMES(self):
@@ -344,23 +512,24 @@ class EbasFileIndex(object):
     def table_columns(self, table_name):
         req = "select * from {} where 1=0;".format(table_name)
         try:
-            con = sqlite3.connect(self.database)
-            cur = con.cursor()
-            cur.execute(req)
-            #return [f[0] for f in cur.fetchall()]
+            cur = self.connection.execute(req)
             return [f[0] for f in cur.description]
         except sqlite3.Error as e:
-            if con:
-                con.rollback()
-                
-            print("Error: {}".format(repr(e)))
-            sys.exit(1)
-        finally:
-            if con:
-                con.close() 
+            raise IOError('Failed to retrieve columns of table {}: {}'
+                          .format(table_name, repr(e)))
     
     def execute_request_fast(self, request):
-        """Connect to database and retrieve data for input request
+        """Retrieve data for input request
+        
+        Note
+        ----
+        Same as :func:`execute_request` (which now uses pooled connections
+        and parametrised queries), kept for backwards compatibility
+        """
+        return self.execute_request(request)
+                
+    def execute_request(self, request):
+        """Retrieve data for input request from database
         
         Parameters
         ----------
@@ -375,94 +544,89 @@ class EbasFileIndex(object):
             parameters (usually one, can be specified in 
             :func:`make_query_str` using argument ``what``)
             
+        Raises
+        ------
+        IOError
+            if input is invalid or if the query fails
         """
-        def _result_iter(cursor, arraysize=10):
-            """An iterator that uses fetchmany to keep memory usage down
-            
-            Found here: http://code.activestate.com/recipes/137270-use-generators-
-            for-fetching-large-db-record-sets/
-            """
-            while True:
-                results = cursor.fetchmany(arraysize)
-                if not results:
-                    break
-                for result in results:
-                    yield result
-                    
         if isinstance(request, EbasSQLRequest):
-            request = request.make_query_str()
-        if not isinstance(request, str):
+            queries = [req.make_query() for req in request.split()]
+        elif isinstance(request, str):
+            queries = [(request, [])]
+        else:
             raise IOError("Invalid input: Need instance of class "
                           "EbasSQLRequest or SQL request string for query")
+        t0 = time()
+        files = []
+        for sql, params in queries:
+            files.extend(self._execute(sql, params))
+        if len(queries) > 1: # remove duplicates of split requests
+            files = list(od.fromkeys(files))
+        const.logger.info('Elapsed time fetching EBAS datafiles: {:.1f} s'
+                          .format(time() - t0))
+        return files
+    
+    def _execute(self, sql, params):
         try:
-            con = sqlite3.connect(self.database)
-            cur = con.cursor()
-            t0 = time()
-            cur.execute(request)
-            print('Exec.: ', time() - t0, 's')
-            result = []
-            while True:
-                _r = cur.fetchmany(10000)
-                if not _r:
-                    break
-                print(_r)
-                result.extend(_r)
-            return result
-            #return [f for f in _result_iter(cur)]
-            #return [f for f in cur.fetchall()]
+            return self.connection.execute(sql, params).fetchall()
         except sqlite3.Error as e:
-            if con:
-                con.rollback()
-                
-            print("Error: {}".format(repr(e)))
-            sys.exit(1)
-        finally:
-            if con:
-                con.close()
-                
-    def execute_request(self, request):
-        """Connect to database and retrieve data for input request
+            raise IOError('Error fetching EBAS filenames from SQLite '
+                          'database: {}'.format(repr(e)))
+    
+    def get_files_vars(self, requests):
+        """Get files for multiple variables (in as few queries as possible)
+        
+        The file requests for all variables are combined into one query 
+        (or a few, if the number of parameters exceeds 
+        :attr:`MAX_SQL_PARAMS`, requests with too many parameters are split,
+        cf. :func:`EbasSQLRequest.split`).
         
         Parameters
         ----------
-        request : :obj:`EbasSQLRequest` or :obj:`str`
-            request specifications
-            
+        requests : dict
+            keys are variable names (e.g. AeroCom variable names), values 
+            are the corresponding requests (:class:`EbasSQLRequest`)
+        
         Returns
         -------
-        list 
-            list of tuples containing the retrieved results. The number of 
-            items in each tuple corresponds to the number of requested 
-            parameters (usually one, can be specified in 
-            :func:`make_query_str` using argument ``what``)
-            
+        OrderedDict
+            keys are file names (ordered by variables and file name), values 
+            are lists of variables (in order of input requests) that match 
+            the file
         """
-        if isinstance(request, EbasSQLRequest):
-            request = request.make_query_str()
-        if not isinstance(request, str):
-            raise IOError("Invalid input: Need instance of class "
-                          "EbasSQLRequest or SQL request string for query")
-        try:
-            con = sqlite3.connect(self.database)
-            cur = con.cursor()
-            t0 = time()
-            cur.execute(request)
-            files = [f for f in cur.fetchall()]
-            const.logger.info('Elapsed time fetching EBAS datafiles: {:.1f} s'
-                              .format(time() - t0))
-            #return [f[0] for f in cur.fetchall()]
-            return files
-        except sqlite3.Error as e:
-            if con:
-                con.rollback()
-                
-            const.logger.exception('Error fetching EBAS filenames from SQLite '
-                                   'database: {}'.format(repr(e)))
-            sys.exit(1)
-        finally:
-            if con:
-                con.close() 
-                
+        queries, params = [], []
+        results = []
+        def execute():
+            results.extend(self._execute(' union all '.join(queries), params))
+        t0 = time()
+        for var, req in requests.items():
+            # requests with too many parameters are split (1 parameter is 
+            # required for the variable name)
+            for sub in req.split(MAX_SQL_PARAMS - 1):
+                sql, _params = sub.make_query(what='filename, ?')
+                if queries and len(params) + len(_params) + 1 > MAX_SQL_PARAMS:
+                    execute()
+                    queries, params = [], []
+                queries.append(sql)
+                params.append(var)
+                params.extend(_params)
+        if queries:
+            execute()
+        const.logger.info('Elapsed time fetching EBAS datafiles: {:.1f} s'
+                          .format(time() - t0))
+        
+        files_vars = {}
+        for file, var in results:
+            if not file in files_vars:
+                files_vars[file] = set()
+            files_vars[file].add(var)
+        mapping = od()
+        for var in requests:
+            for file in sorted([f for f, v in files_vars.items() if var in v]):
+                if not file in mapping:
+                    mapping[file] = [v for v in requests if v in files_vars[file]]
+        return mapping
+    
     def get_file_names(self, request):
         """Get all files that match the request specifications
         
@@ -498,12 +662,12 @@ if __name__=="__main__":
                          station_names='Alert')
     
     t0 = time()
-    files = db.execute_request_fast(req) 
+    files = db.execute_request(req) 
     t1=time()
     
     print(t1 - t0,  's')
     
-    files1 = db.execute_request(req)
+    files1 = db.get_files_vars({'scatc550aer' : req})
     
     t2=time()
     
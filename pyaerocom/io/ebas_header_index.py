@@ -0,0 +1,414 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Local index of headers of EBAS NASA Ames files
+
+Deciding whether an EBAS file contains a column that matches the import
+settings of a variable (component name, matrix, statistics, wavelength, cf.
+:func:`ReadEbas.find_var_cols`) only requires the file header. The
+:class:`EbasHeaderIndex` stores the parsed headers of all files that were
+read (or scanned, cf. :func:`EbasHeaderIndex.scan`) in a local SQLite
+database, so that files that do not contain any usable column can be
+rejected without opening them.
+"""
+import os
+import pickle
+import re
+import sqlite3
+from datetime import datetime
+
+import numpy as np
+
+from pyaerocom import const, logger
+from pyaerocom.io.ebas_nasa_ames import EbasNasaAmesFile, EbasColDef
+
+#: numpy datetime64 units of EBAS period codes (cf. :func:`get_stopdate`)
+PERIOD_UNITS = {'mn' : 'm', 
+                'h'  : 'h', 
+                'd'  : 'D', 
+                'w'  : 'W', 
+                'mo' : 'M', 
+                'y'  : 'Y'}
+
+def get_stopdate(startdate, period_code):
+    """Compute end of period covered by an EBAS file from its header
+
+    Parameters
+    ----------
+    startdate : str
+        start date as specified in EBAS header (YYYYmmddHHMMSS)
+    period_code : str
+        period code as specified in EBAS header (e.g. 1y, 3mo)
+
+    Returns
+    -------
+    str
+        end date (YYYYmmddHHMMSS) or None if input could not be interpreted
+    """
+    match = re.fullmatch(r'(\d*)([a-z]+)', str(period_code).strip())
+    if match is None or not match.group(2) in PERIOD_UNITS:
+        return None
+    try:
+        start = np.datetime64(datetime.strptime(startdate, '%Y%m%d%H%M%S'),
+                              's')
+    except (TypeError, ValueError):
+        return None
+    num = int(match.group(1)) if match.group(1) else 1
+    base = start.astype('datetime64[{}]'.format(PERIOD_UNITS[match.group(2)]))
+    stop = ((base + num).astype('datetime64[s]') + 
+            (start - base.astype('datetime64[s]')))
+    return stop.astype(datetime).strftime('%Y%m%d%H%M%S')
+
+class EbasHeaderIndex(object):
+    """SQLite index of EBAS NASA Ames file headers
+
+    Each file is stored with its modification time and size, the index
+    entry of a file is only used if both are unchanged. The database
+    contains 2 tables:
+
+    - *files*: one row per file containing file path, station code and
+      name, matrix, resolution code, period code, start and stop date (cf.
+      :func:`get_stopdate`) and reference date of the data and the pickled
+      header (cf. :func:`get_header`).
+    - *columns*: one row per data column containing file path, column
+      number, component name, matrix, statistics, unit and wavelength
+      (cf. :func:`find_files`).
+
+    Parameters
+    ----------
+    index_file : :obj:`str`, optional
+        path of SQLite database file (default is :attr:`FILE_NAME` in
+        :attr:`pyaerocom.const.CACHEDIR`)
+
+    Raises
+    ------
+    IOError
+        if no index file is provided and the cache directory is not
+        accessible
+    """
+    __version__ = '1.01'
+
+    #: Name of index file in cache directory
+    FILE_NAME = 'ebas_header_index.sqlite3'
+
+    #: Timeout in s for waiting for locks of other processes
+    TIMEOUT = 60
+
+    #: Number of headers that are added at once in :func:`scan`
+    SCAN_BATCH_SIZE = 500
+
+    def __init__(self, index_file=None):
+        if index_file is None:
+            cache_dir = const.CACHEDIR
+            if cache_dir is None or not os.path.exists(cache_dir):
+                raise IOError('Cache directory does not exist: {}'
+                              .format(cache_dir))
+            index_file = os.path.join(cache_dir, self.FILE_NAME)
+        self.index_file = index_file
+        self._con = None
+        self._pid = None
+
+    @property
+    def con(self):
+        """Connection to index database (one per process)"""
+        if self._con is None or not self._pid == os.getpid():
+            self._con = self._connect()
+            self._pid = os.getpid()
+        return self._con
+
+    def _connect(self):
+        con = sqlite3.connect(self.index_file, timeout=self.TIMEOUT)
+        con.execute('pragma journal_mode=wal')
+        con.execute('pragma synchronous=normal')
+        with con:
+            con.execute('create table if not exists info '
+                        '(key text primary key, value text)')
+            row = con.execute('select value from info where key=?',
+                              ('version',)).fetchone()
+            if row is None or not row[0] == self.__version__:
+                con.execute('drop table if exists files')
+                con.execute('drop table if exists columns')
+                con.execute('insert or replace into info values (?, ?)',
+                            ('version', self.__version__))
+            con.execute('create table if not exists files '
+                        '(path text primary key, mtime real, size integer, '
+                        'station_code text, station_name text, matrix text, '
+                        'resolution_code text, period_code text, '
+                        'startdate text, stopdate text, ref_date text, '
+                        'header blob)')
+            con.execute('create table if not exists columns '
+                        '(path text, colnum integer, name text, '
+                        'matrix text, statistics text, unit text, '
+                        'wavelength_nm real)')
+            con.execute('create index if not exists columns_path on '
+                        'columns (path)')
+            con.execute('create index if not exists columns_name on '
+                        'columns (name)')
+        return con
+
+    @staticmethod
+    def encode_header(header):
+        """Encode header of file object as bytes (e.g. for transfer between
+        processes, cf. :func:`decode_header`)"""
+        return pickle.dumps(dict(head_fix=dict(header.head_fix),
+                                 meta=dict(header.meta),
+                                 var_defs=[dict(x) for x in header.var_defs],
+                                 data_header=list(header.data_header)))
+
+    @staticmethod
+    def decode_header(path, blob):
+        """Create file object containing only the header from encoded header
+        (cf. :func:`encode_header`)"""
+        info = pickle.loads(blob)
+        header = EbasNasaAmesFile()
+        header.file = path
+        header._head_fix.update(info['head_fix'])
+        header._meta.update(info['meta'])
+        header._data_header = info['data_header']
+        for item in info['var_defs']:
+            col = EbasColDef(item['name'], item['is_var'], item['is_flag'],
+                             item['unit'])
+            col.update(item)
+            header._var_defs.append(col)
+        return header
+
+    def get_header(self, path):
+        """Get header of file from index
+
+        Parameters
+        ----------
+        path : str
+            file path
+
+        Returns
+        -------
+        EbasNasaAmesFile
+            file object containing only the header (no data), or None if
+            file is not in index or if it was modified after indexing
+        """
+        try:
+            st = os.stat(path)
+            row = self.con.execute('select mtime, size, header from files '
+                                   'where path=?', (path,)).fetchone()
+        except Exception as e:
+            logger.warning('Failed to access EBAS header index: {}'
+                           .format(repr(e)))
+            return None
+        if row is None or not (row[0] == st.st_mtime and
+                               row[1] == st.st_size):
+            return None
+        try:
+            return self.decode_header(path, row[2])
+        except Exception as e:
+            logger.warning('Failed to decode header of {} in EBAS header '
+                           'index: {}'.format(path, repr(e)))
+            return None
+
+    def contains(self, path):
+        """Check if file is in index and unchanged since indexing"""
+        try:
+            st = os.stat(path)
+            row = self.con.execute('select mtime, size from files where '
+                                   'path=?', (path,)).fetchone()
+        except Exception:
+            return False
+        return (row is not None and row[0] == st.st_mtime and
+                row[1] == st.st_size)
+
+    def _insert(self, path, header):
+        st = os.stat(path)
+        meta = header.meta
+        self.con.execute('delete from columns where path=?', (path,))
+        self.con.execute('insert or replace into files values '
+                         '(?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                         (path, st.st_mtime, st.st_size,
+                          meta.get('station_code'),
+                          meta.get('station_name'),
+                          meta.get('matrix'),
+                          meta.get('resolution_code'),
+                          meta.get('period_code'),
+                          meta.get('startdate'),
+                          get_stopdate(meta.get('startdate'),
+                                       meta.get('period_code')),
+                          str(header.head_fix['ref_date']),
+                          self.encode_header(header)))
+        rows = []
+        for colnum, col in enumerate(header.var_defs):
+            if not col.is_var:
+                continue
+            try:
+                wvl = col.get_wavelength_nm()
+            except Exception:
+                wvl = None
+            rows.append((path, colnum, col.name,
+                         col.get('matrix', meta.get('matrix')),
+                         col.get('statistics', meta.get('statistics')),
+                         col.get('unit'), wvl))
+        self.con.executemany('insert into columns values '
+                             '(?, ?, ?, ?, ?, ?, ?)', rows)
+
+    def add(self, path, header):
+        """Add (or update) header of file in index
+
+        Parameters
+        ----------
+        path : str
+            file path
+        header : EbasNasaAmesFile
+            file object (at least header needs to be loaded)
+
+        Returns
+        -------
+        bool
+            True if header was added, else False
+        """
+        try:
+            with self.con:
+                self._insert(path, header)
+        except Exception as e:
+            logger.warning('Failed to add {} to EBAS header index: {}'
+                           .format(path, repr(e)))
+            return False
+        return True
+
+    def add_many(self, headers):
+        """Add (or update) headers of multiple files in one transaction
+
+        Parameters
+        ----------
+        headers : dict
+            keys are file paths, values are file objects
+            (:class:`EbasNasaAmesFile`, at least header needs to be loaded)
+
+        Returns
+        -------
+        int
+            number of files that were added
+        """
+        num = 0
+        try:
+            with self.con:
+                for path, header in headers.items():
+                    try:
+                        self._insert(path, header)
+                    except Exception as e:
+                        logger.warning('Failed to add {} to EBAS header '
+                                       'index: {}'.format(path, repr(e)))
+                        continue
+                    num += 1
+        except Exception as e:
+            logger.warning('Failed to add headers to EBAS header index: {}'
+                           .format(repr(e)))
+            return 0
+        return num
+
+    def scan(self, files):
+        """Read and index headers of all files that are not (or outdated) in
+        the index
+
+        Parameters
+        ----------
+        files : list
+            list of file paths
+
+        Returns
+        -------
+        int
+            number of files that were added to the index
+        """
+        num = 0
+        headers = {}
+        for path in files:
+            if self.contains(path):
+                continue
+            try:
+                headers[path] = EbasNasaAmesFile(path, only_head=True,
+                                                 quality_check=False)
+            except Exception as e:
+                logger.warning('Failed to read header of {}: {}'
+                               .format(path, repr(e)))
+                continue
+            if len(headers) >= self.SCAN_BATCH_SIZE:
+                num += self.add_many(headers)
+                headers = {}
+        if len(headers) > 0:
+            num += self.add_many(headers)
+        const.print_log.info('Added {} files to EBAS header index'
+                             .format(num))
+        return num
+
+    def get_time_range(self, path):
+        """Get start and stop date of period covered by an indexed file
+
+        Parameters
+        ----------
+        path : str
+            file path
+
+        Returns
+        -------
+        tuple
+            start and stop date (YYYYmmddHHMMSS, stop date is None if it
+            could not be inferred from the header, cf. :func:`get_stopdate`)
+            or None, if file is not in index
+        """
+        row = self.con.execute('select startdate, stopdate from files where '
+                               'path=?', (path,)).fetchone()
+        if row is None:
+            return None
+        return tuple(row)
+
+    def find_files(self, names, matrices=None, statistics=None, start=None,
+                   stop=None):
+        """Find indexed files containing data columns of certain components
+
+        Parameters
+        ----------
+        names : list
+            EBAS component names (e.g.
+            ``['aerosol_light_scattering_coefficient']``)
+        matrices : :obj:`list`, optional
+            accepted matrices (e.g. ``['aerosol', 'pm10']``)
+        statistics : :obj:`list`, optional
+            accepted statistics (e.g. ``['arithmetic mean']``)
+        start : :obj:`str`, optional
+            if provided, only files covering a period that ends after this
+            date (YYYYmmddHHMMSS) are returned
+        stop : :obj:`str`, optional
+            if provided, only files covering a period that starts before this
+            date (YYYYmmddHHMMSS) are returned
+
+        Returns
+        -------
+        list
+            sorted list of file paths
+        """
+        req = ('select distinct c.path from columns c join files f on '
+               'c.path=f.path where c.name in ({})'.format(
+                       ', '.join(['?'] * len(names))))
+        args = list(names)
+        for key, vals in (('matrix', matrices), ('statistics', statistics)):
+            if vals is not None:
+                req += ' and c.{} in ({})'.format(key,
+                                                  ', '.join(['?'] * len(vals)))
+                args.extend(vals)
+        if start is not None:
+            req += ' and (f.stopdate is null or f.stopdate > ?)'
+            args.append(start)
+        if stop is not None:
+            req += ' and (f.startdate is null or f.startdate < ?)'
+            args.append(stop)
+        return sorted([row[0] for row in self.con.execute(req, args)])
+
+    def __getstate__(self):
+        # connections cannot be pickled (e.g. for worker processes)
+        state = self.__dict__.copy()
+        state['_con'] = None
+        return state
+
+    def __len__(self):
+        return self.con.execute('select count(*) from files').fetchone()[0]
+
+    def __str__(self):
+        return 'EBAS header index {} ({} files)'.format(self.index_file,
+                                                        len(self))
@@ -381,6 +381,7 @@ class EbasNasaAmesFile(NasaAmesHeader):
         super(EbasNasaAmesFile, self).__init__(**kwargs)
         self._data_header = [] #Header line of data block
         self._data = [] #data block
+        self._data_offset = None #position of data block in file
         
         self.time_stamps = None
         
@@ -762,28 +763,54 @@ class EbasNasaAmesFile(NasaAmesHeader):
             :func:`_quality_check`)
         """
         logger.info("Reading NASA Ames file:\n{}".format(nasa_ames_file))
+        self.file = nasa_ames_file
+        with open(nasa_ames_file) as f:
+            self._read_header(f)
+            if only_head:
+                return
+            logger.debug("REACHED DATA BLOCK")
+            data = self._read_data_block(f)
+        
+        data[:, 1:] = data[:, 1:] * np.asarray(self.mul_factors)
+        
+        self._data = data
+        if replace_invalid_nan:
+            dep_dat = data[:, 1:]
+            for i, val in enumerate(np.floor(self.vals_invalid)):
+                col = dep_dat[:, i]
+                cond = np.floor(col) == val
+                col[cond] = np.nan
+                dep_dat[:, i] = col
+
+            data[:, 1:] = dep_dat
+        self._data = data
+        
+        if convert_timestamps:
+            self.compute_time_stamps()
+            
+        self.assign_flagcols()
+        self.init_flags(evaluate=evaluate_flags)
+        
+        if quality_check:
+            self._quality_check()
+            
+    def _read_header(self, f):
+        """Read file header (everything before the data block)
+        
+        Reads lines from the input file object until the last header line 
+        (containing the column names of the data block) and stores the 
+        position of the first data line in :attr:`_data_offset`.
+        
+        Parameters
+        ----------
+        f 
+            file object opened in text mode
+        """
         lc = 0 #line counter
-        dc = 0 #data block line counter
         mc = 0 #meta block counter
         END_VAR_DEF = np.nan #will be set (info stored in header)
-        IN_DATA = False 
-        data = []
-        _insert_invalid = None
-        self.file = nasa_ames_file
-        for line in open(nasa_ames_file):
-            #print(lc, _NUM_FIXLINES, line)
-            if IN_DATA: #in data block (end of file)
-                if dc == 0:
-                    logger.debug(line)
-                try:
-                    data.append(tuple([float(x.strip()) for x in line.strip().split()]))
-                    #data.append([float(x.strip()) for x in line.strip().split()])
-                except Exception as e:
-                    data.append(_insert_invalid)
-                    logger.warning("Failed to read data row {}. "
-                                   "Error msg: {}".format(dc, repr(e)))
-                dc += 1
-            elif lc < self._NUM_FIXLINES: #in header section (before column definitions)
+        for line in iter(f.readline, ''):
+            if lc < self._NUM_FIXLINES: #in header section (before column definitions)
                 try:
                     val = self._H_FIXLINES_CONV[lc](line)
                     attr = self._H_FIXLINES_YIELD[lc]
@@ -812,7 +839,6 @@ class EbasNasaAmesFile(NasaAmesHeader):
                     self.var_defs.append(self._read_vardef_line(line))
                     
                 elif lc == NUM_HEAD_LINES - 1:
-                    IN_DATA = True
                     self._data_header = h = [x.strip() for x in line.split()]
                     #append information of first two columns to variable 
                     #definition array.
@@ -824,11 +850,8 @@ class EbasNasaAmesFile(NasaAmesHeader):
                                                         is_flag=False,
                                                         is_var=False,
                                                         unit=self.time_unit))
-                    if only_head:
-                        return
-                    logger.debug("REACHED DATA BLOCK")
-                    _insert_invalid = tuple([np.nan]*self.col_num)
-                    
+                    self._data_offset = f.tell()
+                    return
                     
                 #elif lc > self._NUM_FIXLINES + 3:
                 elif lc >= END_VAR_DEF + 2:
@@ -843,34 +866,64 @@ class EbasNasaAmesFile(NasaAmesHeader):
                     logger.debug("Ignoring line no. {}: {}".format(lc, line)) 
                 mc += 1
             lc += 1
+        raise NasaAmesReadError('Reached end of file {} before end of header'
+                                .format(self.file))
+    
+    def _read_data_block(self, f):
+        """Read data block into numpy array
         
+        The whole block is parsed at once using :func:`pandas.read_csv`. 
+        If this fails or yields incomplete rows or a number of columns other
+        than :attr:`col_num` (e.g. due to corrupt lines), the block is 
+        re-read line by line, where rows that cannot be converted or that do
+        not contain :attr:`col_num` values are filled with NaNs.
         
+        Parameters
+        ----------
+        f 
+            file object opened in text mode, positioned at the beginning of 
+            the data block (cf. :attr:`_data_offset`)
         
-        data = np.asarray(data) 
-        
-        data[:, 1:] = data[:, 1:] * np.asarray(self.mul_factors)
-        
-        self._data = data
-        if replace_invalid_nan:
-            dep_dat = data[:, 1:]
-            for i, val in enumerate(np.floor(self.vals_invalid)):
-                col = dep_dat[:, i]
-                cond = np.floor(col) == val
-                col[cond] = np.nan
-                dep_dat[:, i] = col
-
-            data[:, 1:] = dep_dat
-        self._data = data
-        
-        if convert_timestamps:
-            self.compute_time_stamps()
-            
-        self.assign_flagcols()
-        self.init_flags(evaluate=evaluate_flags)
-        
-        if quality_check:
-            self._quality_check()
-            
+        Returns
+        -------
+        ndarray
+            2D array containing data (rows are timestamps, columns 
+            correspond to :attr:`var_defs`)
+        """
+        try:
+            # note: no column names are provided, so that rows with more 
+            # values than the first row raise an error instead of being 
+            # truncated or used as index
+            data = pd.read_csv(f, sep=r'\s+', header=None, index_col=False,
+                               dtype=np.float64, engine='c').values
+            if not data.shape[1] == self.col_num:
+                raise NasaAmesReadError('Expected {} columns in data block, '
+                                        'got {}'.format(self.col_num, 
+                                                        data.shape[1]))
+            if not np.isnan(data).any():
+                return data
+        except Exception as e:
+            logger.info('Failed to read data block of {} at once, reading '
+                        'line by line. Error msg: {}'.format(self.file, 
+                                                             repr(e)))
+        f.seek(self._data_offset)
+        data = []
+        _insert_invalid = tuple([np.nan]*self.col_num)
+        for dc, line in enumerate(f):
+            if not line.strip():
+                continue
+            try:
+                row = tuple([float(x.strip()) for x in line.strip().split()])
+                if not len(row) == self.col_num:
+                    raise NasaAmesReadError('Expected {} values, got {}'
+                                            .format(self.col_num, len(row)))
+                data.append(row)
+            except Exception as e:
+                data.append(_insert_invalid)
+                logger.warning("Failed to read data row {}. "
+                               "Error msg: {}".format(dc, repr(e)))
+        return np.asarray(data)
+    
     def _read_vardef_line(self, line_from_file):
         """Import variable definition line from NASA Ames file"""
         spl = [x.strip() for x in line_from_file.split(",")]
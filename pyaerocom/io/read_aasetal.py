@@ -7,6 +7,7 @@ from collections import OrderedDict
 
 from pyaerocom.stationdata import StationData
 from pyaerocom.ungriddeddata import UngriddedData
+from pyaerocom.ungridded_storage import block_index
 from pyaerocom.io.readungriddedbase import ReadUngriddedBase
 #from pyaerocom.io.helpers_units import (unitconv_sfc_conc, unitconv_wet_depo)
 
@@ -279,7 +280,7 @@ class ReadSulphurAasEtAl(ReadUngriddedBase):
                     data_obj._data[start:stop, data_obj._DATAINDEX] = values
                     data_obj._data[start:stop, data_obj._VARINDEX] = var_idx
 
-                    meta_idx[meta_key][var] = np.arange(start, stop)
+                    meta_idx[meta_key][var] = block_index(start, stop)
 
                 meta_key += 1
                 idx += totnum
@@ -36,6 +36,8 @@ from pyaerocom.exceptions import DataUnitError
 from pyaerocom.io.readungriddedbase import ReadUngriddedBase
 from pyaerocom import StationData, VerticalProfile, Variable
 from pyaerocom import UngriddedData
+from pyaerocom.ungridded_storage import (DataArrayBuilder, block_index,
+                                         join_indices)
         
 # TODO: Check station names -> they are NOT UNIQUE (e.g. Potenza...) -> maybe
 # use station_id instead... would require more flexible iterator in 
@@ -403,11 +405,96 @@ class ReadEarlinet(ReadUngriddedBase):
                                              outliers_removed=outliers_removed)
             
         data_out['contains_vars'] = contains_vars
+        data_in.close()
         return (data_out)
     
+    def _read_file_bundle(self, filename, vars_to_retrieve, read_err, 
+                          remove_outliers):
+        """Read EARLINET file into compact bundle of arrays and metadata
+        
+        Parameters
+        ----------
+        filename : str
+            file path
+        vars_to_retrieve : list
+            variables to be read
+        read_err : bool
+            if True, uncertainty data is also read (where available)
+        remove_outliers : bool
+            if True, outliers are removed (cf. :func:`read_file`)
+            
+        Returns
+        -------
+        dict
+            dictionary containing metadata (key meta), start and stop time, 
+            station coordinates and a dictionary containing data, 
+            altitudes, uncertainties and variable info of all variables 
+            that are contained in the file (key vars), or None, if the file 
+            contains none of the input variables
+        """
+        stat = self.read_file(filename, 
+                              vars_to_retrieve=vars_to_retrieve,
+                              read_err=read_err, 
+                              remove_outliers=remove_outliers)
+        if not any([var in stat.contains_vars for var in 
+                    vars_to_retrieve]):
+            self.logger.info("Station {} contains none of the desired "
+                             "variables. Skipping station..."
+                             .format(stat.station_name))
+            return None
+        # Fill the metatdata dict
+        # the location in the data set is time step dependant!
+        # use the lat location here since we have to choose one location
+        # in the time series plot
+        meta = od()
+        meta.update(stat.get_meta())
+        for add_meta in self.KEEP_ADD_META:
+            if add_meta in stat:
+                meta[add_meta] = stat[add_meta]
+        #meta['station_id'] = station_id
+        #meta['data_id'] = self.DATA_ID
+        meta['data_revision'] = self.data_revision
+        meta['variables'] = []
+        meta['var_info'] = od()
+        
+        variables = od()
+        for var in stat.contains_vars:
+            val = stat[var]
+            vi = od()
+            via = None
+            if isinstance(val, VerticalProfile):
+                altitude = val.altitude
+                data = val.data
+                err = val.data_err
+                via = od()
+                vi.update(val.var_info[var])
+                via.update(val.var_info['altitude'])
+            else:
+                altitude = np.nan
+                data = val
+                if var in stat.data_err:
+                    err = stat.err[var]
+                else:
+                    err = np.nan
+            vi.update(stat.var_info[var])
+            variables[var] = dict(data=np.atleast_1d(np.float64(data)),
+                                  altitude=altitude,
+                                  err=err,
+                                  var_info=vi,
+                                  altitude_info=via)
+        
+        # Is floating point single value
+        return dict(meta=meta,
+                    time=stat.dtime[0],
+                    stoptime=stat.stopdtime[0],
+                    latitude=stat['latitude'],
+                    longitude=stat['longitude'],
+                    altitude=stat['altitude'],
+                    vars=variables)
+    
     def read(self, vars_to_retrieve=None, files=None, first_file=None, 
              last_file=None, read_err=None, remove_outliers=True,
-             file_pattern=None):
+             file_pattern=None, multiproc=False):
         """Method that reads list of files as instance of :class:`UngriddedData`
         
         Parameters
@@ -427,8 +514,11 @@ class ReadEarlinet(ReadUngriddedBase):
         read_err : bool
             if True, uncertainty data is also read (where available). If 
             unspecified (None), then the default is used (cf. :attr:`READ_ERR`)
-         file_pattern : str, optional
+        file_pattern : str, optional
             string pattern for file search (cf :func:`get_file_list`)
+        multiproc : bool or int
+            if True (or number of processes), the files are read in parallel
+            (cf. :func:`_iter_file_bundles`)
             
         Returns
         -------
@@ -457,9 +547,8 @@ class ReadEarlinet(ReadUngriddedBase):
         self.read_failed = []
         
         data_obj = UngriddedData()
-        col_idx = data_obj.index
+        builder = DataArrayBuilder(data_obj.index)
         meta_key = -1.0
-        idx = 0
         
         #assign metadata object
         metadata = data_obj.metadata
@@ -473,114 +562,64 @@ class ReadEarlinet(ReadUngriddedBase):
             disp_each = 1
         
         VAR_IDX = -1
-        for i, _file in enumerate(files):
+        tasks = [(_file, dict(vars_to_retrieve=vars_to_retrieve,
+                              read_err=read_err, 
+                              remove_outliers=remove_outliers)) 
+                 for _file in files]
+        bundles = self._iter_file_bundles(tasks, multiproc)
+        for i, (_file, bundle, exc) in enumerate(bundles):
             if i%disp_each == 0:
                 print("Reading file {} of {} ({})".format(i+1, 
                                  num_files, type(self).__name__))
-            try:
-                stat = self.read_file(_file, 
-                                      vars_to_retrieve=vars_to_retrieve,
-                                      read_err=read_err, 
-                                      remove_outliers=remove_outliers)
-                if not any([var in stat.contains_vars for var in 
-                            vars_to_retrieve]):
-                    self.logger.info("Station {} contains none of the desired "
-                                     "variables. Skipping station..."
-                                     .format(stat.station_name))
-                    continue
-                #if last_station_id != station_id:
-                meta_key += 1
-                # Fill the metatdata dict
-                # the location in the data set is time step dependant!
-                # use the lat location here since we have to choose one location
-                # in the time series plot
-                metadata[meta_key] = od()
-                metadata[meta_key].update(stat.get_meta())
-                for add_meta in self.KEEP_ADD_META:
-                    if add_meta in stat:
-                        metadata[meta_key][add_meta] = stat[add_meta]
-                #metadata[meta_key]['station_id'] = station_id
-                #metadata[meta_key]['data_id'] = self.DATA_ID
-                metadata[meta_key]['data_revision'] = self.data_revision
-                metadata[meta_key]['variables'] = []
-                metadata[meta_key]['var_info'] = od()
-                # this is a list with indices of this station for each variable
-                # not sure yet, if we really need that or if it speeds up things
-                meta_idx[meta_key] = od()
-                    #last_station_id = station_id
-                
-                # Is floating point single value
-                time = stat.dtime[0]
-                for var in stat.contains_vars:
-                    if not var in data_obj.var_idx:
-                        VAR_IDX +=1
-                        data_obj.var_idx[var] = VAR_IDX
-                    
-                    var_idx = data_obj.var_idx[var]
-                        
-                    val = stat[var]
-                    metadata[meta_key]['var_info'][var] = vi = od()
-                    if isinstance(val, VerticalProfile):
-                        altitude = val.altitude
-                        data = val.data
-                        add = len(data)
-                        err = val.data_err
-                        metadata[meta_key]['var_info']['altitude'] = via = od()
-                        
-                        vi.update(val.var_info[var])
-                        via.update(val.var_info['altitude'])
-                    else:
-                        add = 1
-                        altitude = np.nan
-                        data = val
-                        if var in stat.data_err:
-                            err = stat.err[var]
-                        else:
-                            err = np.nan
-                    vi.update(stat.var_info[var])   
-                    stop = idx + add
-                    #check if size of data object needs to be extended
-                    if stop >= data_obj._ROWNO:
-                        #if totnum < data_obj._CHUNKSIZE, then the latter is used
-                        data_obj.add_chunk(add)
-                    
-                    #write common meta info for this station
-                    data_obj._data[idx:stop, 
-                                   col_idx['latitude']] = stat['latitude']
-                    data_obj._data[idx:stop, 
-                                   col_idx['longitude']] = stat['longitude']
-                    data_obj._data[idx:stop, 
-                                   col_idx['altitude']] = stat['altitude']
-                    data_obj._data[idx:stop, 
-                                   col_idx['meta']] = meta_key
-                                   
-                    # write data to data object
-                    data_obj._data[idx:stop, col_idx['time']] = time
-                    data_obj._data[idx:stop, col_idx['stoptime']] = stat.stopdtime[0]
-                    data_obj._data[idx:stop, col_idx['data']] = data
-                    data_obj._data[idx:stop, col_idx['dataaltitude']] = altitude
-                    data_obj._data[idx:stop, col_idx['varidx']] = var_idx
-                    
-                    if read_err:
-                        data_obj._data[idx:stop, col_idx['dataerr']] = err
-                    
-                    if not var in meta_idx[meta_key]:
-                        meta_idx[meta_key][var] = []
-                    meta_idx[meta_key][var].extend(list(range(idx, stop)))
-                    
-                    if not var in metadata[meta_key]['variables']:
-                        metadata[meta_key]['variables'].append(var)
-                    
-                    idx += add
-                    
-            except Exception as e:
+            if exc is not None:
                 self.read_failed.append(_file)
-                self.logger.exception('Failed to read file {} (ERR: {})'
-                                      .format(os.path.basename(_file),
-                                              repr(e)))
+                self.logger.error('Failed to read file {} (ERR: {})'
+                                  .format(os.path.basename(_file), 
+                                          repr(exc)))
+                continue
+            elif bundle is None: # contains none of the variables
+                continue
+            #if last_station_id != station_id:
+            meta_key += 1
+            metadata[meta_key] = meta = bundle['meta']
+            # this is a list with indices of this station for each variable
+            # not sure yet, if we really need that or if it speeds up things
+            meta_idx[meta_key] = od()
+            
+            for var, vardata in bundle['vars'].items():
+                if not var in data_obj.var_idx:
+                    VAR_IDX +=1
+                    data_obj.var_idx[var] = VAR_IDX
+                
+                var_idx = data_obj.var_idx[var]
+                
+                meta['var_info'][var] = vardata['var_info']
+                if vardata['altitude_info'] is not None:
+                    meta['var_info']['altitude'] = vardata['altitude_info']
+                
+                #write common meta info for this station and data
+                start, stop = builder.add_block(
+                        len(vardata['data']),
+                        meta=meta_key,
+                        time=bundle['time'],
+                        stoptime=bundle['stoptime'],
+                        latitude=bundle['latitude'],
+                        longitude=bundle['longitude'],
+                        altitude=bundle['altitude'],
+                        data=vardata['data'],
+                        dataaltitude=vardata['altitude'],
+                        varidx=var_idx,
+                        dataerr=vardata['err'] if read_err else None)
+                
+                meta_idx[meta_key][var] = join_indices(
+                        meta_idx[meta_key].get(var),
+                        block_index(start, stop))
+                
+                if not var in meta['variables']:
+                    meta['variables'].append(var)
                 
-        # shorten data_obj._data to the right number of points
-        data_obj._data = data_obj._data[:idx]
+        # create data array from all blocks
+        builder.finalize(data_obj)
         #data_obj.data_revision[self.DATA_ID] = self.data_revision
         self.data = data_obj
         return data_obj
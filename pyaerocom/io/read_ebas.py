@@ -18,7 +18,7 @@
 # Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
 # MA 02110-1301, USA
 
-import os, re
+import glob, os, re
 from datetime import datetime
 import fnmatch
 import numpy as np
@@ -33,10 +33,13 @@ from pyaerocom.io.readungriddedbase import ReadUngriddedBase
 from pyaerocom.io.helpers import _print_read_info
 from pyaerocom import StationData
 from pyaerocom import UngriddedData
+from pyaerocom.ungridded_storage import DataArrayBuilder, block_index
 from pyaerocom.io.ebas_varinfo import EbasVarInfo
 from pyaerocom.io.ebas_file_index import EbasFileIndex, EbasSQLRequest
+from pyaerocom.io.ebas_header_index import EbasHeaderIndex
 from pyaerocom.io.ebas_nasa_ames import EbasNasaAmesFile
-from pyaerocom.exceptions import NotInFileError, EbasFileError
+from pyaerocom.exceptions import (NotInFileError, EbasFileError, 
+                                  EbasDataRequiredError, DataCoverageError)
 from pyaerocom._lowlevel_helpers import BrowseDict
 
 class ReadEbasOptions(BrowseDict):
@@ -82,6 +85,12 @@ class ReadEbasOptions(BrowseDict):
         if True, then :func:`UngriddedData.merge_common_meta` will be called
         at the end of :func:`ReadEbas.read` (merges common metadata blocks
         together)
+    use_header_index : bool
+        if True, the headers of all files that are read in 
+        :func:`ReadEbas.read` are stored in a local index (at once after 
+        reading, cf. :class:`EbasHeaderIndex`), which is used in 
+        :func:`ReadEbas.get_file_list` to discard files that do not contain 
+        any usable data column without opening them
     """
     #: Names of options that correspond to reading filter constraints
     _FILTER_IDS = ['prefer_statistics',
@@ -104,6 +113,8 @@ class ReadEbasOptions(BrowseDict):
         self.merge_meta = False
         
         self.convert_units = True
+        
+        self.use_header_index = True
     
     @property
     def filter_dict(self):
@@ -231,6 +242,13 @@ class ReadEbas(ReadUngriddedBase):
         self.files_contain = []
         
         self._all_stats = None
+        
+        self._header_index = None
+        #: data columns resolved from header index in :func:`get_file_list`
+        #: (is used in :func:`read_file`)
+        self._var_cols_header = {}
+        #: files whose headers are up to date in header index
+        self._indexed_files = set()
     
     @property
     def filelog(self):
@@ -301,6 +319,116 @@ class ReadEbas(ReadUngriddedBase):
         """Boolean specifying whether to use EBAS flag columns"""
         return self.opts.eval_flags
 
+    @property
+    def header_index(self):
+        """Local index of file headers (None if inactive or inaccessible)
+        
+        See also :attr:`ReadEbasOptions.use_header_index`
+        """
+        if not self.opts.use_header_index:
+            return None
+        if self._header_index is None:
+            try:
+                self._header_index = EbasHeaderIndex()
+            except Exception as e:
+                self.logger.warning('Failed to access EBAS header index: {}'
+                                    .format(repr(e)))
+                return None
+        return self._header_index
+    
+    def update_header_index(self, files=None):
+        """Add headers of files to local header index
+        
+        Parameters
+        ----------
+        files : :obj:`list`, optional
+            list of files. If None, all NASA Ames files in the EBAS data 
+            directory are indexed (files that are already indexed and 
+            unchanged are skipped)
+            
+        Returns
+        -------
+        int
+            number of files that were added
+        """
+        index = self.header_index
+        if index is None:
+            raise IOError('EBAS header index is not available')
+        if files is None:
+            files = sorted(glob.glob(os.path.join(const.EBASMC_DATA_DIR, 
+                                                  '*.nas')))
+        return index.scan(files)
+    
+    def _init_ebas_vars(self, vars_to_read):
+        """Load EBAS variable info for variables and required aux vars"""
+        for var in vars_to_read:
+            if not var in self.loaded_ebas_vars:
+                self.loaded_ebas_vars[var] = EbasVarInfo(var)
+            
+            if self.loaded_ebas_vars[var].requires is not None:
+                for aux_var in self.loaded_ebas_vars[var].requires:
+                    if not aux_var in self.loaded_ebas_vars:
+                        self.loaded_ebas_vars[aux_var] = EbasVarInfo(aux_var)  
+    
+    def _var_cols_key(self, filename, vars_to_read):
+        """Key of column matches in :attr:`_var_cols_header`"""
+        return (filename, tuple(vars_to_read), self.wavelength_tol_nm,
+                tuple(self.prefer_statistics), tuple(self.ignore_statistics))
+    
+    def _check_files_header_index(self):
+        """Discard files without usable data columns based on header index
+        
+        Resolves the data columns of the variables in each file in 
+        :attr:`files` for which the header is available in 
+        :attr:`header_index` (cf. :func:`find_var_cols`). Files that do not 
+        contain any of the variables are removed from :attr:`files` (and 
+        :attr:`files_contain`) and added to :attr:`files_failed`. Columns 
+        that could be resolved are stored and used in :func:`read_file`.
+        
+        Returns
+        -------
+        list
+            updated list of files
+        """
+        index = self.header_index
+        if index is None:
+            return self.files
+        files, files_contain = [], []
+        num_skipped = 0
+        for file, contains in zip(self.files, self.files_contain):
+            header = index.get_header(file)
+            if header is not None:
+                self._indexed_files.add(file)
+                vars_to_read = self.check_vars_to_retrieve(list(contains))[0]
+                self._init_ebas_vars(vars_to_read)
+                key = self._var_cols_key(file, vars_to_read)
+                try:
+                    var_cols = self.find_var_cols(vars_to_read, header)
+                    self._var_cols_header[key] = var_cols
+                except NotInFileError:
+                    self.files_failed.append(file)
+                    num_skipped += 1
+                    continue
+                except EbasDataRequiredError:
+                    # ambiguous columns are resolved based on the data when
+                    # reading the file
+                    pass
+                except Exception as e:
+                    self.logger.warning('Failed to resolve data columns of {} '
+                                        'from EBAS header index: {}'
+                                        .format(file, repr(e)))
+            else:
+                self._indexed_files.discard(file)
+            files.append(file)
+            files_contain.append(contains)
+        if num_skipped > 0:
+            self.logger.info('Skipping {} files that do not contain any of '
+                             'the variables (based on EBAS header index)'
+                             .format(num_skipped))
+        self.files = files
+        self.files_contain = files_contain
+        return files
+    
     def _merge_lists(self, lists_per_var):
         """Merge dictionary of lists for each variable into one list
         
@@ -321,22 +449,18 @@ class ReadEbas(ReadUngriddedBase):
         list
             merged file list (is also written into :attr:`files`)
         """
-        # original lists are modified, so make a copy of them
-        #lists = deepcopy(lists_per_var)
         lists = lists_per_var
-        mapping = {}
+        contained = {}
+        for var, lst in lists.items():
+            contained[var] = set(lst)
+        # each file is assigned to the first variable list in which it occurs
+        # and contains all variables in whose lists it occurs
+        mapping = od()
         for var, lst in lists.items():
             for fpath in lst:
                 if fpath in mapping:
-                    raise Exception('FATAL: logical error -> this should not occur...')
-                mapping[fpath] = [var]
-                for other_var, other_lst in lists.items():
-                    if not var == other_var:
-                        try:
-                            other_lst.pop(other_lst.index(fpath))
-                            mapping[fpath].append(other_var)
-                        except ValueError:
-                            pass
+                    continue
+                mapping[fpath] = [v for v in lists if fpath in contained[v]]
         self.logger.info('Number of files to read reduced to {}'.format(len(mapping)))
         files, files_contain = [], []
         for path, contains_vars in mapping.items():
@@ -422,34 +546,42 @@ class ReadEbas(ReadUngriddedBase):
         self.logger.info('Fetching data files. This might take a while...')
         
         db = self.file_index
-        files_vars = {}
-        totnum = 0
         const.print_log.info('Retrieving EBAS files for variables\n{}'
                              .format(vars_to_retrieve))
+        if 'station_names' in constraints:
+            stat_matches = self.find_station_matches(constraints['station_names'])
+            constraints['station_names'] = stat_matches
+# =============================================================================
+#         if not 'data_level' in constraints:
+#             constraints['data_level'] = self.opts.data_level
+# =============================================================================
+        requests = od()
         for var in vars_to_retrieve:
             if not var in self.PROVIDES_VARIABLES:
                 raise AttributeError('No such variable {}'.format(var))
             info = EbasVarInfo(var)
             self.loaded_ebas_vars[var] = info
 
-            if 'station_names' in constraints:
-                stat_matches = self.find_station_matches(constraints['station_names'])
-                constraints['station_names'] = stat_matches
-# =============================================================================
-#             if not 'data_level' in constraints:
-#                 constraints['data_level'] = self.opts.data_level
-# =============================================================================
-
             req = info.make_sql_request(**constraints)
             
             const.logger.info('Retrieving EBAS file list for request:\n{}'
                               .format(req))
-            filenames = db.get_file_names(req)
             self.sql_requests.append(req)
-            
+            requests[var] = req
+        
+        # all requests are resolved at once
+        mapping = db.get_files_vars(requests)
+        
+        files_vars = {}
+        totnum = 0
+        for var, req in requests.items():
             paths = []
-            for file in filenames:
-                paths.append(os.path.join(const.EBASMC_DATA_DIR, file))
+            for file, contains in mapping.items():
+                if var in contains:
+                    paths.append(os.path.join(const.EBASMC_DATA_DIR, file))
+            if not len(paths) > 0:
+                raise DataCoverageError('No files could be found for request {}'
+                                        .format(req))
             files_vars[var] = sorted(paths)
             num = len(paths)
             totnum += num
@@ -460,7 +592,8 @@ class ReadEbas(ReadUngriddedBase):
                           .format(vars_to_retrieve))
         
         self._lists_orig = files_vars
-        files = self._merge_lists(files_vars)
+        self._merge_lists(files_vars)
+        files = self._check_files_header_index()
         return files
     
     def _get_var_cols(self, ebas_var_info, data):
@@ -601,6 +734,10 @@ class ReadEbas(ReadUngriddedBase):
                                  'please debug')
             # multiple column matches were found, use the one that contains 
             # less NaNs
+            if not len(file.data) > 0:
+                raise EbasDataRequiredError('Selection of data column for {} '
+                                            'requires data (only header is '
+                                            'loaded)'.format(var))
             num_invalid = []
             for colnum in result_col:
                 num_invalid.append(np.isnan(file.data[:, colnum]).sum())
@@ -826,6 +963,20 @@ class ReadEbas(ReadUngriddedBase):
         StationData
             dict-like object containing results
         """
+        return self._read_file(filename, vars_to_retrieve, _vars_to_read, 
+                               _vars_to_compute)[0]
+    
+    def _read_file(self, filename, vars_to_retrieve=None, _vars_to_read=None, 
+                   _vars_to_compute=None):
+        """Read EBAS NASA Ames file (cf. :func:`read_file`)
+        
+        Returns
+        -------
+        StationData
+            dict-like object containing results
+        EbasNasaAmesFile
+            loaded file
+        """
         # implemented in base class
         if _vars_to_read is None or _vars_to_compute is None:
             (vars_to_read, 
@@ -833,20 +984,18 @@ class ReadEbas(ReadUngriddedBase):
         else:
             vars_to_read, vars_to_compute = _vars_to_read, _vars_to_compute
         
-        for var in vars_to_read:
-            if not var in self.loaded_ebas_vars:
-                self.loaded_ebas_vars[var] = EbasVarInfo(var)
-            
-            if self.loaded_ebas_vars[var].requires is not None:
-                for aux_var in self.loaded_ebas_vars[var].requires:
-                    if not aux_var in self.loaded_ebas_vars:
-                        self.loaded_ebas_vars[aux_var] = EbasVarInfo(aux_var)  
+        self._init_ebas_vars(vars_to_read)
             
         file = EbasNasaAmesFile(filename)
         
         # find columns in NASA Ames file for variables that are to be read
-        var_cols = self.find_var_cols(vars_to_read=vars_to_read,
-                                      loaded_nasa_ames=file)
+        # (unless already resolved from header index in get_file_list)
+        key = self._var_cols_key(filename, vars_to_read)
+        if key in self._var_cols_header:
+            var_cols = self._var_cols_header[key]
+        else:
+            var_cols = self.find_var_cols(vars_to_read=vars_to_read,
+                                          loaded_nasa_ames=file)
         #create empty data object (is dictionary with extended functionality)
         data_out = StationData()
         
@@ -912,7 +1061,7 @@ class ReadEbas(ReadUngriddedBase):
         data_out = self.compute_additional_vars(data_out, vars_to_compute)
         
             
-        return data_out
+        return (data_out, file)
     
     def _convert_varunit_stationdata(self, sd, var):
         from_unit = sd.var_info[var]['units']
@@ -986,6 +1135,42 @@ class ReadEbas(ReadUngriddedBase):
             self.loaded_aerocom_vars[var_name] = const.VARS[var_name]
         return self.loaded_aerocom_vars[var_name]
     
+    def get_cache_constraints(self, **constraints):
+        """Get reading options and constraints that define a cache entry
+        
+        Includes all options in :attr:`opts` that deviate from the default 
+        (after updating them with the options in the input constraints, 
+        cf. :func:`read`).
+        
+        Parameters
+        ----------
+        **constraints
+            reading options and constraints (cf. :func:`read`)
+            
+        Returns
+        -------
+        dict
+            reading options and constraints
+        """
+        opts = ReadEbasOptions()
+        current = dict(self.opts)
+        out = {}
+        for k, v in constraints.items():
+            if k == 'multiproc': # does not affect the output
+                continue
+            elif k.isupper() and k.lower() in current:
+                current[k.lower()] = v
+            elif k in current:
+                current[k] = v
+            else:
+                out[k] = v
+        for k, v in current.items():
+            if k == 'use_header_index': # does not affect the output
+                continue
+            elif not k in opts or not v == opts[k]:
+                out['opts.{}'.format(k)] = v
+        return out
+    
     def read(self, vars_to_retrieve=None, first_file=None, 
              last_file=None, multiproc=False, files=None, **constraints):
         """Method that reads list of files as instance of :class:`UngriddedData`
@@ -1001,6 +1186,12 @@ class ReadEbas(ReadUngriddedBase):
         last_file : :obj:`int`, optional
             index of last file in list to read. If None, the very last file 
             in the list is used
+        multiproc : bool or int
+            if True (or number of processes), the files are read in parallel
+            (cf. :func:`_iter_file_bundles`)
+        files : :obj:`list`, optional
+            list of files to be read. If None, the file list is retrieved 
+            from the EBAS SQLite database using the input constraints
         **constraints
             further reading constraints deviating from default (default 
             info for each AEROCOM variable can be found in `ebas_config.ini <
@@ -1016,6 +1207,97 @@ class ReadEbas(ReadUngriddedBase):
         """    
         
         
+        vars_to_retrieve = self._init_read(vars_to_retrieve, constraints)
+        
+        files, files_contain = self._get_files_contain(vars_to_retrieve, 
+                                                       files, constraints)
+    
+        if first_file is None:
+            first_file = 0
+        if last_file is None:
+            last_file = len(files)
+        files = files[first_file:last_file]
+        files_contain = files_contain[first_file:last_file]
+        
+        
+        data = self._read_files(files, vars_to_retrieve, files_contain, 
+                                constraints, multiproc)
+        data.clear_meta_no_data()
+        return data
+    
+    def iter_read(self, vars_to_retrieve=None, chunk_files=100, files=None,
+                  as_station_data=False, multiproc=False, **constraints):
+        """Read data in chunks of files
+        
+        Extended version of :func:`ReadUngriddedBase.iter_read`: the file 
+        list is retrieved only once (using the input constraints) and the
+        variables to be read from each file are retained for each chunk. 
+        Files that cannot be read are skipped (as in :func:`read`).
+        
+        Parameters
+        ----------
+        vars_to_retrieve : :obj:`list` or similar, optional,
+            list containing variable IDs that are supposed to be read. If None, 
+            all variables in :attr:`DEFAULT_VARS` are loaded
+        chunk_files : int
+            number of files that are read into each yielded 
+            :class:`UngriddedData` object
+        files : :obj:`list`, optional
+            list of files to be read. If None, the file list is retrieved 
+            from the EBAS SQLite database using the input constraints
+        as_station_data : bool
+            if True, the files are read individually and yielded as 
+            :class:`StationData` (``chunk_files`` is ignored)
+        multiproc : bool or int
+            if True (or number of processes), the files of each chunk are 
+            read in parallel (cf. :func:`_iter_file_bundles`)
+        **constraints
+            further reading constraints (cf. :func:`read`)
+            
+        Yields
+        ------
+        UngriddedData or StationData
+            data of next chunk of files (or next file)
+        """
+        if not chunk_files > 0:
+            raise ValueError('chunk_files needs to be larger than 0')
+        vars_to_retrieve = self._init_read(vars_to_retrieve, constraints)
+        files, files_contain = self._get_files_contain(vars_to_retrieve, 
+                                                       files, constraints)
+        if as_station_data:
+            for _file, contains in zip(files, files_contain):
+                try:
+                    yield self.read_file(_file, vars_to_retrieve=contains)
+                except (NotInFileError, EbasFileError) as e:
+                    self.files_failed.append(_file)
+                    self.logger.warning('Skipping reading of EBAS NASA Ames '
+                                        'file: {}. Reason: {}'
+                                        .format(_file, repr(e)))
+                except Exception as e:
+                    const.print_log.warning('Skipping reading of EBAS NASA '
+                                            'Ames file: {}. Reason: {}'
+                                            .format(_file, repr(e)))
+            return
+        for i in range(0, len(files), chunk_files):
+            data = self._read_files(files[i:i+chunk_files], vars_to_retrieve, 
+                                    files_contain[i:i+chunk_files], 
+                                    constraints, multiproc)
+            data.clear_meta_no_data()
+            yield data
+    
+    def _init_read(self, vars_to_retrieve, constraints):
+        """Update reading options from constraints and check variables
+        
+        Note
+        ----
+        Reading options (cf. :class:`ReadEbasOptions`) are removed from the 
+        input constraints and written into :attr:`opts`.
+        
+        Returns
+        -------
+        list
+            variables to retrieve
+        """
         #data_obj.filter_hist.update(constraints)
         for k in list(constraints):
             if k.isupper() and k.lower() in self.opts:
@@ -1038,57 +1320,92 @@ class ReadEbas(ReadUngriddedBase):
             for var in vars_to_read:
                 if not var in vars_to_retrieve:
                     vars_to_retrieve.append(var)
+        return vars_to_retrieve
+    
+    def _get_files_contain(self, vars_to_retrieve, files, constraints):
+        """Get files to read and variables to be read from each file
         
+        Returns
+        -------
+        tuple
+            2-element tuple containing list of files and list of lists of 
+            variables to be read from each file
+        """
         if files is None:
             self.get_file_list(vars_to_retrieve, **constraints)
-            files = self.files
-            files_contain = self.files_contain
-        else:
-            files_contain = [vars_to_retrieve]*len(files)
-            
+            return (self.files, self.files_contain)
+        return (files, [vars_to_retrieve]*len(files))
     
-        if first_file is None:
-            first_file = 0
-        if last_file is None:
-            last_file = len(files)
-        files = files[first_file:last_file]
-        files_contain = files_contain[first_file:last_file]
-        
+    def _read_file_bundle(self, filename, vars_to_retrieve):
+        """Read EBAS file into compact bundle of arrays and metadata
         
-        if not multiproc:
-            data = self._read_files(files, vars_to_retrieve,
-                                    files_contain, constraints)
-        else:
-            raise NotImplementedError('Coming soon...')
-        data.clear_meta_no_data()
-# =============================================================================
-#             from multiprocessing import Pool, Manager, cpu_count
-#             from functools import partial
-#             num_proc = cpu_count()
-#             func = partial(self._append_read_files, 
-#                            vars_to_retrieve=vars_to_retrieve,
-#                            files_contain=files_contain,
-#                            constraints=constraints)
-#             lists = np.array_split(files, num_proc)
-#             with Manager() as manager:
-#                 result = manager.list()
-#                 p = Pool(processes=num_proc)
-#                 for sub in lists:
-#                     p.apply_async(func, (sub, result))
-#                 p.close()
-#                 p.join()
-#             
-#             data = result
-# =============================================================================
-        return data
-    
-    def _read_files(self, files, vars_to_retrieve, files_contain, constraints):
+        Parameters
+        ----------
+        filename : str
+            file path
+        vars_to_retrieve : list
+            variables to be read from file
+            
+        Returns
+        -------
+        dict
+            dictionary containing metadata (key meta), timestamps as float64
+            (key times), station coordinates, a dictionary containing data, 
+            flags, errors and variable info of all variables in the file 
+            (key vars) and the encoded file header (key header) if it is to be
+            added to the header index (else None, cf. :attr:`header_index`)
+        """
+        station_data, file = self._read_file(filename, 
+                                             vars_to_retrieve=vars_to_retrieve)
+        header = None
+        if (self.opts.use_header_index and 
+            not filename in self._indexed_files):
+            header = EbasHeaderIndex.encode_header(file)
+        # Fill the metatdata dict
+        # the location in the data set is time step dependent!
+        # use the lat location here since we have to choose one location
+        # in the time series plot
+        meta = od()
+        meta.update(station_data.get_meta(add_none_vals=True))
+
+        if 'station_name_orig' in station_data:
+            meta['station_name_orig'] = station_data['station_name_orig']     
+        
+        meta['data_revision'] = self.data_revision
+        meta['var_info'] = od()
+        
+        variables = od()
+        for var in station_data.var_info.keys():
+            flags, errs = None, None
+            if var in station_data.data_flagged:
+                flags = station_data.data_flagged[var]
+            if var in station_data.data_err:
+                errs = station_data.data_err[var]
+            variables[var] = dict(data=station_data[var],
+                                  flags=flags,
+                                  errs=errs,
+                                  var_info=station_data['var_info'][var])
+        #access array containing time stamps
+        # TODO: check using index instead (even though not a problem here 
+        # since all Aerocom data files are of type timeseries)
+        return dict(meta=meta,
+                    times=np.float64(station_data['dtime']),
+                    latitude=station_data['latitude'],
+                    longitude=station_data['longitude'],
+                    altitude=station_data['altitude'],
+                    vars=variables,
+                    header=header)
+        
+    def _read_files(self, files, vars_to_retrieve, files_contain, constraints,
+                    multiproc=False):
         """Helper that reads list of files into UngriddedData
         
         Note
         ----
         This method is not supposed to be called directly but is used in 
-        :func:`read` and serves the purpose of parallel loading of data
+        :func:`read`. If ``multiproc`` is active, the files are read in 
+        parallel (cf. :func:`_iter_file_bundles`) and assembled in the 
+        order of the input files.
         """
         data_obj = UngriddedData()
         
@@ -1097,8 +1414,8 @@ class ReadEbas(ReadUngriddedBase):
         filters.update(constraints)
         data_obj._add_to_filter_history(filters)
         
+        builder = DataArrayBuilder(data_obj.index)
         meta_key = 0.0
-        idx = 0
         
         #assign metadata object
         metadata = data_obj.metadata
@@ -1113,116 +1430,82 @@ class ReadEbas(ReadUngriddedBase):
         # (is used for attr. var_idx in UngriddedData object)
         var_count_glob = -1
         last_t = datetime.now()
-        for i, _file in enumerate(files):
+        # headers of files that are not yet in the header index (are added
+        # at once after reading)
+        headers = od()
+        tasks = [(_file, dict(vars_to_retrieve=files_contain[i])) 
+                 for i, _file in enumerate(files)]
+        bundles = self._iter_file_bundles(tasks, multiproc)
+        for i, (_file, bundle, exc) in enumerate(bundles):
             if i%disp_each == 0:
                 last_t = _print_read_info(i, disp_each, num_files, 
                                           last_t, type(self).__name__,
                                           const.print_log)
-            try:
-                station_data = self.read_file(_file, 
-                                              vars_to_retrieve=files_contain[i])
-                
-            except (NotInFileError, EbasFileError) as e:
+            if isinstance(exc, (NotInFileError, EbasFileError)):
                 self.files_failed.append(_file)
                 self.logger.warning('Skipping reading of EBAS NASA Ames '
                                     'file: {}. Reason: {}'
-                                    .format(_file, repr(e)))
+                                    .format(_file, repr(exc)))
                 continue
-            except Exception as e:
+            elif exc is not None:
                 const.print_log.warning('Skipping reading of EBAS NASA Ames '
                                         'file: {}. Reason: {}'
-                                        .format(_file, repr(e)))
+                                        .format(_file, repr(exc)))
 
                 continue
             
-            # Fill the metatdata dict
-            # the location in the data set is time step dependent!
-            # use the lat location here since we have to choose one location
-            # in the time series plot
-            metadata[meta_key] = od()
-            metadata[meta_key].update(station_data.get_meta(add_none_vals=True))
-
-            if 'station_name_orig' in station_data:
-                metadata[meta_key]['station_name_orig'] = station_data['station_name_orig']     
-            
-            metadata[meta_key]['data_revision'] = self.data_revision
-            metadata[meta_key]['var_info'] = od()
+            if bundle['header'] is not None:
+                headers[_file] = EbasHeaderIndex.decode_header(
+                        _file, bundle['header'])
+            metadata[meta_key] = bundle['meta']
             # this is a list with indices of this station for each variable
             # not sure yet, if we really need that or if it speeds up things
             meta_idx[meta_key] = {}
             
-            num_times = len(station_data['dtime'])
+            num_times = len(bundle['times'])
             
-            contains_vars = list(station_data.var_info.keys())
-            #access array containing time stamps
-            # TODO: check using index instead (even though not a problem here 
-            # since all Aerocom data files are of type timeseries)
-            times = np.float64(station_data['dtime'])
+            contains_vars = list(bundle['vars'].keys())
             
             append_vars = [x for x in np.intersect1d(vars_to_retrieve, 
                                                      contains_vars)]
             
-            totnum = num_times * len(append_vars)
-            
-            #check if size of data object needs to be extended
-            if (idx + totnum) >= data_obj._ROWNO:
-                #if totnum < data_obj._CHUNKSIZE, then the latter is used
-                data_obj.add_chunk(totnum)
-                
-            for var_count, var in enumerate(append_vars):
-                # data values
-                values = station_data[var]
-                
-                # get start / stop index for this data vector
-                start = idx + var_count * num_times
-                stop = start + num_times
-                
-                
+            for var in append_vars:
                 if not var in data_obj.var_idx:
                     var_count_glob += 1
                     var_idx = var_count_glob
+                    data_obj.var_idx[var] = var_idx
                 else:
                     var_idx = data_obj.var_idx[var]
                 
-                #write common meta info for this station (data lon, lat and 
-                #altitude are set to station locations)
-                data_obj._data[start:stop, 
-                               data_obj._LATINDEX] = station_data['latitude']
-                data_obj._data[start:stop, 
-                               data_obj._LONINDEX] = station_data['longitude']
-                data_obj._data[start:stop, 
-                               data_obj._ALTITUDEINDEX] = station_data['altitude']
-                data_obj._data[start:stop, 
-                               data_obj._METADATAKEYINDEX] = meta_key
-                               
-                # write data to data object
-                data_obj._data[start:stop, data_obj._TIMEINDEX] = times
-
-                data_obj._data[start:stop, data_obj._DATAINDEX] = values
-
-                data_obj._data[start:stop, data_obj._VARINDEX] = var_idx
+                vardata = bundle['vars'][var]
                 
-                if var in station_data.data_flagged:
-                    invalid = station_data.data_flagged[var]
-                    data_obj._data[start:stop, data_obj._DATAFLAGINDEX] = invalid
-                if var in station_data.data_err:
-                    errs = station_data.data_err[var]
-                    data_obj._data[start:stop, data_obj._DATAERRINDEX] = errs
+                #write common meta info for this station (data lon, lat and 
+                #altitude are set to station locations) and data
+                start, stop = builder.add_block(
+                        num_times,
+                        meta=meta_key,
+                        time=bundle['times'],
+                        latitude=bundle['latitude'],
+                        longitude=bundle['longitude'],
+                        altitude=bundle['altitude'],
+                        data=vardata['data'],
+                        varidx=var_idx,
+                        dataflag=vardata['flags'],
+                        dataerr=vardata['errs'])
                     
-                var_info = station_data['var_info'][var]
                 metadata[meta_key]['var_info'][var] = od()
-                metadata[meta_key]['var_info'][var].update(var_info)
-                meta_idx[meta_key][var] = np.arange(start, stop)
-
-                if not var in data_obj.var_idx:
-                    data_obj.var_idx[var] = var_idx
+                metadata[meta_key]['var_info'][var].update(vardata['var_info'])
+                meta_idx[meta_key][var] = block_index(start, stop)
                     
             metadata[meta_key]['variables'] = append_vars
-            idx += totnum  
             meta_key = meta_key + 1.
         
-        # shorten data_obj._data to the right number of points
-        data_obj._data = data_obj._data[:idx]
+        # create data array from all blocks
+        builder.finalize(data_obj)
+        index = self.header_index
+        if index is not None and len(headers) > 0:
+            index.add_many(headers)
+            self._indexed_files.update(headers.keys())
         if self.merge_meta:
             data_obj = data_obj.merge_common_meta(ignore_keys=['filename', 
                                                                'PI'])
@@ -11,6 +11,7 @@ import numpy as np
 from collections import OrderedDict as od
 from pyaerocom.io.readungriddedbase import ReadUngriddedBase
 from pyaerocom.ungriddeddata import UngriddedData
+from pyaerocom.ungridded_storage import block_index
 from pyaerocom import const
 from pyaerocom.stationdata import StationData
 import pandas as pd
@@ -374,7 +375,7 @@ class ReadGAW(ReadUngriddedBase):
                                ] = values
                 data_obj._data[start:stop, data_obj._VARINDEX
                                ] = var_idx               
-                meta_idx[meta_key][var] = np.arange(start, stop)
+                meta_idx[meta_key][var] = block_index(start, stop)
                 
                 if not var in data_obj.var_idx:
                     data_obj.var_idx[var] = var_idx
@@ -1,11 +1,14 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
+import os
 import numpy as np
+import pandas as pd
 from datetime import datetime
 from collections import OrderedDict as od
 from pyaerocom.io.readungriddedbase import ReadUngriddedBase
 from pyaerocom.io.helpers import _print_read_info
 from pyaerocom.ungriddeddata import UngriddedData
+from pyaerocom.ungridded_storage import DataArrayBuilder, block_index
 from pyaerocom.mathutils import numbers_in_str
 from pyaerocom.exceptions import MetaDataError, VariableNotFoundError
 from pyaerocom import const, print_log
@@ -16,11 +19,15 @@ class ReadAeronetBase(ReadUngriddedBase):
     Extended abstract base class, derived from low-level base class
     :class:`ReadUngriddedBase` that contains some more functionality.
     """    
-    __baseversion__ = '0.08_' + ReadUngriddedBase.__baseversion__
+    __baseversion__ = '0.10_' + ReadUngriddedBase.__baseversion__
     
     #: column delimiter in data block of files
     COL_DELIM = ','
     
+    #: Aeronet files contain one station each (cf. 
+    #: :attr:`ReadUngriddedBase.SUPPORTS_FILE_UPDATES`)
+    SUPPORTS_FILE_UPDATES = True
+    
     #: dictionary assigning temporal resolution flags for supported datasets
     #: that are provided in a defined temporal resolution. Key is the name
     #: of the dataset and value is the corresponding ts_type
@@ -288,12 +295,135 @@ class ReadAeronetBase(ReadUngriddedBase):
                                     'for variable {} within allowed wavelength '
                                     'tolerance range of +/- {} nm.'
                                     .format(var, tol))
+    def _read_data_block(self, in_file, vars_available, meta_keys=None):
+        """Read data block of Aeronet file (i.e. all lines after the header)
+        
+        Only the required columns are parsed, using the C parser of 
+        :func:`pandas.read_csv`. Dates and times are converted vectorised and
+        invalid values (:attr:`NAN_VAL`) are replaced with NaN on the whole 
+        arrays. Pandas' default NA strings (e.g. "NA", "N/A") are not 
+        interpreted, so text columns are kept as they are in the file.
+        
+        Parameters
+        ----------
+        in_file
+            file object, positioned at the first line of the data block
+        vars_available : dict
+            variables to read (keys) and corresponding column indices (values)
+        meta_keys : list, optional
+            metadata keys (cf. :attr:`META_NAMES_FILE`) to be read from the 
+            data block. Numerical metadata columns are converted to float, all
+            others to str.
+            
+        Returns
+        -------
+        dict
+            dictionary containing datetime64[s] array of timestamps (key 
+            dtime) and one array for each input variable and metadata key
+        """
+        if meta_keys is None:
+            meta_keys = []
+        col_index = self.col_index
+        date_col, time_col = col_index['date'], col_index['time']
+        dtypes = {date_col : str, time_col : str}
+        for idx in vars_available.values():
+            dtypes[idx] = np.float64
+        meta_cols = [col_index[key] for key in meta_keys]
+        usecols = sorted(set(list(dtypes) + meta_cols))
+        try:
+            df = pd.read_csv(in_file, sep=self.COL_DELIM, header=None, 
+                             usecols=usecols, dtype=dtypes, index_col=False,
+                             na_values=[self.NAN_VAL], keep_default_na=False,
+                             engine='c')
+        except pd.errors.EmptyDataError:
+            df = pd.DataFrame(columns=usecols)
+        
+        # file format is dd:mm:yyyy and hh:mm:ss
+        dtime = pd.to_datetime(df[date_col] + ' ' + df[time_col], 
+                               format='%d:%m:%Y %H:%M:%S')
+        result = {'dtime' : dtime.values.astype('datetime64[s]')}
+        for key, idx in zip(meta_keys, meta_cols):
+            col = df[idx]
+            if not idx in dtypes and pd.api.types.is_numeric_dtype(col):
+                result[key] = col.values.astype(np.float64)
+            else:
+                result[key] = col.values.astype(str)
+        for var, idx in vars_available.items():
+            arr = df[idx].values.astype(np.float64)
+            arr[arr == self.NAN_VAL] = np.nan
+            result[var] = arr
+        return result
+    
     def print_all_columns(self):
         for col in self._last_col_order:
             print(col)
                 
+    def _read_file_bundle(self, filename, vars_to_retrieve):
+        """Read file into compact bundle of arrays and metadata
+        
+        Parameters
+        ----------
+        filename : str
+            file path
+        vars_to_retrieve : list
+            variables to be read
+            
+        Returns
+        -------
+        dict
+            dictionary containing metadata (key meta), timestamps as float64
+            (key times), station coordinates and an ordered dictionary 
+            containing data arrays of all variables (key data)
+        """
+        station_data = self.read_file(filename, 
+                                      vars_to_retrieve=vars_to_retrieve)
+        # Fill the metatdata dict
+        # the location in the data set is time step dependant!
+        # use the lat location here since we have to choose one location
+        # in the time series plot
+        meta = od()
+        meta['var_info'] = od()
+        meta.update(station_data.get_meta())
+        #metadata[meta_key].update(station_data.get_station_coords())
+        meta['data_id'] = self.DATA_ID
+        meta['ts_type'] = self.TS_TYPE
+        meta['variables'] = vars_to_retrieve
+        if 'instrument_name' in station_data and station_data['instrument_name'] is not None:
+            instr = station_data['instrument_name']
+        else:
+            instr = self.INSTRUMENT_NAME
+        meta['instrument_name'] = instr
+        meta['data_revision'] = self.data_revision
+        meta['filename'] = os.path.basename(filename)
+        
+        data = od()
+        for var in vars_to_retrieve:
+            data[var] = station_data[var]
+            if var in station_data['var_info']:
+                if 'units' in station_data['var_info'][var]:
+                    u = station_data['var_info'][var]['units']
+                elif 'unit' in station_data['var_info'][var]:
+                    from pyaerocom.exceptions import MetaDataError
+                    raise MetaDataError('Metadata attr unit is deprecated, '
+                                        'please use units')
+            elif var in self.UNITS:
+                u = self.UNITS[var]
+            else:
+                u = self.DEFAULT_UNIT
+            meta['var_info'][var] = od(units=u)
+        
+        #access array containing time stamps
+        # TODO: check using index instead (even though not a problem here 
+        # since all Aerocom data files are of type timeseries)
+        return dict(meta=meta,
+                    times=np.float64(station_data['dtime']),
+                    latitude=station_data['latitude'],
+                    longitude=station_data['longitude'],
+                    altitude=station_data['altitude'],
+                    data=data)
+    
     def read(self, vars_to_retrieve=None, files=None, first_file=None, 
-             last_file=None, file_pattern=None):
+             last_file=None, file_pattern=None, multiproc=False):
         """Method that reads list of files as instance of :class:`UngriddedData`
         
         Parameters
@@ -314,6 +444,9 @@ class ReadAeronetBase(ReadUngriddedBase):
             `file_pattern` is specified.
         file_pattern : str, optional
             string pattern for file search (cf :func:`get_file_list`)
+        multiproc : bool or int
+            if True (or number of processes), the files are read in parallel
+            (cf. :func:`_iter_file_bundles`)
             
         Returns
         -------
@@ -342,20 +475,22 @@ class ReadAeronetBase(ReadUngriddedBase):
         self.read_failed = []
         
         data_obj = UngriddedData()
+        builder = DataArrayBuilder(data_obj.index)
         meta_key = 0.0
-        idx = 0
         
         #assign metadata object
         metadata = data_obj.metadata
         meta_idx = data_obj.meta_idx
         
-        num_vars = len(vars_to_retrieve)
         num_files = len(files)
         disp_each = int(num_files*0.1)
         if disp_each < 1:
             disp_each = 1
         last_t = datetime.now()   
-        for i, _file in enumerate(files):
+        tasks = [(_file, dict(vars_to_retrieve=vars_to_retrieve)) 
+                 for _file in files]
+        bundles = self._iter_file_bundles(tasks, multiproc)
+        for i, (_file, bundle, exc) in enumerate(bundles):
             
             if i%disp_each == 0:
                 last_t = _print_read_info(i, disp_each, num_files, 
@@ -363,87 +498,37 @@ class ReadAeronetBase(ReadUngriddedBase):
                                           print_log)
                 print_log.info("Reading file {} of {} ({})".format(i, 
                                  num_files, type(self).__name__))
-            station_data = self.read_file(_file, 
-                                          vars_to_retrieve=vars_to_retrieve)
-            # Fill the metatdata dict
-            # the location in the data set is time step dependant!
-            # use the lat location here since we have to choose one location
-            # in the time series plot
-            meta = od()
-            meta['var_info'] = od()
-            meta.update(station_data.get_meta())
-            #metadata[meta_key].update(station_data.get_station_coords())
-            meta['data_id'] = self.DATA_ID
-            meta['ts_type'] = self.TS_TYPE
-            meta['variables'] = vars_to_retrieve
-            if 'instrument_name' in station_data and station_data['instrument_name'] is not None:
-                instr = station_data['instrument_name']
-            else:
-                instr = self.INSTRUMENT_NAME
-            meta['instrument_name'] = instr
-            meta['data_revision'] = self.data_revision
+            if exc is not None:
+                raise exc
             # this is a list with indices of this station for each variable
             # not sure yet, if we really need that or if it speeds up things
             meta_idx[meta_key] = od()
             
-            num_times = len(station_data['dtime'])
+            num_times = len(bundle['times'])
             
-            #access array containing time stamps
-            # TODO: check using index instead (even though not a problem here 
-            # since all Aerocom data files are of type timeseries)
-            times = np.float64(station_data['dtime'])
-            
-            totnum = num_times * num_vars
-            
-            #check if size of data object needs to be extended
-            if (idx + totnum) >= data_obj._ROWNO:
-                #if totnum < data_obj._CHUNKSIZE, then the latter is used
-                data_obj.add_chunk(totnum)
-        
             for var_idx, var in enumerate(vars_to_retrieve):
-                values = station_data[var]
-                start = idx + var_idx * num_times
-                stop = start + num_times
-                
                 #write common meta info for this station (data lon, lat and 
-                #altitude are set to station locations)
-                data_obj._data[start:stop, 
-                               data_obj._LATINDEX] = station_data['latitude']
-                data_obj._data[start:stop, 
-                               data_obj._LONINDEX] = station_data['latitude']
-                data_obj._data[start:stop, 
-                               data_obj._ALTITUDEINDEX] = station_data['altitude']
-                data_obj._data[start:stop, 
-                               data_obj._METADATAKEYINDEX] = meta_key
-                               
-                # write data to data object
-                data_obj._data[start:stop, data_obj._TIMEINDEX] = times
-                data_obj._data[start:stop, data_obj._DATAINDEX] = values
-                data_obj._data[start:stop, data_obj._VARINDEX] = var_idx
+                #altitude are set to station locations) and data
+                start, stop = builder.add_block(
+                        num_times, 
+                        meta=meta_key,
+                        time=bundle['times'],
+                        latitude=bundle['latitude'],
+                        longitude=bundle['longitude'],
+                        altitude=bundle['altitude'],
+                        data=bundle['data'][var],
+                        varidx=var_idx)
                 
-                meta_idx[meta_key][var] = np.arange(start, stop)
+                meta_idx[meta_key][var] = block_index(start, stop)
                 
-                if var in station_data['var_info']:
-                    if 'units' in station_data['var_info'][var]:
-                        u = station_data['var_info'][var]['units']
-                    elif 'unit' in station_data['var_info'][var]:
-                        from pyaerocom.exceptions import MetaDataError
-                        raise MetaDataError('Metadata attr unit is deprecated, '
-                                            'please use units')
-                elif var in self.UNITS:
-                    u = self.UNITS[var]
-                else:
-                    u = self.DEFAULT_UNIT
-                meta['var_info'][var] = od(units=u)
                 if not var in data_obj.var_idx:
                     data_obj.var_idx[var] = var_idx
             
-            idx += totnum  
-            metadata[meta_key] = meta
+            metadata[meta_key] = bundle['meta']
             meta_key = meta_key + 1.
         
-        # shorten data_obj._data to the right number of points
-        data_obj._data = data_obj._data[:idx]
+        # create data array from all blocks
+        builder.finalize(data_obj)
         #data_obj.data_revision[self.DATA_ID] = self.data_revision
         self.data = data_obj
         return data_obj
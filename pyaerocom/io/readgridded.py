@@ -57,6 +57,7 @@ from pyaerocom.exceptions import (DataCoverageError,
 from pyaerocom.io.fileconventions import FileConventionRead
 from pyaerocom.io import AerocomBrowser
 from pyaerocom.io.iris_io import load_cubes_custom, concatenate_iris_cubes
+from pyaerocom.io.cachehandler_gridded import CacheHandlerGridded
 from pyaerocom.io.helpers import add_file_to_log
 from pyaerocom.griddeddata import GriddedData
 
@@ -1566,18 +1567,35 @@ class ReadGridded(object):
         
         ts_type = ts_types[0]
         match_files = self._generate_file_paths(subset)
-        (cube_list, 
-         from_files) = self._load_files(match_files, var_name, **kwargs)
-        is_concat = False
-        if len(cube_list) > 1:
-            try:
-                cube = self.concatenate_cubes(cube_list)
-                is_concat = True
-            except iris.exceptions.ConcatenateError as e:
-                raise NotImplementedError('Failed to concatenate cubes: {}\n'
-                                          'Error: {}'.format(cube_list, repr(e)))
+        
+        cache, cached = None, None
+        if const.CACHE_GRIDDED:
+            cache = CacheHandlerGridded(self.data_id, var_name, match_files,
+                                        **kwargs)
+            cached = cache.load()
+        if cached is not None:
+            cube, info = cached
+            from_files = info['from_files']
+            is_concat = info['concatenated']
+            # the individual cubes of the files are not cached
+            self.loaded_cubes[var_name] = iris.cube.CubeList([cube])
         else:
-            cube = cube_list[0]
+            (cube_list, 
+             from_files) = self._load_files(match_files, var_name, **kwargs)
+            is_concat = False
+            if len(cube_list) > 1:
+                try:
+                    cube = self.concatenate_cubes(cube_list)
+                    is_concat = True
+                except iris.exceptions.ConcatenateError as e:
+                    raise NotImplementedError('Failed to concatenate cubes: '
+                                              '{}\nError: {}'
+                                              .format(cube_list, repr(e)))
+            else:
+                cube = cube_list[0]
+            if cache is not None:
+                cache.write(cube, from_files=list(from_files), 
+                            concatenated=is_concat)
         
         data = GriddedData(input=cube, 
                            from_files=from_files,
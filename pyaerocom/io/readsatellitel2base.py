@@ -62,6 +62,11 @@ class ReadL2DataBase(ReadUngriddedBase):
 
     TS_TYPE = 'undefined'
 
+    #: Domains (lat_min, lat_max, lon_min, lon_max) of regular grids
+    #: supported by :func:`to_grid`
+    GRID_DOMAINS = {'global': (-90., 90., -180., 180.),
+                    'emep': (30., 82., -30., 90.)}
+
     __baseversion__ = '0.01_' + ReadUngriddedBase.__baseversion__
 
     def __init__(self, dataset_to_read=None, index_pointer=0, loglevel=logging.INFO, verbose=False):
@@ -202,9 +207,113 @@ class ReadL2DataBase(ReadUngriddedBase):
 
     ###################################################################################
 
+    def _is_archive(self, filename):
+        """Check if file is a supported archive (cf. :attr:`SUPPORTED_ARCHIVE_SUFFIXES`)"""
+        return str(filename).endswith(tuple(self.SUPPORTED_ARCHIVE_SUFFIXES))
+
+    def _iter_archive_members(self, filename, local_temp_dir):
+        """Stream supported files of an archive one by one
+
+        coda can only open files on disk, so each member is copied from the
+        (sequentially read) archive stream into a temporary file that is
+        removed as soon as the caller has finished with it. Hence, at most
+        one extracted file exists at any time.
+
+        Parameters
+        ----------
+        filename : str
+            path of archive file
+        local_temp_dir : str
+            directory in which the temporary files are created
+
+        Yields
+        ------
+        tuple
+            2-element tuple containing the name of the member in the archive
+            and the path of the temporary file
+        """
+        import pathlib
+        import shutil
+        import tarfile
+        import tempfile
+        import os
+
+        self.logger.info('opening archive file; using {} as temp dir.'
+                         .format(local_temp_dir))
+        tmp_dir = tempfile.mkdtemp(dir=local_temp_dir)
+        try:
+            with tarfile.open(filename, mode='r|*') as tarhandle:
+                for member in tarhandle:
+                    if not member.isfile():
+                        continue
+                    elif not pathlib.Path(member.name).suffix in self.SUPPORTED_SUFFIXES:
+                        continue
+                    self.logger.info('extracting file {}...'.format(member.name))
+                    extract_file = os.path.join(tmp_dir,
+                                                os.path.basename(member.name))
+                    with open(extract_file, 'wb') as f:
+                        shutil.copyfileobj(tarhandle.extractfile(member), f,
+                                           1024 * 1024)
+                    try:
+                        yield (member.name, extract_file)
+                    finally:
+                        os.remove(extract_file)
+        finally:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    def _read_file_bundle(self, filename, vars_to_retrieve=None,
+                          local_temp_dir=None):
+        """Read one (data or archive) file into list of numpy arrays
+
+        Parameters
+        ----------
+        filename : str
+            path of data file or of archive (cf. :attr:`SUPPORTED_ARCHIVE_SUFFIXES`)
+        vars_to_retrieve : list
+            list of variables to be read
+        local_temp_dir : str
+            directory for temporary files (only used for archives)
+
+        Returns
+        -------
+        list
+            list of 2D numpy arrays as returned by :func:`read_file`
+            (one for each data file, archive members are sorted by name)
+        """
+        if not self._is_archive(filename):
+            return [self.read_file(filename, vars_to_retrieve=vars_to_retrieve,
+                                   loglevel=logging.INFO, return_as='numpy')]
+        arrs = []
+        for name, _file in self._iter_archive_members(filename, local_temp_dir):
+            file_data = self.read_file(_file, vars_to_retrieve=vars_to_retrieve,
+                                       loglevel=logging.INFO, return_as='numpy')
+            self.logger.info('{} points read'.format(file_data.shape[0]))
+            arrs.append((name, file_data))
+        return [arr for _, arr in sorted(arrs, key=lambda x: x[0])]
+
+    def _list_coda_paths(self, filename, local_temp_dir):
+        """Print root field names of a (data or archive) file"""
+        import coda
+        if self._is_archive(filename):
+            members = self._iter_archive_members(filename, local_temp_dir)
+            try:
+                _, filename = next(members)
+            except StopIteration:
+                return
+            try:
+                self._list_coda_paths(filename, local_temp_dir)
+            finally:
+                members.close()
+            return
+        coda_handle = coda.open(filename)
+        root_field_names = coda.get_field_names(coda_handle)
+        for field in root_field_names:
+            print(field)
+        coda.close(coda_handle)
+
     def read(self, vars_to_retrieve=None, files=[], first_file=None,
              last_file=None, file_pattern=None, list_coda_paths=False,
-             local_temp_dir=None):
+             local_temp_dir=None, multiproc=False):
         """Method that reads list of files as instance of :class:`UngriddedData`
 
         Parameters
@@ -225,7 +334,15 @@ class ReadL2DataBase(ReadUngriddedBase):
             `file_pattern` is specified.
         file_pattern : str, optional
             string pattern for file search (cf :func:`get_file_list`)
-        :param local_temp_dir:
+        list_coda_paths : bool
+            if True, the coda field names of the first file are printed and
+            None is returned
+        local_temp_dir : str, optional
+            directory for temporary files of archive members (default is
+            :attr:`LOCAL_TMP_DIR`)
+        multiproc : bool or int
+            if True (or number of processes), the files are read in parallel
+            (cf. :func:`_iter_file_bundles`)
 
         Returns
         -------
@@ -241,11 +358,7 @@ class ReadL2DataBase(ReadUngriddedBase):
         >>> data=obj.read(files=testfiles, vars_to_retrieve='ec355aer')
 
         """
-
-        import pathlib
-        import tarfile
         import os
-        import coda
 
         if local_temp_dir is None:
             local_temp_dir = self.LOCAL_TMP_DIR
@@ -268,74 +381,42 @@ class ReadL2DataBase(ReadUngriddedBase):
 
             files = files[first_file:last_file]
 
+        files = sorted(files)
+        # list coda data paths in the 1st file in case the user asked for that
+        if list_coda_paths:
+            if len(files) > 0:
+                self._list_coda_paths(files[0], local_temp_dir)
+            return None
+
         self.read_failed = []
-        temp_files = {}
 
         data_obj = UngriddedData(num_points=self._COLNO, chunksize=self._CHUNKSIZE)
-        meta_key = 0.0
-        idx = 0
-
-        # check if the supplied file is a supported archive file (tar in this case)
-        # and extract the files with supported suffixes to const._cachedir
-        non_archive_files = []
-        for idx, _file in enumerate(sorted(files)):
-            # temp = 'reading file: {}'.format(_file)
 
+        # the arrays of all files are collected first and then copied once
+        # into the final array (instead of growing the array file by file)
+        # the metadata dict is left empty for L2 data
+        # the location in the data set is time step dependant!
+        arrs = []
+        tasks = [(_file, dict(vars_to_retrieve=vars_to_retrieve,
+                              local_temp_dir=local_temp_dir))
+                 for _file in files]
+        for _file, bundle, exc in self._iter_file_bundles(tasks, multiproc):
             self.logger.info('file: {}'.format(_file))
-            suffix = pathlib.Path(_file).suffix
-            if suffix in self.SUPPORTED_ARCHIVE_SUFFIXES:
-                temp = 'opening archive file; using {} as temp dir.'.format(local_temp_dir)
-                self.logger.info(temp)
-                # untar archive files first
-                tarhandle = tarfile.open(_file)
-                files_in_tar = tarhandle.getnames()
-                for file_in_tar in files_in_tar:
-                    if pathlib.Path(file_in_tar).suffix in self.SUPPORTED_SUFFIXES:
-                        # extract file to tmp path
-                        member = tarhandle.getmember(file_in_tar)
-                        temp = 'extracting file {}...'.format(member.name)
-                        self.logger.info(temp)
-                        tarhandle.extract(member, path=local_temp_dir, set_attrs=False)
-                        extract_file = os.path.join(local_temp_dir, member.name)
-                        non_archive_files.append(extract_file)
-                        temp_files[extract_file] = True
-                tarhandle.close()
-            else:
-                non_archive_files.append(_file)
-
-        for idx, _file in enumerate(sorted(non_archive_files)):
-            # list coda data paths in the 1st file in case the user asked for that
-            if idx == 0 and list_coda_paths:
-                pass
-                coda_handle = coda.open(_file)
-                root_field_names = coda.get_field_names(coda_handle)
-                for field in root_field_names:
-                    print(field)
-                coda.close(coda_handle)
-                data_obj = None
-                return data_obj
-
-            file_data = self.read_file(_file, vars_to_retrieve=vars_to_retrieve,
-                                       loglevel=logging.INFO, return_as='numpy')
-            self.logger.info('{} points read'.format(file_data.shape[0]))
-            # the metadata dict is left empty for L2 data
-            # the location in the data set is time step dependant!
-            if idx == 0:
-                data_obj._data = file_data
-
+            if exc is not None:
+                self.read_failed.append(_file)
+                self.logger.warning('Failed to read file {} (ERR: {})'
+                                    .format(os.path.basename(_file),
+                                            repr(exc)))
+                continue
+            arrs.extend(bundle)
+
+        if len(arrs) > 0:
+            if len(arrs) == 1:
+                data_obj._data = arrs[0]
             else:
-                data_obj._data = np.append(data_obj._data, file_data, axis=0)
-
+                data_obj._data = np.concatenate(arrs, axis=0)
             data_obj._idx = data_obj._data.shape[0] + 1
-            file_data = None
-            # remove file if it was temporary one
-            if _file in temp_files:
-                os.remove(_file)
-            #     pass
-            # tmp_obj = UngriddedData()
-            # tmp_obj._data = file_data
-            # tmp_obj._idx = data_obj._data.shape[0] + 1
-            # data_obj.append(tmp_obj)
+        arrs = None
 
         self.logger.info('size of data object: {}'.format(data_obj._idx - 1))
         return data_obj
@@ -431,7 +512,11 @@ class ReadL2DataBase(ReadUngriddedBase):
 
             # coordinate variables need special treatment
 
-            ds[time_dim_name] = (time_dim_name), [np.datetime64(_data[time_dim_name], 'D')]
+            if np.ndim(_data[time_dim_name]) == 0:
+                ds[time_dim_name] = (time_dim_name), [np.datetime64(_data[time_dim_name], 'D')]
+            else:
+                # time binned data (cf. time_res in to_grid)
+                ds[time_dim_name] = (time_dim_name), _data[time_dim_name]
             ds[lat_dim_name] = (lat_dim_name), _data[lat_dim_name],
             ds[lon_dim_name] = (lon_dim_name), _data[lon_dim_name]
 
@@ -487,20 +572,188 @@ class ReadL2DataBase(ReadUngriddedBase):
         self.logger.info(temp)
 
     ###################################################################################
-    def to_grid(self, data=None, vars=None, gridtype='1x1', engine='python', return_data_for_gridding=False):
+    def _parse_gridtype(self, gridtype):
+        """Get resolution and domain of regular grid from gridtype string
+
+        Parameters
+        ----------
+        gridtype : str
+            string of the form ``<dlat>x<dlon>[_<domain>]``, e.g. ``1x1``
+            (global 1x1 degree grid) or ``0.5x0.5_emep``. Valid domains are
+            the keys of :attr:`GRID_DOMAINS` (default is global)
+
+        Returns
+        -------
+        tuple
+            latitude and longitude resolution and 4-element tuple containing
+            domain boundaries (lat_min, lat_max, lon_min, lon_max)
+
+        Raises
+        ------
+        ValueError
+            if gridtype is invalid
+        """
+        res, _, domain = gridtype.partition('_')
+        if domain == '':
+            domain = 'global'
+        try:
+            dlat, dlon = [float(x) for x in res.split('x')]
+        except ValueError:
+            raise ValueError('Invalid gridtype {}. Choose e.g. 1x1 or '
+                             '0.5x0.5_emep'.format(gridtype))
+        if not domain in self.GRID_DOMAINS:
+            raise ValueError('Invalid grid domain {}. Choose from {}'
+                             .format(domain, list(self.GRID_DOMAINS)))
+        if not dlat > 0 or not dlon > 0:
+            raise ValueError('Invalid grid resolution in {}'.format(gridtype))
+        return dlat, dlon, self.GRID_DOMAINS[domain]
+
+    def _to_grid_numpy(self, data, vars, gridtype='1x1', time_res=None,
+                       return_data_for_gridding=False):
+        """Vectorised gridding of point data (cf. :func:`to_grid`)
+
+        The (flat) grid cell index of each point is computed once, the
+        statistics of all cells are then computed at once using
+        :func:`numpy.bincount` (mean, standard deviation, number of
+        observations) and a reduction over the points sorted by cell
+        (minimum, maximum).
+        """
+        dlat, dlon, (lat_min, lat_max, lon_min, lon_max) = self._parse_gridtype(gridtype)
+        lat_num = int(round((lat_max - lat_min) / dlat))
+        lon_num = int(round((lon_max - lon_min) / dlon))
+        grid_lats = lat_min + dlat * (np.arange(lat_num) + 0.5)
+        grid_lons = lon_min + dlon * (np.arange(lon_num) + 0.5)
+
+        lats = data[:, self._LATINDEX]
+        lons = data[:, self._LONINDEX]
+        with np.errstate(invalid='ignore'):
+            lat_idx = np.floor((lats - lat_min) / dlat)
+            lon_idx = np.floor((lons - lon_min) / dlon)
+            # points on the upper domain boundary belong to the last cell
+            lat_idx[lats == lat_max] = lat_num - 1
+            lon_idx[lons == lon_max] = lon_num - 1
+            # NaN coordinates are excluded here as well
+            in_domain = ((lat_idx >= 0) & (lat_idx < lat_num) &
+                         (lon_idx >= 0) & (lon_idx < lon_num))
+        points = np.flatnonzero(in_domain)
+        cells = (lat_idx[points].astype(int) * lon_num +
+                 lon_idx[points].astype(int))
+
+        if time_res is None:
+            grid_times = np.nanmean(data[:, self._TIMEINDEX]).astype('datetime64[ms]')
+            shape = (lat_num, lon_num)
+        else:
+            times = (data[points, self._TIMEINDEX].astype('datetime64[ms]')
+                     .astype('datetime64[{}]'.format(time_res)))
+            valid = ~np.isnat(times)
+            points, cells, times = points[valid], cells[valid], times[valid]
+            grid_times, time_idx = np.unique(times, return_inverse=True)
+            cells += time_idx * (lat_num * lon_num)
+            shape = (len(grid_times), lat_num, lon_num)
+        cell_num = int(np.prod(shape))
+
+        gridded_var_data = {}
+        gridded_var_data['latitude'] = grid_lats
+        gridded_var_data['longitude'] = grid_lons
+        gridded_var_data['time'] = grid_times
+        data_for_gridding = {}
+        for var in vars:
+            vals = data[points, self.INDEX_DICT[var]]
+            valid = np.isfinite(vals)
+            vals, var_cells = vals[valid], cells[valid]
+
+            numobs = np.bincount(var_cells, minlength=cell_num).astype(float)
+            has_obs = numobs > 0
+            mean = np.full(cell_num, np.nan)
+            mean[has_obs] = (np.bincount(var_cells, weights=vals,
+                                         minlength=cell_num)[has_obs] /
+                             numobs[has_obs])
+            sqdev = np.bincount(var_cells, weights=(vals - mean[var_cells]) ** 2,
+                                minlength=cell_num)
+            stddev = np.full(cell_num, np.nan)
+            stddev[has_obs] = np.sqrt(sqdev[has_obs] / numobs[has_obs])
+
+            # min / max over segments of points sorted by cell
+            order = np.argsort(var_cells, kind='stable')
+            sorted_cells = var_cells[order]
+            sorted_vals = vals[order]
+            starts = np.flatnonzero(np.diff(sorted_cells, prepend=-1))
+            obs_cells = sorted_cells[starts]
+            vmin = np.full(cell_num, np.nan)
+            vmax = np.full(cell_num, np.nan)
+            if len(starts) > 0:
+                vmin[obs_cells] = np.minimum.reduceat(sorted_vals, starts)
+                vmax[obs_cells] = np.maximum.reduceat(sorted_vals, starts)
+            numobs[~has_obs] = np.nan
+
+            gridded_var_data[var] = {}
+            gridded_var_data[var]['mean'] = mean.reshape(shape)
+            gridded_var_data[var]['stddev'] = stddev.reshape(shape)
+            gridded_var_data[var]['numobs'] = numobs.reshape(shape)
+            gridded_var_data[var]['min'] = vmin.reshape(shape)
+            gridded_var_data[var]['max'] = vmax.reshape(shape)
+
+            if return_data_for_gridding:
+                # organise the data in a nested python dict like
+                # dict_data[grid_lat][grid_lon]=np.ndarray (with time as
+                # outermost key if time_res is specified)
+                var_data = {}
+                for cell, arr in zip(obs_cells, np.split(sorted_vals, starts[1:])):
+                    time_num, cell = divmod(int(cell), lat_num * lon_num)
+                    sub = var_data
+                    if time_res is not None:
+                        sub = sub.setdefault(grid_times[time_num], {})
+                    sub = sub.setdefault(grid_lats[cell // lon_num], {})
+                    sub[grid_lons[cell % lon_num]] = arr
+                data_for_gridding[var] = var_data
+
+        if return_data_for_gridding:
+            return gridded_var_data, data_for_gridding
+        return gridded_var_data
+
+    def to_grid(self, data=None, vars=None, gridtype='1x1', engine='numpy',
+                return_data_for_gridding=False, time_res=None):
         """simple gridding algorithm that only takes the pixel middle points into account
 
         All the data points in data are considered!
 
+        Parameters
+        ----------
+        data : UngriddedData, optional
+            data to be gridded (default is :attr:`data`)
+        vars : :obj:`list` or :obj:`str`, optional
+            variables to be gridded (default is :attr:`DEFAULT_VARS`)
+        gridtype : str
+            regular output grid, of the form ``<dlat>x<dlon>[_<domain>]``,
+            e.g. ``1x1`` (global 1x1 degree grid, default) or ``1x1_emep``
+            (cf. :attr:`GRID_DOMAINS`)
+        engine : str
+            gridding engine, choose from *numpy* (vectorised, default) or
+            *python* (loop over grid cells, only supports global 1x1 grid)
+        return_data_for_gridding : bool
+            if True, also the data points of each grid cell are returned
+        time_res : :obj:`str`, optional
+            numpy datetime64 unit used for time binning (e.g. ``D`` or ``h``).
+            If None, all points are gridded into one time step (the mean time)
 
-
+        Returns
+        -------
+        dict
+            dictionary containing grid coordinates (keys *latitude*,
+            *longitude* and *time*) and, for each variable, a dictionary with
+            the grid statistics *mean*, *stddev*, *numobs*, *min* and *max*
+            (NaN in grid cells without valid data). If
+            `return_data_for_gridding` is True, a tuple containing this
+            dictionary and the data points per grid cell is returned
         """
         import numpy as np
         import time
 
+        if vars is None:
+            vars = self.DEFAULT_VARS
+        if isinstance(vars, str):
+            vars = [vars]
         _vars = vars.copy()
-        if isinstance(_vars, str):
-            _vars = [_vars]
 
         if data is None:
             data = self.data
@@ -508,7 +761,17 @@ class ReadL2DataBase(ReadUngriddedBase):
             data = data._data
         # vars_to_retrieve = self.DEFAULT_VARS
 
-        if engine == 'python':
+        if engine == 'numpy':
+            start_time = time.perf_counter()
+            self.logger.info('starting gridding for {} grid...'.format(gridtype))
+            result = self._to_grid_numpy(data, _vars, gridtype, time_res,
+                                         return_data_for_gridding)
+            elapsed_sec = time.perf_counter() - start_time
+            temp = 'time for {} gridding with numpy [s]: {:.3f}'.format(gridtype, elapsed_sec)
+            self.logger.info(temp)
+            return result
+
+        elif engine == 'python':
             start_time = time.perf_counter()
             grid_data_prot = {}
             # define ouput grid
@@ -585,13 +848,13 @@ class ReadL2DataBase(ReadUngriddedBase):
                 else:
                     return gridded_var_data
 
-            elif gridtype == '1x1_emep':
-                # 1 by on degree grid on emep domain
-                pass
-
-            pass
+            else:
+                raise ValueError('gridtype {} is not supported by engine '
+                                 'python, use engine numpy'.format(gridtype))
 
-        pass
+        else:
+            raise ValueError('Invalid gridding engine {}. Choose from numpy '
+                             'or python'.format(engine))
 
     ###################################################################################
 
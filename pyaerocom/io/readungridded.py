@@ -255,19 +255,16 @@ class ReadUngridded(object):
         vars_to_retrieve : list
             list of variables to be retrieved. If None (default), the default
             variables of each reading routine are imported
+        **kwargs
+            additional reading options and constraints passed to the 
+            :func:`read` method of the reading class. Constrained reads are
+            cached separately (cf. :class:`CacheHandlerUngridded`)
             
         Returns
         --------
         UngriddedData
             data object
         """
-        _caching = None
-        if len(kwargs) > 0:
-            _caching = const.CACHING 
-            const.CACHING = False
-            
-            print_log.info('Received additional reading constraints, '
-                           'ignoring caching')
         if vars_to_retrieve is None:
             # Note: self.vars_to_retrieve may be None as well, then
             # default variables of each network are read
@@ -286,7 +283,9 @@ class ReadUngridded(object):
         vars_available = [var for var in vars_to_retrieve if var in 
                           reader.PROVIDES_VARIABLES]
         
-        cache = CacheHandlerUngridded(reader)
+        # reading constraints are part of the cache key, that is, constrained 
+        # reads are cached separately
+        cache = CacheHandlerUngridded(reader, **kwargs)
         if not self.ignore_cache:
             # initate cache handler    
             for var in vars_available:
@@ -301,7 +300,14 @@ class ReadUngridded(object):
         vars_to_read = [v for v in vars_available if not v in cache.loaded_data]
         data_read = None
         if len(vars_to_read) > 0:
-            
+            if not self.ignore_cache:
+                # state of data directory before reading, which is written
+                # with the cache entries
+                try:
+                    cache.snapshot()
+                except Exception as e:
+                    print_log.warning('Failed to retrieve state of data '
+                                      'directory. Error: {}'.format(repr(e)))
             _loglevel = print_log.level
             print_log.setLevel(logging.INFO)
             data_read = reader.read(vars_to_read, **kwargs)
@@ -313,7 +319,7 @@ class ReadUngridded(object):
                     try:
                         cache.write(data_read, var)
                     except Exception as e:
-                        _caching = False
+                        const.CACHING = False
                         print_log.warning('Failed to write to cache directory. '
                                           'Error: {}. Deactivating caching in '
                                           'pyaerocom'.format(repr(e)))
@@ -321,15 +327,11 @@ class ReadUngridded(object):
         if len(vars_to_read) == len(vars_available):
             data_out = data_read
         else:
-            data_out = UngriddedData()
-            for var in vars_available:
-                if var in cache.loaded_data:
-                    data_out.append(cache.loaded_data[var])
+            objs = [cache.loaded_data[var] for var in vars_available 
+                    if var in cache.loaded_data]
             if data_read is not None:
-                data_out.append(data_read)
-                
-        if _caching is not None:
-            const.CACHING = _caching
+                objs.append(data_read)
+            data_out = UngriddedData.concat(objs, copy=False)
         return data_out
     
     def read(self, datasets_to_read=None, vars_to_retrieve=None, **kwargs):
@@ -352,13 +354,53 @@ class ReadUngridded(object):
         if vars_to_retrieve is not None:
             self.vars_to_retrieve = vars_to_retrieve
             
-        data = UngriddedData()
+        data = []
         for ds in self.datasets_to_read:
             self.logger.info('Reading {} data'.format(ds))
             data.append(self.read_dataset(ds, vars_to_retrieve, **kwargs))
             self.logger.info('Successfully imported {} data'.format(ds))
-        return data
-    
+        return UngriddedData.concat(data, copy=False)
+
+    def iter_read(self, dataset_to_read=None, vars_to_retrieve=None,
+                  chunk_files=100, **kwargs):
+        """Read dataset in chunks of files
+
+        Note
+        ----
+        Other than :func:`read_dataset`, this method does not use the cache
+
+        Parameters
+        ----------
+        dataset_to_read : str
+            name of dataset. If None, :attr:`dataset_to_read` is used
+        vars_to_retrieve : list
+            list of variables to be retrieved. If None (default), the default
+            variables of the reading routine are imported
+        chunk_files : int
+            number of files that are read into each yielded
+            :class:`UngriddedData` object
+        **kwargs
+            additional reading options and constraints passed to the
+            :func:`iter_read` method of the reading class (cf.
+            :func:`ReadUngriddedBase.iter_read`)
+
+        Yields
+        ------
+        UngriddedData or StationData
+            data of next chunk of files (or next file, if input arg
+            ``as_station_data`` is True)
+        """
+        if vars_to_retrieve is None:
+            vars_to_retrieve = self.vars_to_retrieve
+        reader = self.get_reader(dataset_to_read)
+        if isinstance(vars_to_retrieve, str):
+            vars_to_retrieve = [vars_to_retrieve]
+        if vars_to_retrieve is not None:
+            vars_to_retrieve = [var for var in vars_to_retrieve if var in
+                                reader.PROVIDES_VARIABLES]
+        return reader.iter_read(vars_to_retrieve, chunk_files=chunk_files,
+                                **kwargs)
+
     @property
     def SUPPORTED_DATASETS(self):
         """Returns list of strings containing all supported dataset names"""
@@ -402,12 +444,6 @@ class ReadUngridded(object):
             data object
         """
         _caching = None
-        if len(kwargs) > 0:
-            _caching = const.CACHING 
-            const.CACHING = False
-            
-            print_log.info('Received additional reading constraints, '
-                           'ignoring caching')
         if vars_to_retrieve is None:
             # Note: self.vars_to_retrieve may be None as well, then
             # default variables of each network are read
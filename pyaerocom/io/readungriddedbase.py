@@ -2,7 +2,10 @@
 # -*- coding: utf-8 -*-
 import abc
 import glob, os
+import inspect
 import logging
+import multiprocessing
+import pickle
 import numpy as np
 from fnmatch import fnmatch
 
@@ -10,6 +13,25 @@ from pyaerocom import const
 from pyaerocom._lowlevel_helpers import list_to_shortstr
 from pyaerocom.io.helpers import get_obsnetwork_dir
 from pyaerocom import LOGLEVELS
+# reading class instance in worker processes of parallel reads (is assigned 
+# in _init_read_worker)
+_WORKER_READER = None
+
+def _init_read_worker(reader):
+    global _WORKER_READER
+    _WORKER_READER = reader
+    
+def _read_bundle_worker(task):
+    file, kwargs = task
+    try:
+        return (_WORKER_READER._read_file_bundle(file, **kwargs), None)
+    except Exception as e:
+        try:
+            pickle.dumps(e)
+        except Exception:
+            e = Exception(repr(e))
+        return (None, e)
+    
 # TODO: Proposal: include attribute ts_type that is by default undefined but 
 # may be set to either of the defined 
 class ReadUngriddedBase(abc.ABC):
@@ -44,6 +66,13 @@ class ReadUngriddedBase(abc.ABC):
     
     IGNORE_META_KEYS = []
     
+    #: If True, the reading class stores the name of the source file of each 
+    #: metadata block in the metadata (key ``filename``) and :func:`read` 
+    #: accepts input arg ``files``. This enables incremental updates of cached
+    #: data, that is, only new or modified files are read when the data 
+    #: directory has changed (cf. :class:`CacheHandlerUngridded`)
+    SUPPORTS_FILE_UPDATES = False
+    
     def __str__(self):
         return ("Dataset name: {}\n"
                 "Data directory: {}\n"
@@ -485,6 +514,85 @@ class ReadUngriddedBase(abc.ABC):
                 data[var] = vals
         return data
     
+    def _read_file_bundle(self, filename, **kwargs):
+        """Read file into compact bundle of arrays and metadata
+        
+        Needs to be implemented by derived classes that support parallel 
+        reading (cf. :func:`_iter_file_bundles`). The output is assembled 
+        into an :class:`UngriddedData` object in :func:`read`.
+        """
+        raise NotImplementedError('Parallel reading is not supported by {}'
+                                  .format(type(self).__name__))
+    
+    def _iter_file_bundles(self, tasks, multiproc=False):
+        """Read files into bundles (cf. :func:`_read_file_bundle`)
+        
+        Parameters
+        ----------
+        tasks : list
+            list of 2-element tuples, each containing file path and dictionary
+            with keyword args for :func:`_read_file_bundle`
+        multiproc : bool or int
+            if True or an integer larger than 1, the files are read in 
+            parallel using a pool of worker processes (number of CPUs if 
+            True). The bundles are yielded in the order of the input files.
+            
+        Yields
+        ------
+        tuple
+            3-element tuple containing file path, bundle (None if reading 
+            failed) and exception (None if reading was successful)
+        """
+        num_proc = multiproc
+        if multiproc is True:
+            num_proc = multiprocessing.cpu_count()
+        if not num_proc or num_proc < 2 or len(tasks) < 2:
+            for file, kwargs in tasks:
+                try:
+                    bundle = self._read_file_bundle(file, **kwargs)
+                except Exception as e:
+                    yield (file, None, e)
+                    continue
+                yield (file, bundle, None)
+            return
+        # fork (where available) avoids pickling of the reader instance
+        if 'fork' in multiprocessing.get_all_start_methods():
+            ctx = multiprocessing.get_context('fork')
+        else:
+            ctx = multiprocessing.get_context()
+        num_proc = min(num_proc, len(tasks))
+        chunksize = max(1, len(tasks) // (num_proc * 4))
+        const.print_log.info('Reading {} files using {} processes'
+                             .format(len(tasks), num_proc))
+        with ctx.Pool(num_proc, initializer=_init_read_worker, 
+                      initargs=(self,)) as pool:
+            results = pool.imap(_read_bundle_worker, tasks, chunksize)
+            for (file, _), (bundle, exc) in zip(tasks, results):
+                yield (file, bundle, exc)
+    
+    def get_cache_constraints(self, **kwargs):
+        """Get reading options and constraints that define a cache entry
+        
+        Cached data is only valid for reads with the same options and 
+        constraints (cf. :class:`CacheHandlerUngridded`). Derived classes 
+        that use configurable reading options (e.g. :class:`ReadEbas`) 
+        should add options that deviate from the default.
+        
+        Parameters
+        ----------
+        **kwargs
+            additional input arguments for :func:`read`
+            
+        Returns
+        -------
+        dict
+            reading options and constraints 
+        """
+        kwargs = dict(kwargs)
+        # does not affect the output
+        kwargs.pop('multiproc', None)
+        return kwargs
+    
     def find_in_file_list(self, pattern=None):
         """Find all files that match a certain wildcard pattern
         
@@ -602,6 +710,81 @@ class ReadUngriddedBase(abc.ABC):
         if len(files) == 0:
             files = self.get_file_list()
         return self.read_file(files[0], **kwargs)
+    
+    def _read_supports_files(self):
+        """Check if :func:`read` accepts input argument ``files``"""
+        try:
+            params = inspect.signature(self.read).parameters
+        except (TypeError, ValueError):
+            return False
+        return 'files' in params
+    
+    def iter_read(self, vars_to_retrieve=None, chunk_files=100, files=None,
+                  as_station_data=False, **kwargs):
+        """Read data in chunks of files
+        
+        Generator version of :func:`read` that can be used to process large
+        datasets with bounded memory, e.g.::
+        
+            for data in reader.iter_read('od550aer', chunk_files=50):
+                # process data
+        
+        Parameters
+        ----------
+        vars_to_retrieve : :obj:`list` or similar, optional,
+            list containing variable IDs that are supposed to be read. If None, 
+            the default variables of the reader are loaded
+        chunk_files : int
+            number of files that are read into each yielded 
+            :class:`UngriddedData` object
+        files : :obj:`list`, optional
+            list of files to be read. If None, then the file list is used that
+            is returned on :func:`get_file_list`.
+        as_station_data : bool
+            if True, the files are read individually using :func:`read_file` 
+            and yielded as returned from that method (usually 
+            :class:`StationData`) and ``chunk_files`` is ignored
+        **kwargs
+            additional keyword args passed to :func:`read`
+            
+        Note
+        ----
+        If :func:`read` of the reader does not support the input argument 
+        ``files``, all data is read at once and yielded as one object.
+            
+        Yields
+        ------
+        UngriddedData or StationData
+            data of next chunk of files (or next file)
+            
+        Raises
+        ------
+        ValueError
+            if ``files`` is specified but the reader does not support reading
+            of individual files
+        """
+        if not chunk_files > 0:
+            raise ValueError('chunk_files needs to be larger than 0')
+        if not as_station_data and not self._read_supports_files():
+            if files is not None:
+                raise ValueError('{} does not support reading of individual '
+                                 'files'.format(type(self).__name__))
+            self.logger.warning('{} does not support reading of individual '
+                                'files, reading all data at once'
+                                .format(type(self).__name__))
+            yield self.read(vars_to_retrieve, **kwargs)
+            return
+        if files is None:
+            if len(self.files) == 0:
+                self.get_file_list()
+            files = self.files
+        if as_station_data:
+            for file in files:
+                yield self.read_file(file, vars_to_retrieve=vars_to_retrieve)
+            return
+        for i in range(0, len(files), chunk_files):
+            yield self.read(vars_to_retrieve, files=files[i:i+chunk_files],
+                            **kwargs)
 
 if __name__=="__main__":
 
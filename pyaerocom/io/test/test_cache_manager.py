@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+import os
+import time
+from pyaerocom.io import cache_manager as cm
+
+def _make_entry(cache_dir, name, size, last_access):
+    tmp = cm.tmp_entry_path(os.path.join(cache_dir, name))
+    os.mkdir(tmp)
+    with open(os.path.join(tmp, cm.HEAD_FILE), 'w') as f:
+        f.write('{}')
+    with open(os.path.join(tmp, 'data.npy'), 'wb') as f:
+        f.write(b'0' * size)
+    with cm.CacheLock(cache_dir, name, exclusive=True):
+        cm.replace_entry(tmp, os.path.join(cache_dir, name))
+    os.utime(os.path.join(cache_dir, name, cm.HEAD_FILE), 
+             (last_access, last_access))
+
+def test_prune_lru(tmpdir):
+    cache_dir = str(tmpdir)
+    now = time.time()
+    for i, name in enumerate(['a', 'b', 'c']):
+        _make_entry(cache_dir, name, 1024 ** 2, now - 100 + i)
+    cm.touch_entry(os.path.join(cache_dir, 'a'))
+    names = [e['name'] for e in cm.list_entries(cache_dir)]
+    assert names == ['b', 'c', 'a']
+    assert cm.prune(cache_dir, max_size_mb=2.5) == ['b']
+    # locked entries are not removed
+    with cm.CacheLock(cache_dir, 'c'):
+        assert cm.prune(cache_dir, pattern='*') == ['a']
+    assert [e['name'] for e in cm.list_entries(cache_dir)] == ['c']
+
+def test_record_access(tmpdir):
+    cache_dir = str(tmpdir)
+    cm.record_access(cache_dir, 'a', hit=True)
+    cm.record_access(cache_dir, 'a', hit=False)
+    cm.record_access(cache_dir, 'a', hit=True)
+    stats = cm.cache_stats(cache_dir)
+    assert stats['hits'] == 2
+    assert stats['misses'] == 1
+
+def test_private_link(tmpdir):
+    cache_dir = str(tmpdir)
+    _make_entry(cache_dir, 'a', 10, time.time())
+    with cm.CacheLock(cache_dir, 'a'):
+        link = cm.private_link(cache_dir, 
+                               os.path.join(cache_dir, 'a', 'data.npy'))
+    assert os.path.dirname(link) == os.path.join(cache_dir, cm.VIEW_DIR_NAME,
+                                                 str(os.getpid()))
+    # link remains valid if entry is removed
+    assert cm.remove_entry(cache_dir, 'a')
+    with open(link, 'rb') as f:
+        assert f.read() == b'0' * 10
+    assert cm.list_entries(cache_dir) == []
+    
+if __name__=="__main__":
+    import tempfile
+    test_prune_lru(tempfile.mkdtemp())
+    test_record_access(tempfile.mkdtemp())
+    test_private_link(tempfile.mkdtemp())
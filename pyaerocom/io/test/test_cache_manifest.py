@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+import os
+from unittest import mock
+from pyaerocom.io import cache_manifest as cm
+
+def test_get_dir_manifest(tmpdir):
+    data_dir = str(tmpdir.mkdir('data'))
+    manifest_dir = os.path.join(str(tmpdir), 'manifests')
+    for name in ['a.txt', 'b.txt']:
+        with open(os.path.join(data_dir, name), 'w') as f:
+            f.write(name)
+    os.utime(os.path.join(data_dir, 'a.txt'), (1e9, 1e9))
+    os.utime(data_dir, (1e9, 1e9))
+    m = cm.get_dir_manifest(data_dir, manifest_dir)
+    assert m['num_files'] == 2
+    assert m['newest_file'] == os.path.join(data_dir, 'b.txt')
+    assert os.path.isfile(cm.manifest_file(data_dir, manifest_dir))
+    # unchanged directory is not rescanned
+    with mock.patch.object(cm, 'scan_dir', wraps=cm.scan_dir) as scan:
+        assert cm.get_dir_manifest(data_dir, manifest_dir) == m
+        assert not scan.called
+    # overwriting a file in place does not change the directory mtime and is
+    # only detected with a full check, even if the file mtime is kept
+    with open(os.path.join(data_dir, 'a.txt'), 'w') as f:
+        f.write('modified')
+    os.utime(os.path.join(data_dir, 'a.txt'), (1e9, 1e9))
+    os.utime(data_dir, (1e9, 1e9))
+    assert cm.get_dir_manifest(data_dir, manifest_dir) == m
+    m0 = cm.get_dir_manifest(data_dir, manifest_dir, full_check=True)
+    assert m0['newest_file'] == os.path.join(data_dir, 'a.txt')
+    assert m0['newest_mtime'] > m['newest_mtime']
+    assert cm.file_mtimes(data_dir)['a.txt'] == m0['newest_mtime']
+    # adding a file changes the directory mtime and updates the manifest
+    with open(os.path.join(data_dir, 'c.txt'), 'w') as f:
+        f.write('c')
+    os.utime(data_dir, (2e9, 2e9))
+    m1 = cm.get_dir_manifest(data_dir, manifest_dir)
+    assert m1['num_files'] == 3
+    assert m1['fingerprint'] != m['fingerprint']
+
+def test_recently_modified_dir(tmpdir):
+    data_dir = str(tmpdir.mkdir('data'))
+    manifest_dir = os.path.join(str(tmpdir), 'manifests')
+    with open(os.path.join(data_dir, 'a.txt'), 'w') as f:
+        f.write('a')
+    # directory was modified right before the scan, manifest is not re-used
+    cm.get_dir_manifest(data_dir, manifest_dir)
+    with mock.patch.object(cm, 'scan_dir', wraps=cm.scan_dir) as scan:
+        cm.get_dir_manifest(data_dir, manifest_dir)
+        assert scan.called
+
+if __name__=="__main__":
+    import tempfile, py
+    test_get_dir_manifest(py.path.local(tempfile.mkdtemp()))
+    test_recently_modified_dir(py.path.local(tempfile.mkdtemp()))
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+import os
+from unittest import mock
+import iris
+import numpy as np
+import numpy.testing as npt
+from pandas import DataFrame
+from pyaerocom import const
+from pyaerocom.io import cache_manager as cm
+from pyaerocom.io.cachehandler_gridded import CacheHandlerGridded
+from pyaerocom.io.readgridded import ReadGridded
+
+def _make_cube():
+    time = iris.coords.DimCoord(np.arange(3, dtype=float), var_name='time',
+                                standard_name='time',
+                                units='days since 2010-01-01')
+    lat = iris.coords.DimCoord([-45., 45.], var_name='lat',
+                               standard_name='latitude', units='degrees')
+    lon = iris.coords.DimCoord([-90., 90.], var_name='lon',
+                               standard_name='longitude', units='degrees')
+    return iris.cube.Cube(np.arange(12, dtype=float).reshape(3, 2, 2),
+                          var_name='od550aer', units='1',
+                          dim_coords_and_dims=[(time, 0), (lat, 1),
+                                               (lon, 2)])
+
+def _make_file(tmpdir):
+    fp = os.path.join(str(tmpdir), 'data.nc')
+    with open(fp, 'w') as f:
+        f.write('dummy')
+    os.utime(fp, (1e9, 1e9))
+    return fp
+
+def test_write_load(tmpdir):
+    cache_dir = str(tmpdir.mkdir('cache'))
+    fp = _make_file(tmpdir)
+    cache = CacheHandlerGridded('model', 'od550aer', [fp],
+                                cache_dir=cache_dir)
+    assert cache.load() is None
+    assert cache.write(_make_cube(), from_files=[fp], concatenated=False)
+    cube, info = cache.load()
+    assert info == dict(from_files=[fp], concatenated=False)
+    # cube is loaded lazily from a private link of the cached file
+    assert cube.has_lazy_data()
+    npt.assert_array_equal(cube.data, _make_cube().data)
+
+    name = cache.file_name()
+    # key changes with load options, modification of input files and import
+    # settings
+    other = CacheHandlerGridded('model', 'od550aer', [fp],
+                                cache_dir=cache_dir, perform_fmt_checks=False)
+    assert not other.file_name() == name
+    shift_lons = const.GRID_IO.SHIFT_LONS
+    try:
+        const.GRID_IO.SHIFT_LONS = not shift_lons
+        assert not cache.file_name() == name
+    finally:
+        const.GRID_IO.SHIFT_LONS = shift_lons
+    assert cache.file_name() == name
+    os.utime(fp, (2e9, 2e9))
+    assert not cache.file_name() == name
+    assert cache.load() is None
+
+def test_load_corrupt(tmpdir):
+    cache_dir = str(tmpdir.mkdir('cache'))
+    fp = _make_file(tmpdir)
+    cache = CacheHandlerGridded('model', 'od550aer', [fp],
+                                cache_dir=cache_dir)
+    assert cache.write(_make_cube(), from_files=[fp], concatenated=False)
+    entry = os.path.join(cache_dir, cache.file_name())
+    with open(os.path.join(entry, cache.CUBE_FILE), 'w') as f:
+        f.write('corrupt')
+    assert cache.load() is None
+    assert not os.path.exists(entry)
+    assert cm.list_entries(cache_dir) == []
+
+def test_load_var_cached(tmpdir):
+    cache_dir = str(tmpdir.mkdir('cache'))
+    fp = _make_file(tmpdir)
+    cache = CacheHandlerGridded('model', 'od550aer', [fp],
+                                cache_dir=cache_dir)
+    assert cache.write(_make_cube(), from_files=[fp], concatenated=True)
+
+    reader = ReadGridded()
+    reader.data_id = 'model'
+    subset = DataFrame(dict(ts_type=['daily']))
+    caching = const.CACHE_GRIDDED
+    try:
+        const.CACHE_GRIDDED = True
+        with mock.patch.object(reader, 'filter_query', return_value=subset), \
+             mock.patch.object(reader, '_generate_file_paths',
+                               return_value=[fp]), \
+             mock.patch.object(reader, '_load_files') as load_files, \
+             mock.patch.object(CacheHandlerGridded, 'cache_dir', cache_dir):
+            data = reader._load_var('od550aer', 'daily', 9999, None, None,
+                                    None, False, False)
+    finally:
+        const.CACHE_GRIDDED = caching
+    assert not load_files.called
+    assert data.metadata['from_files'] == [fp]
+    assert data.metadata['concatenated']
+    npt.assert_array_equal(data.grid.data, _make_cube().data)
+    assert len(reader.loaded_cubes['od550aer']) == 1
+
+if __name__=="__main__":
+    import tempfile, py
+    test_write_load(py.path.local(tempfile.mkdtemp()))
+    test_load_corrupt(py.path.local(tempfile.mkdtemp()))
+    test_load_var_cached(py.path.local(tempfile.mkdtemp()))
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+import os
+from unittest import mock
+import numpy as np
+from pyaerocom import UngriddedData
+from pyaerocom.ungridded_storage import DataArrayBuilder, block_index
+from pyaerocom.io import cachehandler_ungridded as chu
+from pyaerocom.io.cachehandler_ungridded import (CacheHandlerUngridded,
+                                                 normalise_constraints,
+                                                 constraints_hash)
+from pyaerocom.io.readungriddedbase import ReadUngriddedBase
+
+class _DummyReader(ReadUngriddedBase):
+    TS_TYPE = 'daily'
+    _FILEMASK = '*.txt'
+    __version__ = '0.01'
+    DATA_ID = 'Dummy'
+    SUPPORTED_DATASETS = ['Dummy']
+    PROVIDES_VARIABLES = ['od550aer']
+    DEFAULT_VARS = ['od550aer']
+    SUPPORTS_FILE_UPDATES = True
+    
+    def __init__(self, data_dir):
+        super(_DummyReader, self).__init__()
+        self._data_dir = data_dir
+        
+    @property
+    def DATASET_PATH(self):
+        return self._data_dir
+    
+    def read_file(self, filename, vars_to_retrieve=None):
+        raise NotImplementedError
+        
+    def read(self, vars_to_retrieve=None, files=None, first_file=None,
+             last_file=None):
+        # one station per file with 3 values read from the file
+        if files is None:
+            files = sorted(os.path.join(self._data_dir, f) 
+                           for f in os.listdir(self._data_dir))
+        data = UngriddedData()
+        builder = DataArrayBuilder(data.index)
+        data.var_idx['od550aer'] = 0
+        for i, fp in enumerate(files):
+            with open(fp, 'r') as f:
+                val = float(f.read())
+            name = os.path.basename(fp)
+            data.metadata[i] = dict(data_id=self.DATA_ID, station_name=name,
+                                    filename=name, latitude=val, 
+                                    longitude=val, altitude=0.,
+                                    ts_type='daily', variables=['od550aer'],
+                                    var_info={'od550aer' : {}})
+            start, stop = builder.add_block(3, meta=i, varidx=0, 
+                                            time=np.arange(3) * 86400.,
+                                            data=np.ones(3) * val,
+                                            latitude=val, longitude=val,
+                                            altitude=0.)
+            data.meta_idx[i] = {'od550aer' : block_index(start, stop)}
+        builder.finalize(data)
+        return data
+        
+def _write_file(data_dir, name, val, mtime):
+    fp = os.path.join(data_dir, name)
+    with open(fp, 'w') as f:
+        f.write(str(val))
+    os.utime(fp, (mtime, mtime))
+        
+def _make_dirs(tmpdir):
+    data_dir = str(tmpdir.mkdir('data'))
+    for val, name in enumerate(['a.txt', 'b.txt']):
+        _write_file(data_dir, name, val, 1e9)
+    os.utime(data_dir, (1e9, 1e9))
+    return data_dir, str(tmpdir.mkdir('cache'))
+    
+def _station_values(data):
+    return {meta['filename'] : data._data[idx, data._DATAINDEX].mean()
+            for meta_idx, meta in data.metadata.items() 
+            for idx in [data.meta_idx[meta_idx]['od550aer']]}
+
+def test_normalise_constraints():
+    c = normalise_constraints({'station_names' : ('Oslo', 'Bergen'),
+                               'wavelength_tol_nm' : np.int64(50),
+                               'set' : {'b', 'a'},
+                               'start_date' : np.datetime64('2010-01-01')})
+    assert c == {'station_names' : ['Oslo', 'Bergen'],
+                 'wavelength_tol_nm' : 50,
+                 'set' : ['a', 'b'],
+                 'start_date' : '2010-01-01'}
+    
+def test_constraints_hash():
+    h = constraints_hash({'a' : 1, 'b' : [1, 2]})
+    assert len(h) == 16
+    assert h == constraints_hash({'b' : (1, 2), 'a' : np.int32(1)})
+    assert not h == constraints_hash({'a' : 1, 'b' : [2, 1]})
+    
+def test_dir_manifest_once(tmpdir):
+    data_dir, cache_dir = _make_dirs(tmpdir)
+    cache = CacheHandlerUngridded(_DummyReader(data_dir), cache_dir=cache_dir)
+    with mock.patch.object(chu, 'get_dir_manifest', 
+                           wraps=chu.get_dir_manifest) as get:
+        meta = cache.cache_meta_info()
+        assert cache.cache_meta_info() == meta
+        assert get.call_count == 1
+    assert meta['newest_file_in_read_dir'].startswith(data_dir)
+    assert meta['read_dir_fingerprint'].startswith('2_')
+    
+def test_update(tmpdir):
+    data_dir, cache_dir = _make_dirs(tmpdir)
+    _write_file(data_dir, 'd.txt', 4, 1e9)
+    reader = _DummyReader(data_dir)
+    cache = CacheHandlerUngridded(reader, cache_dir=cache_dir)
+    cache.write(reader.read(['od550aer']), 'od550aer')
+    assert cache.check_and_load('od550aer')
+    # a.txt is modified, b.txt removed, c.txt added and d.txt unchanged
+    _write_file(data_dir, 'a.txt', 10, 2e9)
+    os.remove(os.path.join(data_dir, 'b.txt'))
+    _write_file(data_dir, 'c.txt', 3, 2e9)
+    os.utime(data_dir, (2e9, 2e9))
+    
+    read = reader.read
+    def read_and_modify(vars_to_retrieve=None, files=None, **kwargs):
+        data = read(vars_to_retrieve, files, **kwargs)
+        # modification while reading, not contained in updated cache entry
+        _write_file(data_dir, 'd.txt', 5, 3e9)
+        return data
+    
+    cache = CacheHandlerUngridded(reader, cache_dir=cache_dir)
+    with mock.patch.object(reader, 'read', 
+                           side_effect=read_and_modify) as read_files:
+        assert cache.check_and_load('od550aer')
+    assert read_files.call_count == 1
+    assert sorted(read_files.call_args[1]['files']) == [
+            os.path.join(data_dir, 'a.txt'), os.path.join(data_dir, 'c.txt')]
+    assert _station_values(cache.loaded_data['od550aer']) == {
+            'a.txt' : 10, 'c.txt' : 3, 'd.txt' : 4}
+    
+    # file modified while reading is updated with next check
+    os.utime(data_dir, (4e9, 4e9))
+    cache = CacheHandlerUngridded(reader, cache_dir=cache_dir)
+    with mock.patch.object(reader, 'read', wraps=read) as read_files:
+        assert cache.check_and_load('od550aer')
+    assert read_files.call_args[1]['files'] == [
+            os.path.join(data_dir, 'd.txt')]
+    data = cache.loaded_data['od550aer']
+    assert _station_values(data) == {'a.txt' : 10, 'c.txt' : 3, 'd.txt' : 5}
+    assert data.unique_station_names == ['a.txt', 'c.txt', 'd.txt']
+    
+if __name__=="__main__":
+    import tempfile, py
+    test_normalise_constraints()
+    test_constraints_hash()
+    test_dir_manifest_once(py.path.local(tempfile.mkdtemp()))
+    test_update(py.path.local(tempfile.mkdtemp()))
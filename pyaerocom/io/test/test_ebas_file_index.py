@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+import os
+import sqlite3
+import pytest
+from pyaerocom.io import ebas_file_index
+from pyaerocom.io.ebas_file_index import (EbasFileIndex, EbasSQLRequest,
+                                          get_connection)
+
+def _make_db(path):
+    con = sqlite3.connect(path)
+    con.execute('create table station (station_code text, station_name text, '
+                'station_altitude real, station_longitude real, '
+                'station_latitude real)')
+    con.execute('create table variable (filename text, station_code text, '
+                'comp_name text, matrix text, statistics text, '
+                'instr_type text, first_end text, last_start text, '
+                'datalevel integer)')
+    con.executemany('insert into station values (?, ?, ?, ?, ?)',
+                    [('NO0002R', 'Birkenes II', 219., 8.25, 58.39),
+                     ('CA0420G', 'Alert', 210., -62.34, 82.49)])
+    scat = 'aerosol_light_scattering_coefficient'
+    absc = 'aerosol_absorption_coefficient'
+    con.executemany('insert into variable values (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                    [('b.nas', 'NO0002R', scat, 'pm10', 'arithmetic mean',
+                      'nephelometer', '2010-01-02', '2010-12-31', 2),
+                     ('b.nas', 'NO0002R', absc, 'pm10', 'arithmetic mean',
+                      'filter_absorption_photometer', '2010-01-02',
+                      '2010-12-31', 2),
+                     ('a.nas', 'CA0420G', scat, 'aerosol', 'arithmetic mean',
+                      'nephelometer', '2010-01-02', '2010-12-31', 2)])
+    con.commit()
+    con.close()
+
+def test_ebas_file_index(tmpdir):
+    db = os.path.join(str(tmpdir), 'ebas_file_index.sqlite3')
+    _make_db(db)
+    index = EbasFileIndex(db)
+    assert index.connection is get_connection(db)
+    assert sorted(index.ALL_STATION_NAMES) == ['Alert', 'Birkenes II']
+
+    scat = EbasSQLRequest(variables=['aerosol_light_scattering_coefficient'])
+    absc = EbasSQLRequest(variables=['aerosol_absorption_coefficient'],
+                          station_names=('Birkenes II', 'Alert'),
+                          lat_range=(50, 90))
+    assert sorted(index.get_file_names(scat)) == ['a.nas', 'b.nas']
+    assert index.get_file_names(absc) == ['b.nas']
+    # string and parametrised queries yield the same result
+    assert (index.execute_request(scat.make_query_str()) ==
+            index.execute_request(scat))
+
+    mapping = index.get_files_vars({'scatc550aer' : scat,
+                                    'absc550aer' : absc})
+    assert list(mapping.items()) == [('a.nas', ['scatc550aer']),
+                                     ('b.nas', ['scatc550aer', 'absc550aer'])]
+
+def test_split_request(tmpdir, monkeypatch):
+    db = os.path.join(str(tmpdir), 'ebas_file_index.sqlite3')
+    _make_db(db)
+    index = EbasFileIndex(db)
+    names = ['Station {}'.format(i) for i in range(20)] + ['Alert']
+    req = EbasSQLRequest(variables=['aerosol_light_scattering_coefficient'],
+                         station_names=names)
+    subs = req.split(max_params=8)
+    assert len(subs) > 1
+    assert all([len(sub.make_query()[1]) <= 8 for sub in subs])
+    assert sorted(sum([list(sub.station_names) for sub in subs], [])) == \
+        sorted(names)
+    with pytest.raises(ValueError):
+        EbasSQLRequest(variables='bla', station_names='Alert').split(1)
+    
+    monkeypatch.setattr(ebas_file_index, 'MAX_SQL_PARAMS', 8)
+    mapping = index.get_files_vars({'scatc550aer' : req})
+    assert list(mapping.items()) == [('a.nas', ['scatc550aer'])]
+    
+    with pytest.raises(IOError):
+        index.execute_request('select bla from variable')
+    
+if __name__=="__main__":
+    import tempfile, py
+    test_ebas_file_index(py.path.local(tempfile.mkdtemp()))
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+import os
+from pyaerocom.io.ebas_header_index import EbasHeaderIndex, get_stopdate
+from pyaerocom.io.ebas_nasa_ames import EbasNasaAmesFile, EbasColDef
+
+def _make_header():
+    header = EbasNasaAmesFile()
+    header['num_cols_dependent'] = 2
+    header['ref_date'] = '20100101000000'
+    col = EbasColDef('aerosol_light_scattering_coefficient', is_var=True,
+                     is_flag=False, unit='1/Mm')
+    col['wavelength'] = '550 nm'
+    col['statistics'] = 'arithmetic mean'
+    header.var_defs.append(col)
+    header.var_defs.append(EbasColDef('numflag', is_var=False, is_flag=True))
+    header.meta['station_code'] = 'NO0002R'
+    header.meta['matrix'] = 'pm10'
+    header.meta['startdate'] = '20100101000000'
+    header.meta['period_code'] = '1y'
+    return header
+
+def test_ebas_header_index(tmpdir):
+    fp = os.path.join(str(tmpdir), 'file.nas')
+    with open(fp, 'w') as f:
+        f.write('dummy')
+    index = EbasHeaderIndex(os.path.join(str(tmpdir), 'index.sqlite3'))
+    assert index.get_header(fp) is None
+    assert index.add(fp, _make_header())
+    assert index.contains(fp)
+    assert len(index) == 1
+
+    header = index.get_header(fp)
+    assert header.file == fp
+    assert header.num_cols_dependent == 2
+    assert header.matrix == 'pm10'
+    col = header.var_defs[0]
+    assert isinstance(col, EbasColDef)
+    assert col.get_wavelength_nm() == 550
+    assert col.statistics == 'arithmetic mean'
+
+    names = ['aerosol_light_scattering_coefficient']
+    assert index.find_files(names) == [fp]
+    assert index.find_files(names, matrices=['pm10'],
+                            statistics=['arithmetic mean']) == [fp]
+    assert index.find_files(names, matrices=['pm25']) == []
+    assert index.get_time_range(fp) == ('20100101000000', '20110101000000')
+    assert index.find_files(names, start='20100601000000', 
+                            stop='20100701000000') == [fp]
+    assert index.find_files(names, start='20110101000000') == []
+
+    # encoded headers do not contain data and can be added in batches
+    copy = EbasHeaderIndex.decode_header(
+            fp, EbasHeaderIndex.encode_header(header))
+    assert copy.var_defs[0].name == col.name
+    fp1 = os.path.join(str(tmpdir), 'file1.nas')
+    with open(fp1, 'w') as f:
+        f.write('dummy')
+    assert index.add_many({fp1 : copy, 'missing.nas' : copy}) == 1
+    assert len(index) == 2
+
+    # entries of modified files are ignored
+    with open(fp, 'w') as f:
+        f.write('modified')
+    assert not index.contains(fp)
+    assert index.get_header(fp) is None
+
+def test_get_stopdate():
+    assert get_stopdate('20100101000000', '1y') == '20110101000000'
+    assert get_stopdate('20100115120000', '3mo') == '20100415120000'
+    assert get_stopdate('20100101000000', '1d') == '20100102000000'
+    assert get_stopdate('20100101000000', 'bla') is None
+    assert get_stopdate(None, '1y') is None
+
+if __name__=="__main__":
+    import tempfile, py
+    test_ebas_header_index(py.path.local(tempfile.mkdtemp()))
+    test_get_stopdate()
@@ -0,0 +1,42 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+import io
+import numpy as np
+import numpy.testing as npt
+from pyaerocom.io.ebas_nasa_ames import EbasNasaAmesFile
+
+def _read_block(block, num_cols_dependent=3):
+    f = EbasNasaAmesFile()
+    f['num_cols_dependent'] = num_cols_dependent
+    f.file = 'test.nas'
+    f._data_offset = 0
+    return f._read_data_block(io.StringIO(block))
+
+def test_read_data_block():
+    data = _read_block('0.000000 0.041667 12.3 0.000000\n'
+                       '0.041667 0.083333 9999.9 0.999000\n')
+    npt.assert_array_equal(data, [[0, 0.041667, 12.3, 0],
+                                  [0.041667, 0.083333, 9999.9, 0.999]])
+
+def test_read_data_block_malformed():
+    # too few values, invalid value and too many values
+    data = _read_block('0.000000 0.041667 12.3 0.000000\n'
+                       '0.041667 0.083333 10.1\n'
+                       '0.083333 0.125000 abc 0.000000\n'
+                       '0.125000 0.166667 11.2 0.000000 5.0\n'
+                       '0.166667 0.208333 13.4 0.000000\n')
+    assert data.shape == (5, 4)
+    npt.assert_array_equal(data[[0, 4], 2], [12.3, 13.4])
+    assert np.isnan(data[1:4]).all()
+
+def test_read_data_block_too_many_cols():
+    # all rows contain more values than columns defined in header
+    data = _read_block('0.000000 0.041667 12.3 0.000000 1.0\n'
+                       '0.041667 0.083333 10.1 0.000000 1.0\n')
+    assert data.shape == (2, 4)
+    assert np.isnan(data).all()
+
+if __name__=="__main__":
+    test_read_data_block()
+    test_read_data_block_malformed()
+    test_read_data_block_too_many_cols()
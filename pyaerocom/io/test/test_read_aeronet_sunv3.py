@@ -131,11 +131,41 @@ def test_load_berlin():
     nominal = [0.224297, 0.178662, 0.148119, 1.967039]
     npt.assert_allclose(actual=first_vals, desired=nominal, rtol=TEST_RTOL)
     
-    
-    
+@lustre_unavail
+def test_iter_read():
+    from pyaerocom import UngriddedData
+    r = ReadAeronetSunV3()
+    files = r.find_in_file_list('G*')
+    chunks = list(r.iter_read(TEST_VARS, chunk_files=5, files=files))
+    assert len(chunks) == int(np.ceil(len(files) / 5))
+    assert all([isinstance(x, UngriddedData) for x in chunks])
+    assert sum([x.shape[0] for x in chunks]) == 63170
+
+def test_read_data_block():
+    from io import StringIO
+    r = ReadAeronetSunV3()
+    meta = ReadAeronetSunV3.META_NAMES_FILE
+    header = ','.join(['AOD_500nm', 'AOD_440nm'] + list(meta.values()))
+    r._update_col_index(header + '\n')
+    row = ('{},{},lev20,123,Oslo,59.9,10.7,90.0,{},{},1\n')
+    lines = (row.format(0.1, 0.2, '01:02:2019', '10:00:00') + 
+             row.format(-999., 0.3, '01:02:2019', '11:30:15'))
+    vars_available = {'od500aer' : r.col_index['od500aer'],
+                      'od440aer' : r.col_index['od440aer']}
+    block = r._read_data_block(StringIO(lines), vars_available, list(meta))
+    npt.assert_array_equal(block['dtime'], 
+                           np.asarray(['2019-02-01T10:00:00', 
+                                       '2019-02-01T11:30:15'], 
+                                      dtype='datetime64[s]'))
+    npt.assert_array_equal(block['od500aer'], [0.1, np.nan])
+    npt.assert_array_equal(block['od440aer'], [0.2, 0.3])
+    npt.assert_array_equal(block['latitude'], [59.9, 59.9])
+    npt.assert_array_equal(block['station_name'], ['Oslo', 'Oslo'])
+    npt.assert_array_equal(block['date'], ['01:02:2019', '01:02:2019'])
     
 if __name__=="__main__":
     
+    test_read_data_block()
     test_load_berlin()
     aeronetsunv3lev2_subset = make_dataset()
     test_shape_ungridded(aeronetsunv3lev2_subset)
\ No newline at end of file
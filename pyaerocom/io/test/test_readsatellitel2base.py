@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+import numpy as np
+import numpy.testing as npt
+import pytest
+from pyaerocom.ungriddeddata import UngriddedData
+from pyaerocom.io.read_sentinel5p_data import ReadL2Data
+
+def _make_data(reader):
+    var = reader.DEFAULT_VARS[0]
+    data = UngriddedData(num_points=4)
+    arr = np.full((5, reader._COLNO), np.nan)
+    t0 = np.datetime64('2019-01-01T10:00:00', 'ms').astype(float)
+    arr[:, reader._TIMEINDEX] = t0 + np.asarray([0, 1, 2, 3, 24]) * 3600e3
+    arr[:, reader._LATINDEX] = [10.2, 10.7, 10.5, 90., np.nan]
+    arr[:, reader._LONINDEX] = [20.1, 20.9, 20.5, 180., 0.]
+    arr[:, reader.INDEX_DICT[var]] = [1., 3., np.nan, 5., 7.]
+    data._data = arr
+    return var, data
+
+def test_to_grid():
+    reader = ReadL2Data()
+    var, data = _make_data(reader)
+    grid, points = reader.to_grid(data=data, vars=var,
+                                  return_data_for_gridding=True)
+    assert grid[var]['mean'].shape == (180, 360)
+    assert grid['latitude'][100] == 10.5
+    assert grid['longitude'][200] == 20.5
+    npt.assert_allclose([grid[var][x][100, 200] for x in
+                         ('mean', 'stddev', 'numobs', 'min', 'max')],
+                        [2., 1., 2., 1., 3.])
+    # points on upper domain boundary belong to last grid cell
+    assert grid[var]['numobs'][179, 359] == 1
+    assert np.nansum(grid[var]['numobs']) == 3
+    npt.assert_array_equal(points[var][10.5][20.5], [1., 3.])
+
+    grid = reader.to_grid(data=data, vars=var, time_res='D')
+    assert grid[var]['mean'].shape == (1, 180, 360)
+    npt.assert_array_equal(grid['time'],
+                           np.asarray(['2019-01-01'], dtype='datetime64[D]'))
+    assert np.nansum(grid[var]['numobs']) == 3
+
+    grid = reader.to_grid(data=data, vars=var, gridtype='0.5x0.5_emep')
+    assert grid[var]['mean'].shape == (104, 240)
+    assert np.all(np.isnan(grid[var]['numobs']))
+
+    with pytest.raises(ValueError):
+        reader.to_grid(data=data, vars=var, gridtype='1x1_bla')
+
+if __name__=="__main__":
+    test_to_grid()
@@ -0,0 +1,29 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+import logging
+from unittest import mock
+from pyaerocom.io import ReadUngridded
+from pyaerocom.io.readungriddedbase import ReadUngriddedBase
+
+def _readers_base_iter_read():
+    return [cls for cls in ReadUngridded.SUPPORTED 
+            if cls.iter_read is ReadUngriddedBase.iter_read]
+
+def test_iter_read():
+    readers = _readers_base_iter_read()
+    assert len(readers) > 0
+    for cls in readers:
+        reader = cls.__new__(cls)
+        reader.files = ['file1', 'file2', 'file3']
+        reader.logger = logging.getLogger(__name__)
+        with mock.patch.object(cls, 'read', autospec=True) as read:
+            chunks = list(reader.iter_read(['od550aer'], chunk_files=2))
+        if reader._read_supports_files():
+            assert len(chunks) == 2
+            assert read.call_args_list[1][1]['files'] == ['file3']
+        else:
+            assert len(chunks) == 1
+        assert read.call_count == len(chunks)
+
+if __name__=="__main__":
+    test_iter_read()
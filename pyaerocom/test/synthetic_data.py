@@ -9,6 +9,7 @@ Created on Mon May 13 11:24:39 2019
 """
 import numpy as np
 from pyaerocom import StationData, UngriddedData
+from pyaerocom.ungridded_storage import DataArrayBuilder, block_index
 
 def _make_station_data1():
     stat = StationData()
@@ -78,8 +79,27 @@ def _make_station_data2():
     return stat
 
 def _make_ungridded_data():
+    """Create UngriddedData object with 5 daily od550aer values at 4 sites"""
     data = UngriddedData()
-    # Add some random data and metadata blocks
+    builder = DataArrayBuilder(data.index)
+    names = ['Lille', 'Leipzig', 'Oslo', 'Lindenberg']
+    lats = [50.6, 51.4, 59.9, 52.2]
+    alts = [60, 125, 90, 120]
+    data.var_idx['od550aer'] = 0
+    times = np.arange(5) * 86400.
+    for i, name in enumerate(names):
+        data.metadata[i] = dict(data_id='testcase', station_name=name,
+                                latitude=lats[i], longitude=float(i),
+                                altitude=alts[i], ts_type='daily',
+                                variables=['od550aer'],
+                                var_info={'od550aer' : {}})
+        start, stop = builder.add_block(len(times), meta=i, time=times,
+                                        data=np.ones(len(times)) * i,
+                                        varidx=0, latitude=lats[i],
+                                        longitude=float(i),
+                                        altitude=alts[i])
+        data.meta_idx[i] = {'od550aer' : block_index(start, stop)}
+    builder.finalize(data)
     return data
 
 class DataAccess:
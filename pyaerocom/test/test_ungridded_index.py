@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+import numpy as np
+import numpy.testing as npt
+from pyaerocom.ungridded_index import (MetaDataTable, StationNameIndex,
+                                       StationSpatialIndex, BlockTimeIndex)
+from pyaerocom.test.synthetic_data import _make_ungridded_data
+
+def test_meta_table():
+    data = _make_ungridded_data()
+    table = MetaDataTable(data.metadata)
+    assert len(table) == 4
+    assert table.var_names == ['od550aer']
+    assert table.has_var('od550aer').all()
+    assert not table.has_var('abs550aer').any()
+    codes, uniq = table.get_codes('station_name')
+    npt.assert_array_equal(codes, [0, 1, 2, 3])
+    npt.assert_array_equal(table.match_str('station_name', 'L*'),
+                           [True, True, False, True])
+    npt.assert_array_equal(table.match_range('latitude', 51, 55),
+                           [False, True, False, True])
+    npt.assert_array_equal(table.match_list('station_name', ['Oslo']),
+                           [False, False, True, False])
+    mask = table.find({'station_name' : 'L*'}, {}, {'altitude' : [100, 200]},
+                      {})
+    npt.assert_array_equal(mask, [False, True, False, True])
+
+def test_filter_by_meta():
+    data = _make_ungridded_data()
+    assert data.meta_table is data.meta_table
+    subset = data.filter_by_meta(station_name='L*', altitude=[100, 200])
+    assert subset.unique_station_names == ['Leipzig', 'Lindenberg']
+    npt.assert_array_equal(subset.shape, (10, 12))
+    npt.assert_array_equal(subset._data[:, subset._DATAINDEX],
+                           [1] * 5 + [3] * 5)
+    npt.assert_array_equal(subset._data[:, subset._METADATAKEYINDEX],
+                           [0] * 5 + [1] * 5)
+    subset._check_index()
+
+def test_meta_table_invalidation():
+    data = _make_ungridded_data()
+    table = data.meta_table
+    assert data.meta_table is table
+    # in place modifications of metadata require invalidation of the cache
+    data.metadata[0]['ts_type'] = 'monthly'
+    data._invalidate_cache()
+    assert not data.meta_table is table
+    npt.assert_array_equal(data.meta_table.match_str('ts_type', 'monthly'),
+                           [True, False, False, False])
+    # replacing attributes invalidates the cache
+    table = data.meta_table
+    data.meta_idx = data.meta_idx
+    assert not data.meta_table is table
+    
+def test_station_name_index():
+    data = _make_ungridded_data()
+    index = StationNameIndex(MetaDataTable(data.metadata))
+    assert index.names == ['Leipzig', 'Lille', 'Lindenberg', 'Oslo']
+    assert index.find('Oslo') == [2]
+    assert index.find('L*') == [0, 1, 3]
+    assert index.find('Li*') == [0, 3]
+    assert index.find('Bla') == []
+    assert data._find_station_indices('*erg') == [3]
+
+def test_spatial_index():
+    index = StationSpatialIndex([50.6, 51.4, 59.9, 52.2, np.nan], 
+                                [3.1, 12.4, 10.7, 14.1, 0], 
+                                ['a', 'b', 'c', 'd', 'e'])
+    assert len(index) == 4
+    keys, dists = index.query_radius(51.4, 12.4, 200)
+    npt.assert_array_equal(keys, ['b', 'd'])
+    npt.assert_allclose(dists, [0, 146.9], atol=0.1)
+    keys, dists = index.query_nearest(52, 14, k=2)
+    npt.assert_array_equal(keys, ['d', 'b'])
+    other = StationSpatialIndex([51.4005, 0], [12.4, 0], ['x', 'y'])
+    matches = index.match(other, 0.1)
+    assert list(matches.keys()) == ['b']
+    assert matches['b'][0] == 'x'
+    
+def test_find_common_stations():
+    data = _make_ungridded_data()
+    other = data.filter_by_meta(station_name='L*')
+    assert data.find_common_stations(other) == {0 : 0, 1 : 1, 3 : 2}
+
+def test_block_time_index():
+    times = np.asarray([0, 1, 2, 3, 2, 1, np.nan, 5]) * 86400.
+    index = BlockTimeIndex({0 : {'a' : slice(0, 3)}, 
+                            1 : {'a' : slice(3, 8)}}, times)
+    assert index.time_range(1, 'a') == (86400, 5 * 86400)
+    assert index.window(0, 'a', '1970-01-02') == slice(1, 3)
+    npt.assert_array_equal(index.window(1, 'a', '1970-01-02', '1970-01-04'),
+                           [5, 4, 3])
+    npt.assert_array_equal(index.window(1, 'a'), [5, 4, 3, 7])
+    assert index.blocks_in_window('1970-01-04') == [(1, 'a')]
+    assert index.blocks_in_window(None, '1970-01-01') == [(0, 'a')]
+
+def test_block_time_index_reads():
+    times = np.asarray([0, 1, 2, 3, 2, 1, np.nan, 5]) * 86400.
+    meta_idx = {0 : {'a' : slice(0, 3)}, 1 : {'a' : slice(3, 8)}}
+    read = []
+    def read_times(idx):
+        read.append(idx)
+        return times[idx]
+    # only the rows of the requested block are read
+    index = BlockTimeIndex(meta_idx, read_times)
+    assert index.window(0, 'a', '1970-01-02') == slice(1, 3)
+    assert read == [slice(0, 3)]
+    # no data is read if the time bounds of the blocks are provided
+    index = BlockTimeIndex(meta_idx, read_times, index.bounds)
+    del read[:]
+    assert index.blocks_in_window('1970-01-04') == [(1, 'a')]
+    assert len(index.window(0, 'a', '1970-01-04')) == 0
+    assert read == []
+
+def test_filter_by_time():
+    data = _make_ungridded_data()
+    subset = data.filter_by_time('1970-01-02', '1970-01-03')
+    npt.assert_array_equal(subset.shape, (8, 12))
+    assert len(subset.metadata) == 4
+    subset._check_index()
+    
+if __name__=="__main__":
+    test_meta_table()
+    test_filter_by_meta()
+    test_meta_table_invalidation()
+    test_station_name_index()
+    test_spatial_index()
+    test_find_common_stations()
+    test_block_time_index()
+    test_block_time_index_reads()
+    test_filter_by_time()
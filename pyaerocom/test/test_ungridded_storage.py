@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+import numpy as np
+import numpy.testing as npt
+from pyaerocom import UngriddedData
+from pyaerocom.ungridded_storage import (ColumnarDataArray, DataArrayBuilder,
+                                         block_index, index_len,
+                                         shift_index, join_indices)
+from pyaerocom.test.synthetic_data import _make_ungridded_data
+
+INDEX = UngriddedData()._init_index()
+
+def test_columnar_init():
+    arr = ColumnarDataArray(10, INDEX, 'float32')
+    npt.assert_array_equal(arr.shape, (10, 12))
+    assert arr.allocated_columns == ['meta', 'time', 'latitude', 'longitude',
+                                     'altitude', 'varidx', 'data']
+    assert np.isnan(arr[:, INDEX['dataflag']]).all()
+    assert np.isnan(arr[:, INDEX['meta']]).all()
+    
+def test_columnar_setget():
+    arr = ColumnarDataArray(10, INDEX)
+    arr[0:5, INDEX['meta']] = 3
+    arr[:, INDEX['time']] = np.arange(10) * 1e9
+    npt.assert_array_equal(arr[:5, INDEX['meta']], [3]*5)
+    assert np.isnan(arr[5:, INDEX['meta']]).all()
+    npt.assert_array_equal(arr[:, INDEX['time']], np.arange(10) * 1e9)
+    
+    # optional columns are allocated on demand and released when emptied
+    arr[:, INDEX['dataflag']] = np.nan
+    assert not 'dataflag' in arr.allocated_columns
+    arr[[1, 2], INDEX['dataflag']] = [1, 0]
+    assert 'dataflag' in arr.allocated_columns
+    arr[:, INDEX['dataflag']] = np.nan
+    assert not 'dataflag' in arr.allocated_columns
+    
+def test_columnar_take_concat():
+    arr = ColumnarDataArray(4, INDEX)
+    arr[:, INDEX['data']] = [1, 2, 3, 4]
+    sub = arr[np.array([True, False, True, False])]
+    assert isinstance(sub, ColumnarDataArray)
+    npt.assert_array_equal(sub[:, INDEX['data']], [1, 3])
+    
+    dense = np.ones((2, len(INDEX)))
+    merged = ColumnarDataArray.concatenate([arr, dense])
+    npt.assert_array_equal(merged.shape, (6, 12))
+    npt.assert_array_equal(merged[:, INDEX['data']], [1, 2, 3, 4, 1, 1])
+    npt.assert_array_equal(merged.to_dense()[4:], dense)
+    
+def test_columnar_memory():
+    dense = UngriddedData(num_points=1000)
+    col = UngriddedData(num_points=1000, columnar=True, value_dtype='float32')
+    assert col.is_columnar
+    assert col.nbytes < dense.nbytes / 2
+    
+def test_builder():
+    for columnar in (False, True):
+        data = UngriddedData(columnar=columnar)
+        builder = DataArrayBuilder(data.index)
+        times = np.arange(3) * 86400.
+        assert builder.add_block(3, meta=0, time=times, data=[1, 2, 3], 
+                                 varidx=0, latitude=10) == (0, 3)
+        assert builder.add_block(2, meta=1, time=times[:2], data=[4, 5],
+                                 varidx=0, dataflag=[1, 0]) == (3, 5)
+        builder.finalize(data)
+        npt.assert_array_equal(data.shape, (5, 12))
+        npt.assert_array_equal(data._data[:, data.index['data']], 
+                               [1, 2, 3, 4, 5])
+        npt.assert_array_equal(data._data[:, data.index['meta']], 
+                               [0, 0, 0, 1, 1])
+        npt.assert_array_equal(data._data[:, data.index['latitude']], 
+                               [10, 10, 10, np.nan, np.nan])
+        npt.assert_array_equal(data._data[:, data.index['dataflag']], 
+                               [np.nan, np.nan, np.nan, 1, 0])
+        assert builder.num_rows == 0
+    
+def test_block_index():
+    idx = block_index(3, 7)
+    assert index_len(idx) == 4
+    assert index_len(np.arange(3, 7)) == 4
+    assert shift_index(idx, 10) == slice(13, 17)
+    npt.assert_array_equal(shift_index(np.arange(2), 10), [10, 11])
+    assert join_indices(None, idx) == idx
+    assert join_indices(idx, block_index(7, 9)) == slice(3, 9)
+    npt.assert_array_equal(join_indices(idx, block_index(8, 9)), 
+                           [3, 4, 5, 6, 8])
+    
+def test_to_from_disk(tmpdir):
+    data = _make_ungridded_data()
+    path = data.to_disk(str(tmpdir))
+    loaded = UngriddedData.from_disk(path)
+    assert loaded.is_columnar
+    assert loaded.is_memmap
+    assert loaded.metadata == data.metadata
+    npt.assert_array_equal(loaded.shape, data.shape)
+    npt.assert_array_equal(loaded._data[:, loaded._DATAINDEX], 
+                           data._data[:, data._DATAINDEX])
+    subset = loaded.filter_by_meta(station_name='Oslo')
+    assert not subset.is_memmap
+    npt.assert_array_equal(subset._data[:, subset._DATAINDEX], [2] * 5)
+    # time bounds of data blocks are loaded from disk
+    assert loaded.time_index._bounds == data.time_index.bounds
+    npt.assert_array_equal(loaded.to_station_data(2).dtime,
+                           data.to_station_data(2).dtime)
+    
+if __name__=="__main__":
+    test_columnar_init()
+    test_columnar_setget()
+    test_columnar_take_concat()
+    test_columnar_memory()
+    test_builder()
+    test_block_index()
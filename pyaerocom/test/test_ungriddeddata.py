@@ -11,6 +11,7 @@ from pyaerocom import UngriddedData
 from pyaerocom.test.settings import lustre_unavail
 from pyaerocom.io.test.test_read_aeronet_sunv3 import aeronetsunv3lev2_subset
 from pyaerocom.exceptions import DataCoverageError
+from pyaerocom.test.synthetic_data import _make_ungridded_data
 
 def test_init_shape():
     npt.assert_array_equal(UngriddedData().shape, (10000, 12))
@@ -60,10 +61,66 @@ def test_coordinate_access():
     npt.assert_array_equal(c['longitude'], lons)
     npt.assert_array_equal(c['altitude'], alts)
     
+def test_to_dataframe():
+    data = _make_ungridded_data()
+    df = data.to_dataframe('od550aer', start='1970-01-02', stop='1970-01-10')
+    assert len(df) == 16
+    assert list(df.columns) == ['meta_idx', 'station_name', 'latitude', 
+                                'longitude', 'altitude', 'var_name', 'time', 
+                                'value']
+    npt.assert_array_equal(df['station_name'].unique(), 
+                           ['Lille', 'Leipzig', 'Oslo', 'Lindenberg'])
+    monthly = data.to_dataframe('od550aer', freq='monthly')
+    npt.assert_array_equal(monthly['value'], [0, 1, 2, 3])
+    
+def test_to_station_data_all():
+    data = _make_ungridded_data()
+    result = data.to_station_data_all('od550aer')
+    assert result['station_name'] == data.unique_station_names
+    assert len(result['failed']) == 0
+    
+def test_concat():
+    d0 = _make_ungridded_data()
+    d1 = _make_ungridded_data().filter_by_meta(station_name='Oslo')
+    d1.var_idx = {'abs550aer' : 0}
+    for meta in d1.metadata.values():
+        meta['variables'] = ['abs550aer']
+        meta['var_info'] = {'abs550aer' : {}}
+    for idx in d1.meta_idx.values():
+        idx['abs550aer'] = idx.pop('od550aer')
+    merged = UngriddedData.concat([d0, UngriddedData(), d1], 
+                                  check_index=True)
+    assert merged.var_idx == {'od550aer' : 0, 'abs550aer' : 1}
+    npt.assert_array_equal(merged.shape, (25, 12))
+    assert list(merged.metadata.keys()) == [0, 1, 2, 3, 4]
+    npt.assert_array_equal(merged._data[20:, merged._VARINDEX], [1] * 5)
+    npt.assert_array_equal(merged._data[20:, merged._METADATAKEYINDEX], 
+                           [4] * 5)
+    # input objects remain unchanged
+    assert d1.var_idx == {'abs550aer' : 0}
+    # only one object is not empty
+    single = UngriddedData.concat([UngriddedData(), d0])
+    assert not single is d0
+    npt.assert_array_equal(single.shape, d0.shape)
+    assert UngriddedData.concat([UngriddedData(), d0], copy=False) is d0
+    
+def test_extract_meta_blocks():
+    data = _make_ungridded_data()
+    subset = data._extract_meta_blocks([3, 1])
+    assert subset.unique_station_names == ['Leipzig', 'Lindenberg']
+    assert list(subset.metadata.keys()) == [0, 1]
+    npt.assert_array_equal(subset._data[:, subset._DATAINDEX],
+                           [3] * 5 + [1] * 5)
+    subset._check_index()
+    
 @lustre_unavail
 def test_check_index_aeronet_subset(aeronetsunv3lev2_subset):
     aeronetsunv3lev2_subset._check_index()
     
 if __name__=="__main__":
     test_init_shape()
-    test_coordinate_access()
\ No newline at end of file
+    test_coordinate_access()
+    test_to_dataframe()
+    test_to_station_data_all()
+    test_concat()
+    test_extract_meta_blocks()
\ No newline at end of file
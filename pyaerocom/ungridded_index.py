@@ -0,0 +1,561 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Lookup tables and indices for fast access to :class:`pyaerocom.UngriddedData`
+
+The classes in this module are derived from the metadata and data array of
+an :class:`UngriddedData` object. They are created on demand and cached in
+the data object (cf. :func:`UngriddedData._get_cached`).
+"""
+import fnmatch
+import numpy as np
+from collections import OrderedDict as od
+
+class MetaDataTable(object):
+    """Columnar representation of the metadata blocks in UngriddedData
+
+    The metadata of :class:`UngriddedData` is stored as dictionary of
+    dictionaries (one for each metadata block). This class provides the
+    content of individual metadata keys (e.g. station_name, latitude,
+    data_id) as arrays over all metadata blocks, so that metadata filters can
+    be evaluated as boolean masks rather than block by block.
+
+    Columns are created on first access. Non-numerical keys are factorised
+    (i.e. stored as array of integer codes pointing to a list of unique
+    values) such that filters only need to be evaluated for the unique
+    values.
+
+    Parameters
+    ----------
+    metadata : dict
+        metadata dictionary of :class:`UngriddedData` object
+    """
+    #: value used in code arrays for blocks that do not contain a key
+    MISSING = -1
+    def __init__(self, metadata):
+        self.meta_keys = list(metadata.keys())
+        self._metas = list(metadata.values())
+        self._codes = {}
+        self._numeric = {}
+        self._var_names = None
+        self._var_bitmap = None
+
+    def __len__(self):
+        return len(self._metas)
+
+    @property
+    def var_names(self):
+        """List of all variables available in the metadata blocks"""
+        if self._var_names is None:
+            self._init_var_bitmap()
+        return self._var_names
+
+    @property
+    def var_bitmap(self):
+        """Boolean array (num blocks x num vars) flagging available variables
+
+        The column order corresponds to :attr:`var_names`.
+        """
+        if self._var_bitmap is None:
+            self._init_var_bitmap()
+        return self._var_bitmap
+
+    def _init_var_bitmap(self):
+        var_names = []
+        var_pos = {}
+        rows, cols = [], []
+        for i, meta in enumerate(self._metas):
+            for var in meta.get('variables', []):
+                if not var in var_pos:
+                    var_pos[var] = len(var_names)
+                    var_names.append(var)
+                rows.append(i)
+                cols.append(var_pos[var])
+        bitmap = np.zeros((len(self), len(var_names)), dtype=bool)
+        bitmap[rows, cols] = True
+        self._var_names = var_names
+        self._var_bitmap = bitmap
+
+    def has_var(self, var_name):
+        """Boolean mask of metadata blocks that contain input variable"""
+        if not var_name in self.var_names:
+            return np.zeros(len(self), dtype=bool)
+        return self.var_bitmap[:, self.var_names.index(var_name)]
+
+    def get_codes(self, key):
+        """Factorised content of input metadata key
+
+        Parameters
+        ----------
+        key : str
+            metadata key (e.g. station_name)
+
+        Returns
+        -------
+        tuple
+            2-element tuple containing
+
+            - ndarray: integer codes for each metadata block (\
+              :attr:`MISSING` if block does not contain key)
+            - list: unique values the codes point to
+
+        Raises
+        ------
+        TypeError
+            if values of input key are not hashable (e.g. lists)
+        """
+        if not key in self._codes:
+            lookup = {}
+            uniq = []
+            codes = np.empty(len(self), dtype=np.int64)
+            for i, meta in enumerate(self._metas):
+                if not key in meta:
+                    codes[i] = self.MISSING
+                    continue
+                val = meta[key]
+                if not val in lookup:
+                    lookup[val] = len(uniq)
+                    uniq.append(val)
+                codes[i] = lookup[val]
+            self._codes[key] = (codes, uniq)
+        return self._codes[key]
+
+    def get_numeric(self, key):
+        """Content of input metadata key as float array
+
+        Blocks that do not contain the key or contain non-numerical values
+        are set to NaN.
+        """
+        if not key in self._numeric:
+            vals = np.full(len(self), np.nan)
+            for i, meta in enumerate(self._metas):
+                try:
+                    vals[i] = meta[key]
+                except (KeyError, TypeError, ValueError):
+                    pass
+            self._numeric[key] = vals
+        return self._numeric[key]
+
+    def _eval(self, key, fun):
+        """Evaluate boolean function for all blocks containing input key"""
+        try:
+            codes, uniq = self.get_codes(key)
+        except TypeError: # unhashable values, evaluate block by block
+            return np.asarray([key in meta and bool(fun(meta[key]))
+                               for meta in self._metas], dtype=bool)
+        # one extra entry at the end for code MISSING (-1)
+        lookup = np.zeros(len(uniq) + 1, dtype=bool)
+        for i, val in enumerate(uniq):
+            lookup[i] = bool(fun(val))
+        return lookup[codes]
+
+    def match_str(self, key, pattern):
+        """Mask of blocks where value of key matches input string
+
+        Wildcard patterns (e.g. ``'Lille*'``) are supported.
+        """
+        if any(x in pattern for x in '*?['):
+            return self._eval(key, lambda val: isinstance(val, str) and
+                              fnmatch.fnmatch(val, pattern))
+        return self._eval(key, lambda val: val == pattern)
+
+    def match_list(self, key, values):
+        """Mask of blocks where value of key is in input list"""
+        return self._eval(key, lambda val: val in values)
+
+    def match_value(self, key, value):
+        """Mask of blocks where value of key equals input value"""
+        return self._eval(key, lambda val: val == value)
+
+    def match_range(self, key, low, high):
+        """Mask of blocks where value of key is in range (including bounds)"""
+        vals = self.get_numeric(key)
+        with np.errstate(invalid='ignore'):
+            return (vals >= low) & (vals <= high)
+
+    def find(self, str_f=None, list_f=None, range_f=None, val_f=None):
+        """Find metadata blocks that match all input filters
+
+        The input filters correspond to the output of
+        :func:`UngriddedData._init_meta_filters`
+
+        Parameters
+        ----------
+        str_f : dict
+            string match filters
+        list_f : dict
+            in-list match filters
+        range_f : dict
+            in-range filters
+        val_f : dict
+            value match filters
+
+        Returns
+        -------
+        ndarray
+            boolean mask (one entry for each metadata block)
+        """
+        mask = np.ones(len(self), dtype=bool)
+        for key, val in (str_f or od()).items():
+            mask &= self.match_str(key, val)
+        for key, val in (list_f or od()).items():
+            mask &= self.match_list(key, val)
+        for key, (low, high) in (range_f or od()).items():
+            mask &= self.match_range(key, low, high)
+        for key, val in (val_f or od()).items():
+            mask &= self.match_value(key, val)
+        return mask
+
+class StationNameIndex(object):
+    """Hash map of station names to metadata indices
+
+    Station names are looked up directly. Wildcard patterns (cf.
+    :mod:`fnmatch`) are translated and compiled once and matched only
+    against the unique station names.
+
+    Parameters
+    ----------
+    meta_table : MetaDataTable
+        metadata table of :class:`UngriddedData` object
+    """
+    def __init__(self, meta_table):
+        codes, names = meta_table.get_codes('station_name')
+        meta_keys = meta_table.meta_keys
+        groups = od()
+        for name in sorted(names, key=str):
+            groups[name] = []
+        for i, code in enumerate(codes):
+            if code != meta_table.MISSING:
+                groups[names[code]].append(meta_keys[i])
+        self._pos = {k : i for i, k in enumerate(meta_keys)}
+        self.groups = groups
+
+    @property
+    def names(self):
+        """Sorted list of unique station names"""
+        return list(self.groups.keys())
+
+    def find(self, pattern):
+        """Find metadata indices of all blocks matching name or pattern
+
+        Parameters
+        ----------
+        pattern : str
+            station name or wildcard pattern
+
+        Returns
+        -------
+        list
+            matching metadata indices (in order of metadata blocks), empty
+            if no station matches
+        """
+        if pattern in self.groups and not any(x in pattern for x in '*?['):
+            names = [pattern]
+        else:
+            names = fnmatch.filter([x for x in self.names 
+                                    if isinstance(x, str)], pattern)
+        idx = []
+        for name in names:
+            idx.extend(self.groups[name])
+        if len(names) > 1:
+            idx.sort(key=self._pos.__getitem__)
+        return idx
+
+class StationSpatialIndex(object):
+    """Spatial index of station coordinates for radius and nearest queries
+
+    The station coordinates are converted to cartesian coordinates on the
+    unit sphere and stored in a KD-tree (:class:`scipy.spatial.cKDTree`).
+    Distances between points on the sphere are monotonic in the euclidian
+    (chord) distance, so radius and nearest neighbour queries can be done
+    in the tree and are converted into great circle distances in km.
+
+    Blocks without valid coordinates are not indexed.
+
+    Parameters
+    ----------
+    latitude : ndarray
+        latitudes of stations in decimal degrees
+    longitude : ndarray
+        longitudes of stations in decimal degrees
+    meta_keys : list, optional
+        keys (e.g. metadata indices) corresponding to the coordinates. If
+        None, the positions in the input arrays are used.
+    earth_radius : float
+        average earth radius in km, defaults to 6371.0
+    """
+    def __init__(self, latitude, longitude, meta_keys=None,
+                 earth_radius=6371.0):
+        from scipy.spatial import cKDTree
+        latitude = np.asarray(latitude, dtype=float)
+        longitude = np.asarray(longitude, dtype=float)
+        if meta_keys is None:
+            meta_keys = list(range(len(latitude)))
+        valid = ~(np.isnan(latitude) | np.isnan(longitude))
+        self.meta_keys = np.asarray(meta_keys, dtype=object)[valid]
+        self.earth_radius = earth_radius
+        self._xyz = self._to_xyz(latitude[valid], longitude[valid])
+        self._tree = cKDTree(self._xyz)
+
+    def __len__(self):
+        return len(self.meta_keys)
+
+    @staticmethod
+    def _to_xyz(lat, lon):
+        lat, lon = np.deg2rad(lat), np.deg2rad(lon)
+        cos_lat = np.cos(lat)
+        return np.stack([cos_lat * np.cos(lon), cos_lat * np.sin(lon),
+                         np.sin(lat)], axis=-1)
+
+    def _km_to_chord(self, dist_km):
+        angle = np.minimum(np.asarray(dist_km) / self.earth_radius, np.pi)
+        return 2 * np.sin(angle / 2)
+
+    def _chord_to_km(self, chord):
+        return 2 * self.earth_radius * np.arcsin(np.minimum(chord / 2, 1))
+
+    def query_radius(self, lat, lon, radius_km):
+        """Find all stations within a certain radius around a location
+
+        Parameters
+        ----------
+        lat : float
+            latitude of location in decimal degrees
+        lon : float
+            longitude of location in decimal degrees
+        radius_km : float
+            search radius in km
+
+        Returns
+        -------
+        tuple
+            2-element tuple containing
+
+            - ndarray: keys of stations within radius (sorted by distance)
+            - ndarray: corresponding distances in km
+        """
+        xyz = self._to_xyz(lat, lon)
+        idx = np.asarray(self._tree.query_ball_point(
+                xyz, self._km_to_chord(radius_km)), dtype=int)
+        dists = self._chord_to_km(np.linalg.norm(self._xyz[idx] - xyz,
+                                                 axis=-1))
+        order = np.argsort(dists, kind='stable')
+        return (self.meta_keys[idx[order]], dists[order])
+
+    def query_nearest(self, lat, lon, k=1):
+        """Find the nearest station(s) of a location
+
+        Parameters
+        ----------
+        lat : float
+            latitude of location in decimal degrees
+        lon : float
+            longitude of location in decimal degrees
+        k : int
+            number of nearest stations to be returned
+
+        Returns
+        -------
+        tuple
+            2-element tuple containing
+
+            - ndarray: keys of nearest stations (sorted by distance)
+            - ndarray: corresponding distances in km
+        """
+        k = min(k, len(self))
+        chords, idx = self._tree.query(self._to_xyz(lat, lon), k=k)
+        chords, idx = np.atleast_1d(chords), np.atleast_1d(idx)
+        return (self.meta_keys[idx], self._chord_to_km(chords))
+
+    def match(self, other, max_dist_km):
+        """Find nearest station in other index for each station in this one
+
+        Parameters
+        ----------
+        other : StationSpatialIndex
+            other spatial index
+        max_dist_km : float
+            maximum distance in km for two stations to be considered a match
+
+        Returns
+        -------
+        OrderedDict
+            keys are station keys of this index, values are 2-element tuples
+            with key of matching station in other index and distance in km
+            (only stations that have a match are included)
+        """
+        matches = od()
+        if len(self) == 0 or len(other) == 0:
+            return matches
+        chords, idx = other._tree.query(
+                self._xyz, k=1, distance_upper_bound=self._km_to_chord(
+                        max_dist_km) * (1 + 1e-9))
+        dists = self._chord_to_km(np.where(np.isinf(chords), 2, chords))
+        for i in np.where(idx < len(other))[0]:
+            matches[self.meta_keys[i]] = (other.meta_keys[idx[i]], dists[i])
+        return matches
+
+class BlockTimeIndex(object):
+    """Time index of the data blocks (metadata block and variable)
+
+    For each data block (cf. :attr:`UngriddedData.meta_idx`), the first and
+    last timestamp are recorded, so that blocks entirely outside a time 
+    window can be skipped without accessing the data. The timestamps of a 
+    block are only read when the rows of the block within a time window are 
+    requested (cf. :func:`window`), and are not kept in memory, so that only
+    the rows that are accessed are read from memory mapped data arrays.
+
+    Parameters
+    ----------
+    meta_idx : dict
+        data block indices (cf. :attr:`UngriddedData.meta_idx`)
+    times : callable or ndarray
+        function that returns the timestamps (seconds since epoch) of the 
+        rows of an input row index (slice or integer array), or array 
+        containing the timestamps of all rows of the data array
+    bounds : dict, optional
+        first and last timestamp of each data block (cf. :attr:`bounds`), 
+        e.g. as stored by :func:`UngriddedData.to_disk`. If None, they are
+        computed on first access.
+    """
+    def __init__(self, meta_idx, times, bounds=None):
+        if not callable(times):
+            _times = times
+            times = lambda idx: _times[idx]
+        self._read_times = times
+        self._index = od()
+        for meta_key, var_indices in meta_idx.items():
+            for var, idx in var_indices.items():
+                if not isinstance(idx, slice):
+                    idx = np.asarray(idx, dtype=int)
+                self._index[(meta_key, var)] = idx
+        self._bounds = bounds
+        self._keys = None
+        self._tmin = None
+        self._tmax = None
+        
+    @property
+    def bounds(self):
+        """First and last timestamp of each data block
+        
+        OrderedDict, keys are 2-element tuples (metadata key, variable name),
+        values are 2-element tuples (first, last) in seconds since epoch. 
+        Blocks without valid timestamps are not included.
+        """
+        if self._bounds is None:
+            bounds = od()
+            for key, idx in self._index.items():
+                ts = np.asarray(self._read_times(idx), dtype=float)
+                ts = ts[~np.isnan(ts)]
+                if len(ts) > 0:
+                    bounds[key] = (float(ts.min()), float(ts.max()))
+            self._bounds = bounds
+        return self._bounds
+    
+    def _init_arrays(self):
+        if self._keys is None:
+            bounds = self.bounds
+            self._keys = list(bounds.keys())
+            self._tmin = np.asarray([b[0] for b in bounds.values()], 
+                                    dtype=float)
+            self._tmax = np.asarray([b[1] for b in bounds.values()], 
+                                    dtype=float)
+
+    @staticmethod
+    def to_seconds(time):
+        """Convert input time into seconds since epoch (float)
+
+        Parameters
+        ----------
+        time
+            numpy.datetime64 or object convertible into it (e.g. string,
+            datetime) or number (is interpreted as seconds since epoch).
+            None is returned as is.
+        """
+        if time is None or isinstance(time, (int, float, np.number)):
+            return time
+        return float(np.datetime64(time, 's').astype(np.int64))
+
+    def time_range(self, meta_key, var):
+        """First and last timestamp of data block (in seconds since epoch)"""
+        return self.bounds[(meta_key, var)]
+
+    def blocks_in_window(self, start=None, stop=None):
+        """Data blocks that contain data within input time window
+
+        Parameters
+        ----------
+        start : optional
+            start of time window (cf. :func:`to_seconds` for valid input)
+        stop : optional
+            end of time window (cf. :func:`to_seconds` for valid input)
+
+        Returns
+        -------
+        list
+            list of 2-element tuples (metadata key, variable name)
+        """
+        self._init_arrays()
+        mask = np.ones(len(self._keys), dtype=bool)
+        start, stop = self.to_seconds(start), self.to_seconds(stop)
+        if start is not None:
+            mask &= self._tmax >= start
+        if stop is not None:
+            mask &= self._tmin <= stop
+        return [self._keys[i] for i in np.where(mask)[0]]
+
+    def window(self, meta_key, var, start=None, stop=None):
+        """Row index of data block within input time window
+
+        The rows are returned in chronological order. Rows with invalid
+        (NaN) timestamps are not included.
+
+        Parameters
+        ----------
+        meta_key
+            metadata index of block
+        var : str
+            variable name
+        start : optional
+            start of time window (cf. :func:`to_seconds` for valid input)
+        stop : optional
+            end of time window (cf. :func:`to_seconds` for valid input)
+
+        Returns
+        -------
+        slice or ndarray
+            row index into data array (slice if the block is contiguous and
+            sorted, else integer array), empty if block does not exist or
+            does not contain data in the time window
+        """
+        key = (meta_key, var)
+        if not key in self._index:
+            return np.empty(0, dtype=int)
+        start, stop = self.to_seconds(start), self.to_seconds(stop)
+        if self._bounds is not None:
+            if not key in self._bounds:
+                return np.empty(0, dtype=int)
+            tmin, tmax = self._bounds[key]
+            if ((start is not None and tmax < start) or 
+                (stop is not None and tmin > stop)):
+                return np.empty(0, dtype=int)
+        idx = self._index[key]
+        ts = np.asarray(self._read_times(idx), dtype=float)
+        num_valid = len(ts) - np.isnan(ts).sum()
+        order = None
+        if not np.all(ts[1:] >= ts[:-1]):
+            order = np.argsort(ts, kind='stable') # NaNs at the end
+            ts = ts[order]
+        i0, i1 = 0, num_valid
+        if start is not None:
+            i0 = np.searchsorted(ts[:num_valid], start, side='left')
+        if stop is not None:
+            i1 = np.searchsorted(ts[:num_valid], stop, side='right')
+        i1 = max(i0, i1)
+        if order is None and isinstance(idx, slice):
+            return slice(idx.start + int(i0), idx.start + int(i1))
+        if isinstance(idx, slice):
+            idx = np.arange(idx.start, idx.stop)
+        if order is not None:
+            return idx[order[i0:i1]]
+        return idx[i0:i1]
@@ -0,0 +1,657 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Storage backends for the data array of :class:`pyaerocom.UngriddedData`
+"""
+import os
+import numpy as np
+from collections import OrderedDict as od
+
+class ColumnarDataArray(object):
+    """Typed, columnar replacement of the 2D float64 array in UngriddedData
+
+    The default storage of :class:`UngriddedData` is a single 2D numpy array
+    of dtype float64, where each column is reserved for one type of
+    information (cf. :attr:`UngriddedData.index`). This class stores the
+    same information column by column, each column in a dtype suitable for
+    its content (e.g. int32 for metadata keys, int16 for variable indices,
+    int64 for timestamps). Columns that are usually empty (e.g. flags,
+    uncertainties or the trash column) are only allocated once non-NaN
+    values are written to them.
+
+    The class supports the ``[rows, column]`` indexing patterns used
+    throughout :class:`UngriddedData` so it can be assigned to
+    :attr:`UngriddedData._data` in place of the 2D numpy array. Single column
+    access always returns float64 arrays (with NaN for missing entries),
+    that is, the same values the dense array would return.
+
+    Note
+    ----
+    Values written to integer columns are truncated (e.g. timestamps are
+    stored with the resolution of the numerical timestamps written by the
+    reading routines, which are integers anyways).
+
+    Parameters
+    ----------
+    num_rows : int
+        number of rows
+    index : dict
+        mapping of column names (cf. :func:`UngriddedData._init_index`) to
+        column numbers
+    value_dtype
+        dtype of data value column (e.g. use np.float32 to half the memory
+        of the data column)
+    """
+    #: dtypes of columns (all columns not specified here are float64)
+    DTYPES = {'meta'    : np.int32,
+              'varidx'  : np.int16,
+              'time'    : np.int64}
+
+    #: columns that are always allocated (all others are created on demand)
+    REQUIRED = ['meta', 'time', 'latitude', 'longitude', 'altitude',
+                'varidx', 'data']
+
+    def __init__(self, num_rows, index, value_dtype=None):
+        if value_dtype is None:
+            value_dtype = np.float64
+        self._num_rows = int(num_rows)
+        self._index = od(index)
+        self._names = od((colnum, name) for name, colnum in index.items())
+        self._dtypes = {}
+        for name, colnum in self._index.items():
+            if name in self.DTYPES:
+                dtype = self.DTYPES[name]
+            elif name == 'data':
+                dtype = value_dtype
+            else:
+                dtype = np.float64
+            self._dtypes[colnum] = np.dtype(dtype)
+        self._cols = {}
+        for name in self.REQUIRED:
+            colnum = self._index[name]
+            self._cols[colnum] = self._empty_col(colnum, self._num_rows)
+
+    @property
+    def shape(self):
+        """Shape of data array (number of rows, number of columns)"""
+        return (self._num_rows, len(self._index))
+
+    @property
+    def dtype(self):
+        """dtype of values returned on column access"""
+        return np.dtype(np.float64)
+
+    @property
+    def nbytes(self):
+        """Number of bytes allocated by all columns"""
+        return sum([col.nbytes for col in self._cols.values()])
+
+    @property
+    def allocated_columns(self):
+        """List of names of columns that are currently allocated"""
+        return [self._names[c] for c in sorted(self._cols)]
+
+    def __len__(self):
+        return self._num_rows
+
+    def _fill_value(self, colnum):
+        """Value representing NaN in column"""
+        dtype = self._dtypes[colnum]
+        if dtype.kind == 'f':
+            return np.nan
+        return np.iinfo(dtype).min
+
+    def _empty_col(self, colnum, num):
+        return np.full(num, self._fill_value(colnum),
+                       dtype=self._dtypes[colnum])
+
+    def _to_float(self, colnum, vals):
+        """Convert stored column values into float64"""
+        if self._dtypes[colnum].kind == 'f':
+            return np.asarray(vals, dtype=np.float64)
+        out = np.asarray(vals, dtype=np.float64)
+        invalid = vals == self._fill_value(colnum)
+        if np.any(invalid):
+            if out.ndim == 0:
+                return np.nan
+            out[invalid] = np.nan
+        return out
+
+    def _to_stored(self, colnum, vals):
+        """Convert input values into dtype of column"""
+        dtype = self._dtypes[colnum]
+        if dtype.kind == 'f':
+            return np.asarray(vals, dtype=dtype)
+        vals = np.asarray(vals, dtype=np.float64)
+        invalid = np.isnan(vals)
+        if np.any(invalid):
+            vals = np.where(invalid, self._fill_value(colnum), vals)
+        return vals.astype(dtype)
+
+    def _num_selected(self, rows):
+        """Number of rows selected by input row index"""
+        if isinstance(rows, slice):
+            return len(range(*rows.indices(self._num_rows)))
+        rows = np.asarray(rows)
+        if rows.dtype == bool:
+            return int(rows.sum())
+        return rows.size
+
+    def _colnum(self, col):
+        if isinstance(col, (int, np.integer)):
+            if col < 0:
+                col += len(self._index)
+            if not col in self._dtypes:
+                raise IndexError('Invalid column index {}'.format(col))
+            return int(col)
+        raise IndexError('Invalid column index {}, need int'.format(col))
+
+    def _split_key(self, key):
+        if not isinstance(key, tuple):
+            return (key, slice(None))
+        elif len(key) == 1:
+            return (key[0], slice(None))
+        elif len(key) != 2:
+            raise IndexError('Too many indices for data array')
+        return key
+
+    def _colnums_from_slice(self, cols):
+        return list(range(len(self._index)))[cols]
+
+    def get_col(self, col, rows=slice(None)):
+        """Get data of one column as float64 (missing entries are NaN)
+
+        Parameters
+        ----------
+        col : int
+            column number
+        rows
+            row index (slice, integer or boolean array)
+
+        Returns
+        -------
+        ndarray or float
+            values
+        """
+        colnum = self._colnum(col)
+        if not colnum in self._cols:
+            if isinstance(rows, (int, np.integer)):
+                return np.nan
+            return np.full(self._num_selected(rows), np.nan)
+        return self._to_float(colnum, self._cols[colnum][rows])
+
+    def set_col(self, col, rows, vals):
+        """Write values into column
+
+        Optional columns that are not yet allocated are created if the input
+        contains at least one valid value. Writing only NaNs into all rows of
+        an optional column releases its memory.
+        """
+        colnum = self._colnum(col)
+        vals = np.asarray(vals)
+        if not colnum in self._cols:
+            if vals.dtype.kind == 'f' and np.isnan(vals).all():
+                return
+            self._cols[colnum] = self._empty_col(colnum, self._num_rows)
+        elif (self._names[colnum] not in self.REQUIRED and
+              isinstance(rows, slice) and rows == slice(None) and
+              vals.dtype.kind == 'f' and np.isnan(vals).all()):
+            del self._cols[colnum]
+            return
+        self._cols[colnum][rows] = self._to_stored(colnum, vals)
+
+    def __getitem__(self, key):
+        rows, cols = self._split_key(key)
+        if isinstance(cols, (int, np.integer)):
+            return self.get_col(cols, rows)
+        elif isinstance(cols, slice) and cols == slice(None):
+            if isinstance(rows, (int, np.integer)):
+                return np.asarray([self.get_col(c, rows) for c in
+                                   range(len(self._index))])
+            return self.take(rows)
+        elif isinstance(cols, slice):
+            colnums = self._colnums_from_slice(cols)
+            return np.stack([self.get_col(c, rows) for c in colnums], axis=-1)
+        raise IndexError('Unsupported column index {}'.format(cols))
+
+    def __setitem__(self, key, val):
+        rows, cols = self._split_key(key)
+        if isinstance(cols, (int, np.integer)):
+            self.set_col(cols, rows, val)
+            return
+        elif not isinstance(cols, slice):
+            raise IndexError('Unsupported column index {}'.format(cols))
+        colnums = self._colnums_from_slice(cols)
+        if isinstance(val, ColumnarDataArray):
+            for colnum in colnums:
+                if colnum in val._cols:
+                    self.set_col(colnum, rows, val.get_col(colnum))
+                elif colnum in self._cols:
+                    self.set_col(colnum, rows,
+                                 np.full(len(val), np.nan))
+            return
+        val = np.asarray(val, dtype=np.float64)
+        for i, colnum in enumerate(colnums):
+            if val.ndim == 2:
+                self.set_col(colnum, rows, val[:, i])
+            elif val.ndim == 1 and isinstance(rows, (int, np.integer)):
+                self.set_col(colnum, rows, val[i])
+            else:
+                self.set_col(colnum, rows, val)
+
+    def __array__(self, dtype=None, copy=None):
+        arr = self.to_dense()
+        return arr if dtype is None else arr.astype(dtype)
+
+    def _new_like(self, num_rows):
+        new = ColumnarDataArray.__new__(ColumnarDataArray)
+        new._num_rows = int(num_rows)
+        new._index = self._index
+        new._names = self._names
+        new._dtypes = self._dtypes
+        new._cols = {}
+        return new
+
+    def take(self, rows):
+        """Create new instance containing input row selection
+
+        Parameters
+        ----------
+        rows
+            row index (slice, integer array or boolean array)
+
+        Returns
+        -------
+        ColumnarDataArray
+            new instance containing only the selected rows
+        """
+        new = self._new_like(self._num_selected(rows))
+        for colnum, col in self._cols.items():
+            new._cols[colnum] = col[rows]
+            if isinstance(rows, slice): # make sure to not return a view
+                new._cols[colnum] = np.array(new._cols[colnum])
+        return new
+
+    def copy(self):
+        """Copy of this array"""
+        new = self._new_like(self._num_rows)
+        for colnum, col in self._cols.items():
+            new._cols[colnum] = np.array(col) # in-memory copy (also of memmaps)
+        return new
+
+    def to_dense(self):
+        """Convert into 2D float64 numpy array"""
+        arr = np.empty(self.shape) * np.nan
+        for colnum in self._cols:
+            arr[:, colnum] = self.get_col(colnum)
+        return arr
+
+    @staticmethod
+    def from_dense(arr, index, value_dtype=None):
+        """Create instance from 2D float64 numpy array
+
+        Parameters
+        ----------
+        arr : ndarray
+            2D numpy array (e.g. :attr:`UngriddedData._data`)
+        index : dict
+            column index mapping
+        value_dtype
+            dtype of data column
+
+        Returns
+        -------
+        ColumnarDataArray
+            new instance
+        """
+        new = ColumnarDataArray(arr.shape[0], index, value_dtype)
+        for colnum in range(arr.shape[1]):
+            new.set_col(colnum, slice(None), arr[:, colnum])
+        return new
+
+    @staticmethod
+    def from_columns(cols, index, num_rows, value_dtype=None):
+        """Create instance from existing column arrays
+
+        The input arrays are used as they are (i.e. not copied) if they
+        have the dtype of the corresponding column, which makes it possible
+        to use memory mapped arrays as columns (cf. :func:`load_columns`).
+
+        Parameters
+        ----------
+        cols : dict
+            column arrays, keys are column names
+        index : dict
+            column index mapping
+        num_rows : int
+            number of rows (length of each column)
+        value_dtype
+            dtype of data column
+
+        Returns
+        -------
+        ColumnarDataArray
+            new instance
+        """
+        new = ColumnarDataArray(0, index, value_dtype)
+        new._num_rows = int(num_rows)
+        new._cols = {}
+        for name, col in cols.items():
+            colnum = new._index[name]
+            if not len(col) == num_rows:
+                raise ValueError('Length of column {} ({}) does not match '
+                                 'number of rows ({})'
+                                 .format(name, len(col), num_rows))
+            if not col.dtype == new._dtypes[colnum]:
+                col = col.astype(new._dtypes[colnum])
+            new._cols[colnum] = col
+        for name in new.REQUIRED:
+            colnum = new._index[name]
+            if not colnum in new._cols:
+                new._cols[colnum] = new._empty_col(colnum, num_rows)
+        return new
+
+    @property
+    def value_dtype(self):
+        """dtype of data column"""
+        return self._dtypes[self._index['data']]
+
+    @property
+    def is_memmap(self):
+        """True if any of the columns is a memory mapped array"""
+        return any([isinstance(col, np.memmap) for col in self._cols.values()])
+
+    @staticmethod
+    def concatenate(arrays):
+        """Concatenate multiple arrays along the row axis
+
+        Parameters
+        ----------
+        arrays : list
+            list of :class:`ColumnarDataArray` instances (2D numpy arrays are
+            converted using the column layout of the first columnar input)
+
+        Returns
+        -------
+        ColumnarDataArray
+            new instance
+        """
+        first = None
+        for arr in arrays:
+            if isinstance(arr, ColumnarDataArray):
+                first = arr
+                break
+        if first is None:
+            raise ValueError('Need at least one ColumnarDataArray')
+        value_dtype = first._dtypes[first._index['data']]
+        arrays = [a if isinstance(a, ColumnarDataArray) else
+                  ColumnarDataArray.from_dense(a, first._index, value_dtype)
+                  for a in arrays]
+        for arr in arrays:
+            if not arr.shape[1] == first.shape[1]:
+                raise ValueError('Cannot concatenate arrays with different '
+                                 'number of columns')
+        num = sum([len(a) for a in arrays])
+        new = first._new_like(num)
+        allocated = []
+        for arr in arrays:
+            allocated.extend([c for c in arr._cols if not c in allocated])
+        for colnum in allocated:
+            parts = []
+            for arr in arrays:
+                if colnum in arr._cols:
+                    parts.append(arr._cols[colnum])
+                else:
+                    parts.append(arr._empty_col(colnum, len(arr)))
+            new._cols[colnum] = np.concatenate(parts)
+        return new
+
+    def __repr__(self):
+        return ('{} <shape: {}; allocated: {}; nbytes: {}>'
+                .format(type(self).__name__, self.shape,
+                        self.allocated_columns, self.nbytes))
+
+class DataArrayBuilder(object):
+    """Buffer for incremental ingestion of data blocks into UngriddedData
+
+    Reading routines usually write the data of each file (station and
+    variable) into the data array of an :class:`UngriddedData` object
+    successively, which requires the array to be extended (i.e. copied) many
+    times. This class instead collects the data blocks (list of chunks) and
+    creates the final data array at once in :func:`finalize`.
+
+    Columns with constant values in a block (e.g. station coordinates,
+    metadata key) can be provided as scalars and are only expanded on
+    finalisation.
+
+    Example
+    -------
+    >>> data_obj = UngriddedData()
+    >>> builder = DataArrayBuilder(data_obj.index)
+    >>> start, stop = builder.add_block(len(times), meta=0, time=times,
+    ...                                 data=values, varidx=0, latitude=10,
+    ...                                 longitude=20, altitude=300)
+    >>> data_obj.meta_idx[0] = {'od550aer' : block_index(start, stop)}
+    >>> builder.finalize(data_obj)
+
+    Parameters
+    ----------
+    index : dict
+        mapping of column names to column numbers (cf.
+        :attr:`UngriddedData.index`)
+    """
+    def __init__(self, index):
+        self._index = index
+        self._blocks = []
+        self._num_rows = 0
+
+    @property
+    def num_rows(self):
+        """Total number of rows added so far"""
+        return self._num_rows
+
+    def add_block(self, num, **cols):
+        """Add data block
+
+        Parameters
+        ----------
+        num : int
+            number of rows in block
+        **cols
+            column values (keys are column names, cf. :attr:`index`, values
+            are either scalars or arrays of length ``num``). Columns that are
+            not provided, or that are None, are filled with NaN.
+
+        Returns
+        -------
+        tuple
+            start and stop row index of block in final data array
+        """
+        block = {}
+        for name, val in cols.items():
+            if not name in self._index:
+                raise KeyError('Invalid column name {}. Choose from {}'
+                               .format(name, list(self._index)))
+            elif val is None:
+                continue
+            val = np.asarray(val, dtype=np.float64)
+            if val.ndim > 0 and not len(val) == num:
+                raise ValueError('Length mismatch of column {}: got {}, '
+                                 'expected {}'.format(name, len(val), num))
+            block[name] = val
+        start = self._num_rows
+        self._blocks.append((num, block))
+        self._num_rows += num
+        return (start, self._num_rows)
+
+    def _make_col(self, name):
+        # preallocated column, scalar values are broadcasted into their block
+        col = np.full(self._num_rows, np.nan)
+        pos = 0
+        for num, block in self._blocks:
+            if name in block:
+                col[pos:pos+num] = block[name]
+            pos += num
+        return col
+
+    def finalize(self, data_obj):
+        """Write all buffered data blocks into data object
+
+        The data array of the input object is replaced with a new array
+        (dense or columnar, depending on the settings of the data object)
+        containing all blocks that were added.
+
+        Parameters
+        ----------
+        data_obj : UngriddedData
+            data object
+
+        Returns
+        -------
+        UngriddedData
+            input data object with new data array
+        """
+        arr = data_obj._init_data_array(self._num_rows)
+        if self._num_rows > 0:
+            names = []
+            for _, block in self._blocks:
+                names.extend([n for n in block if not n in names])
+            for name in names:
+                arr[:, self._index[name]] = self._make_col(name)
+        data_obj._data = arr
+        data_obj._ROWNO = self._num_rows
+        self._blocks = []
+        self._num_rows = 0
+        return data_obj
+
+def save_columns(arr, path):
+    """Write all allocated columns of a columnar data array to disk
+
+    Each column is stored as a separate numpy binary file (``<name>.npy``)
+    in the input directory, which allows to memory map individual columns
+    when loading them (cf. :func:`load_columns`).
+
+    Parameters
+    ----------
+    arr : ColumnarDataArray
+        data array
+    path : str
+        output directory (is created if it does not exist)
+
+    Returns
+    -------
+    list
+        names of columns that were written
+    """
+    if not os.path.exists(path):
+        os.makedirs(path)
+    names = []
+    for colnum, col in arr._cols.items():
+        name = arr._names[colnum]
+        np.save(os.path.join(path, '{}.npy'.format(name)), col)
+        names.append(name)
+    return names
+
+def load_columns(path, names, mmap_mode='r'):
+    """Load columns written by :func:`save_columns`
+
+    Parameters
+    ----------
+    path : str
+        directory containing the column files
+    names : list
+        names of columns to be loaded
+    mmap_mode : :obj:`str`, optional
+        mode used for memory mapping of the files (cf. :func:`numpy.load`),
+        e.g. 'r' for read only or 'c' for copy-on-write. If None, the
+        columns are loaded into memory.
+
+    Returns
+    -------
+    OrderedDict
+        column arrays, keys are column names
+    """
+    cols = od()
+    for name in names:
+        cols[name] = np.load(os.path.join(path, '{}.npy'.format(name)),
+                             mmap_mode=mmap_mode)
+    return cols
+
+# Helpers for the data indices stored in UngriddedData.meta_idx. The indices
+# of one metadata block and variable are usually contiguous in the data array
+# and are then stored as slice objects, which are cheap to store, to shift 
+# and to concatenate and which provide views of the data array when used for
+# indexing. Non-contiguous blocks (e.g. after merging of metadata blocks) are
+# stored as integer arrays.
+def block_index(start, stop):
+    """Index of contiguous data block in data array
+    
+    Parameters
+    ----------
+    start : int
+        first row of block
+    stop : int
+        last row of block + 1
+    
+    Returns
+    -------
+    slice
+        slice object representing the block
+    """
+    return slice(int(start), int(stop))
+
+def index_len(idx):
+    """Number of rows in data index (slice, range or integer array)"""
+    if isinstance(idx, slice):
+        return max(idx.stop - idx.start, 0)
+    return len(idx)
+
+def index_to_array(idx):
+    """Convert data index (slice, range or integer array) into numpy array"""
+    if isinstance(idx, slice):
+        return np.arange(idx.start, idx.stop)
+    return np.asarray(idx, dtype=int)
+
+def shift_index(idx, offset):
+    """Shift data index by input offset
+    
+    Parameters
+    ----------
+    idx
+        data index (slice, range or integer array)
+    offset : int
+        offset that is added to all row indices
+    
+    Returns
+    -------
+    slice or ndarray
+        shifted index (slice if input is a slice)
+    """
+    if isinstance(idx, slice):
+        return slice(idx.start + offset, idx.stop + offset)
+    return index_to_array(idx) + offset
+
+def join_indices(idx, other):
+    """Append data index to another one
+    
+    The result is a slice object if both indices are contiguous and 
+    ``other`` directly follows ``idx``, else an integer array.
+    
+    Parameters
+    ----------
+    idx 
+        data index (slice, range or integer array), may be None
+    other
+        data index that is appended
+    
+    Returns
+    -------
+    slice or ndarray
+        combined index
+    """
+    if idx is None:
+        return other
+    if (isinstance(idx, slice) and isinstance(other, slice) and 
+        idx.stop == other.start):
+        return slice(idx.start, other.stop)
+    return np.append(index_to_array(idx), index_to_array(other))
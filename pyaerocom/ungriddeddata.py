@@ -1,5 +1,7 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
+import os
+import pickle
 import numpy as np
 from datetime import datetime
 from collections import OrderedDict as od
@@ -15,8 +17,14 @@ from pyaerocom.mathutils import in_range
 from pyaerocom.helpers import (same_meta_dict, 
                                start_stop_str,
                                start_stop, merge_station_data,
-                               isnumeric)
+                               isnumeric, _get_pandas_freq_and_loffset)
 from pyaerocom.metastandards import StationMetaData
+from pyaerocom.ungridded_storage import (ColumnarDataArray, save_columns,
+                                         load_columns, block_index,
+                                         index_len, index_to_array,
+                                         shift_index, join_indices)
+from pyaerocom.ungridded_index import (MetaDataTable, StationNameIndex,
+                                       StationSpatialIndex, BlockTimeIndex)
 
 class UngriddedData(object):
     """Class representing ungridded data
@@ -75,10 +83,18 @@ class UngriddedData(object):
         inital number of total datapoints (number of rows in 2D dataarray)
     add_cols : :obj:`list`, optional
         list of additional index column names of 2D datarray.
+    columnar : :obj:`bool`, optional
+        if True, the data is stored in an instance of 
+        :class:`ColumnarDataArray` (typed columns, optional columns are only
+        allocated on demand) rather than in a 2D float64 numpy array. If None, 
+        the default is used (cf. :attr:`pyaerocom.const.UNGRIDDED_COLUMNAR`).
+    value_dtype : :obj:`str`, optional
+        dtype of data values, only relevant for columnar storage. If None, 
+        the default is used (cf. :attr:`pyaerocom.const.UNGRIDDED_VALUE_DTYPE`)
         
     """
     #: version of class (for caching)
-    __version__ = '0.21'
+    __version__ = '0.23'
     
     #: inital total number of rows in dataarray
     _ROWNO = 10000
@@ -109,7 +125,13 @@ class UngriddedData(object):
     _LAT_OFFSET = np.float(90.)
     
     STANDARD_META_KEYS = list(StationMetaData().keys())
-    def __init__(self, num_points=None, add_cols=None, chunksize=_CHUNKSIZE):
+    
+    #: name of file containing metadata and indices in directories written 
+    #: by :func:`to_disk`
+    DISK_SIDECAR_FILE = 'ungridded_meta.pkl'
+    
+    def __init__(self, num_points=None, add_cols=None, chunksize=_CHUNKSIZE,
+                 columnar=None, value_dtype=None):
 
         self._index = self._init_index(add_cols)
         if num_points is None:
@@ -118,9 +140,21 @@ class UngriddedData(object):
             self._ROWNO = num_points
 
         self._CHUNKSIZE = chunksize
-
+        
+        # lookup tables and indices that are created on demand and counter 
+        # of modifications they depend on (cf. _get_cached)
+        self._cache = {}
+        self._mod_count = 0
+        
+        if columnar is None:
+            columnar = const.UNGRIDDED_COLUMNAR
+        if value_dtype is None:
+            value_dtype = const.UNGRIDDED_VALUE_DTYPE
+        self._columnar = bool(columnar)
+        self._value_dtype = value_dtype
+        
         #keep private, this is not supposed to be used by the user
-        self._data = np.empty([num_points, self._COLNO]) * np.nan
+        self._data = self._init_data_array(num_points)
 
         self.metadata = od()
         # single value data revision is deprecated
@@ -131,6 +165,152 @@ class UngriddedData(object):
         self._idx = -1
 
         self.filter_hist = od()
+        
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['_cache'] = {}
+        return state
+    
+    def __setstate__(self, state):
+        # objects pickled with older versions store the attributes under 
+        # their public names
+        for key, attr in (('metadata', '_metadata'), 
+                          ('meta_idx', '_meta_idx'),
+                          ('_data', '_data_arr')):
+            if key in state:
+                state[attr] = state.pop(key)
+        self.__dict__.update(state)
+        self._cache = {}
+        self._mod_count = 0
+    
+    @property
+    def metadata(self):
+        """Metadata blocks (keys are metadata indices, values are dicts)
+        
+        Note
+        ----
+        Lookup tables and indices derived from the metadata are cached (cf. 
+        :func:`_get_cached`). If metadata dictionaries are modified in place,
+        e.g. ``data.metadata[0]['ts_type'] = 'monthly'``, 
+        :func:`_invalidate_cache` needs to be called afterwards.
+        """
+        return self._metadata
+    
+    @metadata.setter
+    def metadata(self, val):
+        self._metadata = val
+        self._invalidate_cache()
+        
+    @property
+    def meta_idx(self):
+        """Row indices of data blocks of each metadata block and variable
+        
+        Note
+        ----
+        If modified in place, :func:`_invalidate_cache` needs to be called 
+        afterwards (cf. :attr:`metadata`).
+        """
+        return self._meta_idx
+    
+    @meta_idx.setter
+    def meta_idx(self, val):
+        self._meta_idx = val
+        self._invalidate_cache()
+        
+    @property
+    def _data(self):
+        """Data array (cf. :attr:`index` for columns)"""
+        return self._data_arr
+    
+    @_data.setter
+    def _data(self, val):
+        self._data_arr = val
+        self._invalidate_cache()
+        
+    def _cache_state(self):
+        """Fingerprint of the attributes cached indices depend on
+        
+        Contains the number of modifications (cf. :func:`_invalidate_cache`)
+        and the sizes of metadata, index and data array, so that blocks that
+        are added by reading routines are detected as well.
+        """
+        return (self._mod_count, len(self._metadata), len(self._meta_idx),
+                len(self._data_arr))
+    
+    def _get_cached(self, name, fun):
+        """Get cached object (e.g. index, lookup table) or create it
+        
+        Cached objects depend on the metadata, the index (:attr:`meta_idx`)
+        and the time column of the data array. They are discarded if any of
+        these attributes has been replaced or changed in size since the 
+        object was created (cf. :func:`_cache_state`). Methods that modify 
+        them in place need to call :func:`_invalidate_cache`.
+        
+        Parameters
+        ----------
+        name : str
+            name of cached object
+        fun : callable
+            function that creates the object (is called without arguments)
+        
+        Returns
+        -------
+        object
+            cached object
+        """
+        state = self._cache_state()
+        if not self._cache.get('__state__') == state:
+            self._cache = {'__state__' : state}
+        if not name in self._cache:
+            self._cache[name] = fun()
+        return self._cache[name]
+    
+    def _invalidate_cache(self):
+        """Delete all cached lookup tables and indices
+        
+        Needs to be called after in place modifications of :attr:`metadata`
+        or :attr:`meta_idx` (e.g. changes of metadata values).
+        """
+        self._mod_count += 1
+        self._cache = {}
+    
+    @property
+    def meta_table(self):
+        """Columnar table of metadata blocks (:class:`MetaDataTable`)"""
+        return self._get_cached('meta_table', 
+                                lambda: MetaDataTable(self.metadata))
+    
+    @property
+    def station_name_index(self):
+        """Station name lookup table (:class:`StationNameIndex`)"""
+        return self._get_cached('station_name_index', 
+                                lambda: StationNameIndex(self.meta_table))
+    
+    @property
+    def spatial_index(self):
+        """Spatial index of station coordinates (:class:`StationSpatialIndex`)
+        
+        Can be used to find stations within a certain radius or nearest to 
+        a location, e.g.:
+        
+        >>> keys, dists_km = data.spatial_index.query_radius(48.1, 11.6, 50)
+        """
+        def _make():
+            table = self.meta_table
+            return StationSpatialIndex(table.get_numeric('latitude'),
+                                       table.get_numeric('longitude'),
+                                       table.meta_keys)
+        return self._get_cached('spatial_index', _make)
+    
+    def _read_times(self, rows):
+        """Timestamps of rows of data array (in seconds since epoch)"""
+        return self._data[rows, self._TIMEINDEX]
+    
+    @property
+    def time_index(self):
+        """Time index of data blocks (:class:`BlockTimeIndex`)"""
+        return self._get_cached('time_index', lambda: BlockTimeIndex(
+                self.meta_idx, self._read_times))
 
     def _get_data_revision_helper(self, data_id):
         rev = None
@@ -179,7 +359,7 @@ class UngriddedData(object):
                     
             var_idx = self.meta_idx[idx]
             for var, indices in var_idx.items():
-                if len(indices) == 0:
+                if index_len(indices) == 0:
                     continue # no data assigned for this metadata index
                 
                 assert var in meta['variables'] or var in meta['var_info'], \
@@ -197,6 +377,185 @@ class UngriddedData(object):
     def index(self):
         return self._index
     
+    @property
+    def is_columnar(self):
+        """Boolean specifying whether data is stored in columnar format"""
+        return isinstance(self._data, ColumnarDataArray)
+    
+    @property
+    def nbytes(self):
+        """Number of bytes allocated by data array"""
+        return self._data.nbytes
+    
+    def _init_data_array(self, num_points):
+        """Create empty data array (all NaN) matching the storage settings"""
+        if self._columnar:
+            return ColumnarDataArray(num_points, self._index, 
+                                     self._value_dtype)
+        return np.empty([num_points, self._COLNO]) * np.nan
+    
+    def _new_like(self, num_points=None):
+        """Create new empty instance with same storage settings"""
+        new = UngriddedData(num_points=num_points, 
+                            columnar=self.is_columnar,
+                            value_dtype=self._value_dtype)
+        return new
+    
+    @staticmethod
+    def _concat_data_arrays(arrays):
+        """Concatenate data arrays (dense or columnar) along row axis"""
+        if any([isinstance(x, ColumnarDataArray) for x in arrays]):
+            return ColumnarDataArray.concatenate(arrays)
+        return np.vstack(arrays)
+    
+    def to_columnar(self, value_dtype=None, inplace=False):
+        """Convert data array into columnar storage format
+        
+        Parameters
+        ----------
+        value_dtype : :obj:`str`, optional
+            dtype of data values (e.g. float32). If None, float64 is used.
+        inplace : bool
+            if True, this object is converted, else a copy
+            
+        Returns
+        -------
+        UngriddedData
+            data object using :class:`ColumnarDataArray` storage
+        """
+        obj = self if inplace else self.copy()
+        data = obj._data
+        if isinstance(data, ColumnarDataArray):
+            data = data.to_dense()
+        obj._data = ColumnarDataArray.from_dense(data, obj._index, value_dtype)
+        obj._columnar = True
+        obj._value_dtype = 'float64' if value_dtype is None else value_dtype
+        return obj
+    
+    def to_dense(self, inplace=False):
+        """Convert data array into 2D float64 numpy array
+        
+        Parameters
+        ----------
+        inplace : bool
+            if True, this object is converted, else a copy
+            
+        Returns
+        -------
+        UngriddedData
+            data object using dense numpy storage
+        """
+        obj = self if inplace else self.copy()
+        if isinstance(obj._data, ColumnarDataArray):
+            obj._data = obj._data.to_dense()
+        obj._columnar = False
+        return obj
+    
+    @property
+    def is_memmap(self):
+        """Boolean specifying whether data is memory mapped from disk
+        
+        See :func:`to_disk` and :func:`from_disk`.
+        """
+        if isinstance(self._data, ColumnarDataArray):
+            return self._data.is_memmap
+        return isinstance(self._data, np.memmap)
+    
+    def to_disk(self, path):
+        """Write this object into a directory on disk
+        
+        The data array is stored column by column (one numpy binary file per
+        allocated column, cf. :func:`ColumnarDataArray`), all other 
+        attributes (metadata, indices, etc.) and the first and last timestamp
+        of each data block (cf. :attr:`time_index`) are pickled into a 
+        sidecar file (:attr:`DISK_SIDECAR_FILE`). The output can be loaded 
+        using :func:`from_disk`, which memory maps the columns by default.
+        
+        Parameters
+        ----------
+        path : str
+            output directory (is created if it does not exist)
+            
+        Returns
+        -------
+        str
+            output directory
+        """
+        arr = self._data
+        if not isinstance(arr, ColumnarDataArray):
+            arr = ColumnarDataArray.from_dense(arr, self.index, 
+                                               self._value_dtype)
+        cols = save_columns(arr, path)
+        head = od(version       = self.__version__,
+                  num_rows      = len(arr),
+                  index         = self.index,
+                  value_dtype   = str(arr.value_dtype),
+                  columns       = cols,
+                  time_bounds   = self.time_index.bounds)
+        attrs = od(metadata     = self.metadata,
+                   meta_idx     = self.meta_idx,
+                   var_idx      = self.var_idx,
+                   data_revision= self.data_revision,
+                   filter_hist  = self.filter_hist)
+        with open(os.path.join(path, self.DISK_SIDECAR_FILE), 'wb') as f:
+            pickle.dump(head, f, pickle.HIGHEST_PROTOCOL)
+            pickle.dump(attrs, f, pickle.HIGHEST_PROTOCOL)
+        return path
+    
+    @classmethod
+    def from_disk(cls, path, mmap_mode='r'):
+        """Load data object written by :func:`to_disk`
+        
+        By default, the columns of the data array are memory mapped, that is, 
+        only the rows that are accessed are read from disk (e.g. when 
+        converting single stations or filtering by metadata). Note that 
+        memory mapped columns are read-only in the default mode, thus, 
+        methods that modify data values in place (e.g. 
+        :func:`remove_outliers` with ``inplace=True``) require ``mmap_mode='c'`` 
+        (copy-on-write) or a copy of the object.
+        
+        Parameters
+        ----------
+        path : str
+            directory containing the data
+        mmap_mode : :obj:`str`, optional
+            mode for memory mapping of the columns (cf. :func:`numpy.load`), 
+            if None, the data is loaded into memory
+        
+        Returns
+        -------
+        UngriddedData
+            loaded data object (using columnar storage)
+            
+        Raises
+        ------
+        IOError
+            if input directory does not contain data written by 
+            :func:`to_disk`
+        """
+        sidecar = os.path.join(path, cls.DISK_SIDECAR_FILE)
+        if not os.path.exists(sidecar):
+            raise IOError('No UngriddedData found in {}'.format(path))
+        with open(sidecar, 'rb') as f:
+            head = pickle.load(f)
+            attrs = pickle.load(f)
+        obj = cls(num_points=0, columnar=True, 
+                  value_dtype=head['value_dtype'])
+        obj._index = head['index']
+        cols = load_columns(path, head['columns'], mmap_mode)
+        obj._data = ColumnarDataArray.from_columns(cols, head['index'], 
+                                                   head['num_rows'],
+                                                   head['value_dtype'])
+        obj._ROWNO = head['num_rows']
+        for key, val in attrs.items():
+            setattr(obj, key, val)
+        if head.get('time_bounds') is not None:
+            # time bounds of data blocks are stored, so that the time column
+            # does not need to be read to create the time index
+            obj._get_cached('time_index', lambda: BlockTimeIndex(
+                    obj.meta_idx, obj._read_times, head['time_bounds']))
+        return obj
+    
     @property
     def first_meta_idx(self):
         """First available metadata index"""
@@ -237,6 +596,9 @@ class UngriddedData(object):
     @property
     def has_flag_data(self):
         """Boolean specifying whether this object contains flag data"""
+        if (self.is_columnar and 
+            not 'dataflag' in self._data.allocated_columns):
+            return False
         return (~np.isnan(self._data[:, self._DATAFLAGINDEX])).any()
         
     def copy(self):
@@ -254,8 +616,10 @@ class UngriddedData(object):
             instance
         """
         from copy import deepcopy
-        new = UngriddedData()
-        new._data = np.copy(self._data)
+        new = self._new_like(num_points=0)
+        new._index = self._index
+        new._ROWNO = self._ROWNO
+        new._data = self._data.copy()
         new.metadata = deepcopy(self.metadata)
         new.data_revision = self.data_revision
         new.meta_idx = deepcopy(self.meta_idx)
@@ -408,8 +772,8 @@ class UngriddedData(object):
         """
         if size is None or size < self._CHUNKSIZE:
             size = self._CHUNKSIZE
-        chunk = np.empty([size, self._COLNO])*np.nan
-        self._data = np.append(self._data, chunk, axis=0)
+        chunk = self._init_data_array(size)
+        self._data = self._concat_data_arrays([self._data, chunk])
         self._ROWNO += size
         logger.info("adding chunk, new array size ({})".format(self._data.shape))                
     
@@ -432,10 +796,7 @@ class UngriddedData(object):
         StationNotFoundError
             if no such station exists in this data object
         """
-        idx = []
-        for i, meta in self.metadata.items():
-            if fnmatch.fnmatch(meta['station_name'], station_pattern):
-                idx.append(i)
+        idx = self.station_name_index.find(station_pattern)
         if len(idx) == 0:
             raise StationNotFoundError('No station available in UngriddedData '
                                        'that matches name or pattern {}'
@@ -678,30 +1039,15 @@ class UngriddedData(object):
         # init helper boolean that is set to True if valid data can be found
         # for at least one of the input variables
         FOUND_ONE = False
+        tindex = self.time_index
         for var in vars_avail:
             
-            # get indices of this variable
-            var_idx = self.meta_idx[meta_idx][var]
-            
-            # vector of timestamps corresponding to this variable
-            dtime = self._data[var_idx, 
-                               self._TIMEINDEX].astype('datetime64[s]')
-            
-            # get subset
-            subset = self._data[var_idx]
-            
-            # make sure to extract only valid timestamps
-            if start is None:
-                start = dtime.min()
-            if stop is None:
-                stop = dtime.max()
-            
-            # create access mask for valid time stamps
-            tmask = np.logical_and(dtime >= start, 
-                                   dtime <= stop)
+            # get indices of this variable within time window (sorted by 
+            # time)
+            var_idx = tindex.window(meta_idx, var, start, stop)
             
             # make sure there is some valid data
-            if tmask.sum() == 0:
+            if index_len(var_idx) == 0:
                 logger.info('Ignoring station {}, var {} ({}): '
                             'no data available in specified time interval '
                             '{} - {}'.format(sd['station_name'],
@@ -710,8 +1056,11 @@ class UngriddedData(object):
                                              start, stop))
                 continue
                 
-            dtime = dtime[tmask]
-            subset = subset[tmask]
+            # get subset (copy, var_idx may be a slice)
+            subset = np.array(self._data[var_idx])
+            
+            # vector of timestamps corresponding to this variable
+            dtime = subset[:, self._TIMEINDEX].astype('datetime64[s]')
             
             vals = subset[:, self._DATAINDEX]
             if np.all(np.isnan(vals)):
@@ -782,12 +1131,13 @@ class UngriddedData(object):
         if not isinstance(ignore_index, list):
             raise ValueError('Invalid input for ignore_index, need str or '
                              'list')
-        for stat_name in self.unique_station_names:
-            ok = True
-            for name_or_pattern in ignore_index:
-                if fnmatch.fnmatch(stat_name, name_or_pattern):
-                    ok = False
-            if ok:
+        names = self.unique_station_names
+        ignore = []
+        for name_or_pattern in ignore_index:
+            ignore.extend(fnmatch.filter(names, name_or_pattern))
+        ignore = set(ignore)
+        for stat_name in names:
+            if not stat_name in ignore:
                 _iter.append(stat_name)
         return _iter
         
@@ -797,7 +1147,8 @@ class UngriddedData(object):
         """Convert all data to :class:`StationData` objects
         
         Creates one instance of :class:`StationData` for each metadata block in 
-        this object.
+        this object. See :func:`to_dataframe` for a faster alternative if no 
+        :class:`StationData` objects are required.
 
         Parameters
         ----------
@@ -840,9 +1191,14 @@ class UngriddedData(object):
             
         _iter = self._generate_station_index(by_station_name, 
                                              ignore_index)
+        if by_station_name:
+            # metadata indices of all stations, computed once rather than 
+            # searching the metadata for each station name
+            groups = self.station_name_index.groups
         for idx in _iter:
             try:
-                data = self.to_station_data(idx, vars_to_convert, start, 
+                meta_idx = groups.get(idx, idx) if by_station_name else idx
+                data = self.to_station_data(meta_idx, vars_to_convert, start, 
                                             stop, freq,
                                             merge_if_multi=True,
                                             **kwargs)
@@ -860,6 +1216,119 @@ class UngriddedData(object):
                 out_data['failed'].append([idx, repr(e)])
         return out_data
   
+    def to_dataframe(self, vars_to_convert=None, start=None, stop=None, 
+                     freq=None, how='mean'):
+        """Convert data of all stations into one long-format DataFrame
+        
+        Bulk alternative to :func:`to_station_data_all` for applications that 
+        do not require :class:`StationData` objects. The data array is 
+        filtered, sorted by metadata block, variable and time and (if 
+        applicable) resampled once for all stations.
+        
+        Note
+        ----
+        Other than :func:`StationData.resample_timeseries`, resampling is done
+        without hierarchical resampling constraints. Multiple metadata blocks 
+        of the same station (e.g. different instruments) are not merged, 
+        they can be distinguished via column ``meta_idx``.
+        
+        Parameters
+        ----------
+        vars_to_convert : :obj:`list` or :obj:`str`, optional
+            variables that are supposed to be converted. If None, use all 
+            variables that are available
+        start
+            start time, optional (if not None, input must be convertible into
+            pandas.Timestamp)
+        stop 
+            stop time, optional (if not None, input must be convertible into
+            pandas.Timestamp)
+        freq : str, optional
+            pandas frequency string (e.g. 'D' for daily, 'M' for month end)
+            or valid pyaerocom ts_type (e.g. 'hourly', 'monthly'). If None, 
+            the data is not resampled.
+        how : str
+            aggregation method used for resampling (e.g. mean, median)
+            
+        Returns
+        -------
+        pandas.DataFrame
+            DataFrame with columns meta_idx, station_name, latitude, 
+            longitude, altitude, var_name, time and value (one row for each 
+            valid data point)
+            
+        Raises
+        ------
+        DataCoverageError
+            if no valid data is available for the input variables and time
+            interval
+        """
+        if isinstance(vars_to_convert, str):
+            vars_to_convert = [vars_to_convert]
+        elif vars_to_convert is None:
+            vars_to_convert = self.contains_vars
+        for var in vars_to_convert:
+            if not var in self.var_idx:
+                raise VarNotAvailableError('No such variable {} in '
+                                           'UngriddedData object. '
+                                           'Available vars: {}'
+                                           .format(var, self.contains_vars))
+        table = self.meta_table
+        pos = {k : i for i, k in enumerate(table.meta_keys)}
+        
+        # row indices, metadata block and variable number for each data point
+        rows, blocks, varnums = [], [], []
+        for meta_key, var_indices in self.meta_idx.items():
+            for var, indices in var_indices.items():
+                if not var in vars_to_convert:
+                    continue
+                num = index_len(indices)
+                rows.append(index_to_array(indices))
+                blocks.append(np.full(num, pos[meta_key]))
+                varnums.append(np.full(num, vars_to_convert.index(var)))
+        if len(rows) > 0:
+            rows = np.concatenate(rows)
+            blocks = np.concatenate(blocks)
+            varnums = np.concatenate(varnums)
+            
+            dtime = np.asarray(self._read_times(rows)).astype(
+                                                            'datetime64[s]')
+            mask = ~np.isnan(self._data[rows, self._DATAINDEX])
+            if start is not None or stop is not None:
+                start, stop = start_stop(start, stop)
+                mask &= ((dtime >= np.datetime64(start)) & 
+                         (dtime <= np.datetime64(stop)))
+        if len(rows) == 0 or not np.any(mask):
+            raise DataCoverageError('No valid data available for variables '
+                                    '{} in time interval {} - {}'
+                                    .format(vars_to_convert, start, stop))
+        
+        order = np.lexsort((dtime[mask], varnums[mask], blocks[mask]))
+        rows = rows[mask][order]
+        blocks = blocks[mask][order]
+        df = pd.DataFrame({'meta_idx' : np.asarray(table.meta_keys)[blocks],
+                           'var_name' : np.asarray(vars_to_convert)[
+                                                        varnums[mask][order]],
+                           'time'     : dtime[mask][order],
+                           'value'    : self._data[rows, self._DATAINDEX]})
+        if freq is not None:
+            freq, loffset = _get_pandas_freq_and_loffset(freq)
+            grouper = pd.Grouper(key='time', freq=freq)
+            df = (df.groupby(['meta_idx', 'var_name', grouper])['value']
+                  .agg(how).dropna().reset_index())
+            if loffset is not None:
+                df['time'] = df['time'] + pd.tseries.frequencies.to_offset(
+                                                                    loffset)
+        
+        # add station information from metadata
+        blocks = np.asarray([pos[k] for k in df['meta_idx']], dtype=int)
+        codes, names = table.get_codes('station_name')
+        names = np.asarray(names + [np.nan], dtype=object)
+        df.insert(1, 'station_name', names[codes[blocks]])
+        for i, key in enumerate(const.STANDARD_COORD_NAMES):
+            df.insert(2 + i, key, table.get_numeric(key)[blocks])
+        return df
+    
     # TODO: check more general cases (i.e. no need to convert to StationData
     # if no time conversion is required)
     def get_variable_data(self, variables, start=None, stop=None,
@@ -1194,13 +1663,13 @@ class UngriddedData(object):
         list
             list of metadata indices that match input filter
         """
-        meta_matches = []
+        table = self.meta_table
+        mask = table.find(*filters)
+        meta_matches = [table.meta_keys[i] for i in np.where(mask)[0]]
         totnum = 0
-        for meta_idx, meta in self.metadata.items():
-            if self._check_filter_match(meta, *filters):
-                meta_matches.append(meta_idx)
-                for var in meta['variables']:
-                    totnum += len(self.meta_idx[meta_idx][var])
+        for meta_idx in meta_matches:
+            for var in self.metadata[meta_idx]['variables']:
+                totnum += index_len(self.meta_idx[meta_idx][var])
                 
         return (meta_matches, totnum)
        
@@ -1274,6 +1743,54 @@ class UngriddedData(object):
             data = data.set_flags_nan(inplace=True)
         return data
     
+    def _extract_meta_blocks(self, meta_keys):
+        """Extract data of certain metadata blocks into a new object
+        
+        All rows are gathered at once. The metadata blocks are renumbered 
+        (starting at 0) in the order of the input keys.
+        
+        Parameters
+        ----------
+        meta_keys : list
+            metadata keys of blocks to be extracted
+            
+        Returns
+        -------
+        UngriddedData
+            new data object
+        """
+        meta_idx_new = 0.0
+        data_idx_new = 0
+        
+        new = self._new_like(num_points=0)
+        rows = []
+        meta_col = []
+        for meta_idx in meta_keys:
+            meta = self.metadata[meta_idx]
+            new.metadata[meta_idx_new] = meta
+            new.meta_idx[meta_idx_new] = od()
+            for var, indices in self.meta_idx[meta_idx].items():
+                totnum = index_len(indices)
+
+                stop = data_idx_new + totnum
+                
+                rows.append(index_to_array(indices))
+                meta_col.append(np.full(totnum, meta_idx_new))
+                new.meta_idx[meta_idx_new][var] = block_index(data_idx_new,
+                                                              stop)
+                new.var_idx[var] = self.var_idx[var]
+                data_idx_new += totnum
+            
+            meta_idx_new += 1
+        
+        # extract all matches at once and update metadata indices in data
+        if data_idx_new > 0:
+            new._data = self._data[np.concatenate(rows)]
+            new._data[:, new._METADATAKEYINDEX] = np.concatenate(meta_col)
+        new._ROWNO = data_idx_new
+        new.data_revision.update(self.data_revision)
+        return new
+    
     def filter_by_meta(self, **filter_attributes):
         """Flexible method to filter these data based on input meta specs
         
@@ -1309,9 +1826,6 @@ class UngriddedData(object):
         ...                                     altitude=[0, 1000])
         """
         
-        meta_idx_new = 0.0
-        data_idx_new = 0
-    
         if 'variables' in filter_attributes:
             raise NotImplementedError('Cannot yet filter by variables')
             
@@ -1322,37 +1836,85 @@ class UngriddedData(object):
             const.print_log.info('Input filters {} result in unchanged data '
                                  'object'.format(filter_attributes))
             return self
-        new = UngriddedData(num_points=totnum_new)
-        for meta_idx in meta_matches:
-            meta = self.metadata[meta_idx]
-            new.metadata[meta_idx_new] = meta
-            new.meta_idx[meta_idx_new] = od()
-            for var in meta['variables']:
-                indices = self.meta_idx[meta_idx][var]
-                totnum = len(indices)
-
-                stop = data_idx_new + totnum
-                
-                new._data[data_idx_new:stop, :] = self._data[indices, :]
-                new.meta_idx[meta_idx_new][var] = np.arange(data_idx_new,
-                                                            stop)
-                new.var_idx[var] = self.var_idx[var]
-                data_idx_new += totnum
-            
-            meta_idx_new += 1
-
-        if meta_idx_new == 0 or data_idx_new == 0:
+        if len(meta_matches) == 0 or totnum_new == 0:
             raise DataExtractionError('Filtering results in empty data object')
-        new._data = new._data[:data_idx_new]
+            
+        new = self._extract_meta_blocks(meta_matches)
         
         # write history of filtering applied 
         new.filter_hist.update(self.filter_hist)
         time_str = datetime.now().strftime('%Y%m%d%H%M%S')
         new.filter_hist[int(time_str)] = filter_attributes
-        new.data_revision.update(self.data_revision)
         
         return new
     
+    def filter_by_time(self, start, stop=None):
+        """Extract all data within a time window
+        
+        Uses the :attr:`time_index`, that is, data blocks (station and 
+        variable) outside the time window are skipped and the rows within 
+        the window are found via binary search. Metadata blocks without data
+        in the time window are not included in the output.
+        
+        Parameters
+        ----------
+        start
+            start time (any format that can be converted to pandas.Timestamp)
+        stop
+            stop time (any format that can be converted to pandas.Timestamp).
+            If None, the end of the year of start is used (cf. 
+            :func:`pyaerocom.helpers.start_stop`)
+            
+        Returns
+        -------
+        UngriddedData
+            new data object containing data in time window (sorted by time 
+            within each data block)
+        
+        Raises
+        ------
+        DataCoverageError
+            if no data is available in the time window
+        """
+        start, stop = start_stop(start, stop)
+        start, stop = np.datetime64(start), np.datetime64(stop)
+        tindex = self.time_index
+        
+        new = self._new_like(num_points=0)
+        meta_map = od()
+        rows = []
+        meta_col = []
+        num = 0
+        for meta_idx, var in tindex.blocks_in_window(start, stop):
+            idx = tindex.window(meta_idx, var, start, stop)
+            totnum = index_len(idx)
+            if totnum == 0:
+                continue
+            if not meta_idx in meta_map:
+                meta_idx_new = float(len(meta_map))
+                meta_map[meta_idx] = meta_idx_new
+                new.metadata[meta_idx_new] = self.metadata[meta_idx]
+                new.meta_idx[meta_idx_new] = od()
+            meta_idx_new = meta_map[meta_idx]
+            new.meta_idx[meta_idx_new][var] = block_index(num, num + totnum)
+            new.var_idx[var] = self.var_idx[var]
+            rows.append(index_to_array(idx))
+            meta_col.append(np.full(totnum, meta_idx_new))
+            num += totnum
+        
+        if num == 0:
+            raise DataCoverageError('No data available in time interval '
+                                    '{} - {}'.format(start, stop))
+        new._data = self._data[np.concatenate(rows)]
+        new._data[:, new._METADATAKEYINDEX] = np.concatenate(meta_col)
+        new._ROWNO = num
+        
+        new.filter_hist.update(self.filter_hist)
+        new.data_revision.update(self.data_revision)
+        new._add_to_filter_history('Extracted time interval {} - {}'
+                                   .format(start, stop))
+        return new
+    
     def clear_meta_no_data(self, inplace=True):
         """Remove all metadata blocks that do not have data associated with it
         
@@ -1442,9 +2004,8 @@ class UngriddedData(object):
                                  'Returning copy')
             return self.copy()
         
-        var_idx = self.var_idx[var_name]
-        
-        totnum = np.sum(self._data[:, self._VARINDEX] == var_idx)
+        totnum = sum([index_len(didx[var_name]) for didx in 
+                      self.meta_idx.values() if var_name in didx])
         
         colnum, rownum = self.shape
         
@@ -1452,7 +2013,7 @@ class UngriddedData(object):
             raise NotImplementedError('Cannot split UngriddedData objects that have '
                                       'additional columns other than default columns')
             
-        subset = UngriddedData(totnum)
+        subset = self._new_like(totnum)
         
         subset.var_idx[var_name] = 0
         subset._index = self.index
@@ -1461,7 +2022,7 @@ class UngriddedData(object):
         arr_idx = 0
         
         for midx, didx in self.meta_idx.items():
-            if var_name in didx and len(didx[var_name]) > 0:
+            if var_name in didx and index_len(didx[var_name]) > 0:
                 meta_idx += 1
                 meta =  {}
                 _meta = self.metadata[midx]
@@ -1475,10 +2036,10 @@ class UngriddedData(object):
             
                 subset.meta_idx[meta_idx] = {}
                 
-                num_add = len(idx)
+                num_add = index_len(idx)
                 start = arr_idx
                 stop = arr_idx + num_add
-                subset.meta_idx[meta_idx][var_name] = np.arange(start, stop)
+                subset.meta_idx[meta_idx][var_name] = block_index(start, stop)
                 
                 
                 subset._data[start:stop] = self._data[idx]
@@ -1634,7 +2195,7 @@ class UngriddedData(object):
             ignore_keys = []
         sh = self.shape
         lst_meta_idx = self._find_common_meta(ignore_keys)
-        new = UngriddedData(num_points=self.shape[0])
+        new = self._new_like(num_points=self.shape[0])
         didx = 0
         for i, idx_lst in enumerate(lst_meta_idx):
             _meta_check = od()
@@ -1660,15 +2221,12 @@ class UngriddedData(object):
                            
                 data_var_idx = self.meta_idx[meta_idx]
                 for var, data_idx in data_var_idx.items():
-                    num = len(data_idx)
+                    num = index_len(data_idx)
                     stop = didx + num
                     new._data[didx:stop, :] = self._data[data_idx]
                     new._data[didx:stop, 0] = i
-                    if not var in _meta_idx_new:
-                        _meta_idx_new[var] = np.arange(didx, stop)
-                    else:
-                        _idx = np.append(_meta_idx_new[var], np.arange(didx, stop))
-                        _meta_idx_new[var] = _idx
+                    _meta_idx_new[var] = join_indices(_meta_idx_new.get(var),
+                                                      block_index(didx, stop))
                     didx += num
             
             new.meta_idx[i] = _meta_idx_new
@@ -1681,6 +2239,111 @@ class UngriddedData(object):
                             'and final object. Developers: please check')
         return new
         
+    @staticmethod
+    def concat(objs, check_index=False, copy=True):
+        """Concatenate multiple data objects into a new one
+        
+        Faster alternative to successive calls of :func:`merge` (or 
+        :func:`append`): the size of the output is computed beforehand and 
+        all data arrays are concatenated at once. Variable indices are 
+        remapped via lookup tables. The input objects remain unchanged.
+        
+        Note
+        ----
+        The metadata dictionaries of the output are the ones of the input 
+        objects (not copied). If ``copy=False`` and only one of the input 
+        objects is not empty, that object itself is returned, that is, 
+        modifications of the output also apply to the input object.
+        
+        Parameters
+        ----------
+        objs : list
+            list of :class:`UngriddedData` objects (empty objects are 
+            ignored)
+        check_index : bool
+            if True, :func:`_check_index` is called on the output
+        copy : bool
+            if False and only one of the input objects is not empty, that 
+            object is returned without making a copy
+            
+        Returns
+        -------
+        UngriddedData
+            new data object containing data of all input objects (or the 
+            input object itself, cf. ``copy``)
+            
+        Raises
+        ------
+        ValueError
+            if input is not a list of :class:`UngriddedData` objects or if
+            the objects have different numbers of data columns
+        """
+        for obj in objs:
+            if not isinstance(obj, UngriddedData):
+                raise ValueError("Invalid input, need instances of "
+                                 "UngriddedData, got: {}".format(type(obj)))
+        objs = [obj for obj in objs if not obj.is_empty]
+        if len(objs) == 0:
+            return UngriddedData()
+        elif len(objs) == 1:
+            if copy:
+                return objs[0].copy()
+            return objs[0]
+        first = objs[0]
+        for obj in objs[1:]:
+            if not obj.shape[1] == first.shape[1]:
+                raise ValueError('Cannot concatenate UngriddedData objects '
+                                 'with different number of data columns')
+        new = first._new_like(num_points=0)
+        new._index = first.index
+        
+        # assign variable indices (same logic as in merge)
+        for obj in objs:
+            for var, idx in obj.var_idx.items():
+                if not var in new.var_idx:
+                    if idx in new.var_idx.values():
+                        idx = max(new.var_idx.values()) + 1
+                    new.var_idx[var] = idx
+        
+        ranges = []
+        data_offset = 0
+        meta_offset = 0
+        for obj in objs:
+            for meta_idx, meta in obj.metadata.items():
+                meta_idx_new = meta_offset + meta_idx
+                new.metadata[meta_idx_new] = meta
+                new.meta_idx[meta_idx_new] = od(
+                        [(var, shift_index(indices, data_offset)) for 
+                         var, indices in obj.meta_idx[meta_idx].items()])
+            num = len(obj._data)
+            ranges.append((data_offset, data_offset + num, meta_offset))
+            data_offset += num
+            meta_offset = max(new.metadata.keys()) + 1
+            new.data_revision.update(obj.data_revision)
+            new.filter_hist.update(obj.filter_hist)
+        
+        new._data = new._concat_data_arrays([obj._data for obj in objs])
+        new._ROWNO = data_offset
+        
+        # update metadata and variable indices in data array
+        for obj, (start, stop, offset) in zip(objs, ranges):
+            if offset > 0:
+                new._data[start:stop, new._METADATAKEYINDEX] = (
+                        obj._data[:, obj._METADATAKEYINDEX] + offset)
+            if any([new.var_idx[var] != idx for var, idx in 
+                    obj.var_idx.items()]):
+                lut = np.full(max(obj.var_idx.values()) + 1, np.nan)
+                for var, idx in obj.var_idx.items():
+                    lut[idx] = new.var_idx[var]
+                varcol = obj._data[:, obj._VARINDEX]
+                valid = ~np.isnan(varcol)
+                varcol_new = np.full(len(varcol), np.nan)
+                varcol_new[valid] = lut[varcol[valid].astype(int)]
+                new._data[start:stop, new._VARINDEX] = varcol_new
+        if check_index:
+            new._check_index()
+        return new
+    
     def merge(self, other, new_obj=True):
         """Merge another data object with this one
         
@@ -1729,7 +2392,7 @@ class UngriddedData(object):
                 obj.metadata[meta_idx] = meta_other
                 _idx_map = od()
                 for var_name, indices in other.meta_idx[meta_idx_other].items():
-                    _idx_map[var_name] = np.asarray(indices) + data_offset
+                    _idx_map[var_name] = shift_index(indices, data_offset)
                 obj.meta_idx[meta_idx] = _idx_map
             
             for var, idx in other.var_idx.items():
@@ -1753,9 +2416,10 @@ class UngriddedData(object):
                         obj.var_idx[var] = new_idx
                     else:
                         obj.var_idx[var] = idx
-            obj._data = np.vstack([obj._data, other._data])
+            obj._data = self._concat_data_arrays([obj._data, other._data])
             obj.data_revision.update(other.data_revision)
         obj.filter_hist.update(other.filter_hist)
+        obj._invalidate_cache()
         obj._check_index()
         return obj
     
@@ -1795,6 +2459,7 @@ class UngriddedData(object):
         self.var_idx[var_name] = new_idx
         var_indices = np.where(self._data[:, self._VARINDEX]==cidx)
         self._data[var_indices, self._VARINDEX] = new_idx
+        self._invalidate_cache()
         
     def append(self, other):
         """Append other instance of :class:`UngriddedData` to this object
@@ -1871,7 +2536,9 @@ class UngriddedData(object):
         station exists in a second instance of :class:`UngriddedData` that
         is provided. The check is performed on basis of the station name, and
         optionally, if desired, for each station name match, the lon lat 
-        coordinates can be compared within a certain radius (defaul 0.1 km).
+        coordinates can be compared within a certain radius (defaul 0.1 km),
+        using the :attr:`spatial_index` of the other object. If multiple 
+        blocks in the other object match, the first (closest) one is used.
         
         Note
         ----
@@ -1922,60 +2589,44 @@ class UngriddedData(object):
                 raise ValueError('Invalid input for check_vars_available. Need '
                                  'str or list-like, got: {}'
                                  .format(check_vars_available))
-        lat_len = 111.0 #approximate length of latitude degree in km
+        table = self.meta_table
+        table_other = other.meta_table
+        names_other = other.station_name_index.groups
+        
+        def _has_vars(tab, pos):
+            if not _check_vars:
+                return True
+            return all(tab.has_var(var)[pos] for var in check_vars_available)
+        
+        pos_other = {k : i for i, k in enumerate(table_other.meta_keys)}
         station_map = od()
-        stations_other = other.station_name
-        for meta_idx, meta in self.metadata.items():
+        for pos, meta_idx in enumerate(table.meta_keys):
+            meta = self.metadata[meta_idx]
             name = meta['station_name']
-            # bool that is used to accelerate things
-            ok = True
-            if _check_vars:
-                for var in check_vars_available:
-                    try:
-                        if not var in meta['variables']:
-                            logger.debug('No {} in data of station {}'
-                                         '({})'.format(var, name, 
-                                                       meta['data_id']))
-                            ok = False
-                    except: # attribute does not exist or is not iterable
-                        ok = False
-            if ok and name in stations_other:
-                for meta_idx_other, meta_other in other.metadata.items():
-                    if meta_other['station_name'] == name:
-                        if _check_vars:
-                            for var in check_vars_available:
-                                try:
-                                    if not var in meta_other['variables']:
-                                        logger.debug('No {} in data of station'
-                                                     ' {} ({})'.format(var, 
-                                                     name, 
-                                                     meta_other['data_id']))
-                                        ok = False
-                                except: # attribute does not exist or is not iterable
-                                    ok = False
-                        if ok and check_coordinates:
-                            dlat = abs(meta['latitude']-meta_other['latitude'])
-                            dlon = abs(meta['longitude']-meta_other['longitude'])
-                            lon_fac = np.cos(np.deg2rad(meta['latitude']))
-                            #compute distance between both station coords
-                            dist = np.linalg.norm((dlat*lat_len, 
-                                                   dlon*lat_len*lon_fac))
-                            if dist > max_diff_coords_km:
-                                logger.warning('Coordinate of station '
-                                               '{} varies more than {} km '
-                                               'between {} and {} data. '
-                                               'Retrieved distance: {:.2f} km '
-                                               .format(name, max_diff_coords_km,
-                                                       meta['data_id'],
-                                                       meta_other['data_id'],
-                                                       dist))
-                                ok = False
-                        if ok: #match found
-                            station_map[meta_idx] = meta_idx_other
-                            logger.debug('Found station match {}'.format(name))
-                            # no need to further iterate over the rest 
-                            continue
-                        
+            if not name in names_other or not _has_vars(table, pos):
+                continue
+            candidates = [idx for idx in names_other[name] if 
+                          _has_vars(table_other, pos_other[idx])]
+            if len(candidates) == 0:
+                continue
+            lat, lon = table.get_numeric('latitude')[pos], \
+                       table.get_numeric('longitude')[pos]
+            if check_coordinates and not np.isnan(lat + lon):
+                nearby, dists = other.spatial_index.query_radius(
+                        lat, lon, max_diff_coords_km)
+                nearby = [idx for idx in nearby if idx in candidates]
+                if len(nearby) == 0:
+                    logger.warning('Coordinate of station {} varies more than '
+                                   '{} km between {} and {} data.'
+                                   .format(name, max_diff_coords_km,
+                                           meta['data_id'],
+                                           other.metadata[candidates[0]]
+                                           ['data_id']))
+                    continue
+                candidates = nearby
+            station_map[meta_idx] = candidates[0]
+            logger.debug('Found station match {}'.format(name))
+            
         return station_map
         
     # TODO: brute force at the moment, we need to rethink and define how to
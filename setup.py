@@ -55,7 +55,8 @@ setup(
     long_description = readme,
     entry_points = {'console_scripts' : [
             'pyaeroeval=pyaerocom.web.cli.main_aerocom_evaluation:main',
-            'pyaerotrends=pyaerocom.web.cli.main_trends_evaluation:main'
+            'pyaerotrends=pyaerocom.web.cli.main_trends_evaluation:main',
+            'pyaerocom=pyaerocom.cli:main'
             ]},
     zip_safe = False
 )
\ No newline at end of file